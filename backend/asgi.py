@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from jobs.events import event_stream # noqa: E402, needs the app registry loaded above
+
+
+async def application(scope, receive, send):
+    # Server-sent events are served outside Django's request cycle, so idle streams don't hold a thread each
+    if scope["type"] == "http" and scope["path"] == "/api/events/":
+        return await event_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
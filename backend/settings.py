@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -69,9 +72,41 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # orjson for JSON, MessagePack for clients that send "Accept: application/msgpack"
+    "DEFAULT_RENDERER_CLASSES": (
+        "jobs.renderers.ORJSONRenderer",
+        "jobs.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "jobs.renderers.ORJSONParser",
+        "jobs.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # Only when ?page= is given; counts above EXACT_COUNT_THRESHOLD are estimated
+    "DEFAULT_PAGINATION_CLASS": "jobs.pagination.ApproximateCountPagination",
 }
 
 CORS_ALLOW_ALL_ORIGINS = True  # dev only
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['X-Change-Cursor', 'Idempotent-Replayed']
+
+# Memory-mapped TF-IDF index shared by all worker processes (see jobs/recommend.py)
+JOB_INDEX_DIR = BASE_DIR / 'var' / 'job-index'
+
+# Tests run with JOB_INDEX_DIR and ATTACHMENTS_ROOT in a temporary directory
+TEST_RUNNER = 'jobs.testrunner.TempStorageTestRunner'
+
+# Closed and expired job postings are moved to the archive tables this long after closing (`manage.py archive_job_postings`)
+JOB_ARCHIVE_AFTER_DAYS = 90
+
+# Where `manage.py dispatch_notifications` delivers applicant notifications (see jobs/notifications.py).
+# Use "jobs.notifications.EmailSink" to send through EMAIL_BACKEND instead.
+NOTIFICATION_SINK = 'jobs.notifications.FileSink'
+NOTIFICATION_FILE = BASE_DIR / 'var' / 'notifications.jsonl'
+# Failed deliveries to one recipient before their messages are dead-lettered (OutboxMessage.failed_at)
+NOTIFICATION_MAX_ATTEMPTS = 5
 
 ROOT_URLCONF = 'backend.urls'
 
@@ -100,9 +135,54 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts and wait for it instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # File-backed test database so threaded tests get real locking instead of shared-cache table locks
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Read replicas for the API's GET requests (see jobs/routers.py). Locally, DB_REPLICAS=N adds N read-only SQLite
+# copies of the primary as stand-ins; refresh them with `manage.py sync_replicas`.
+for i in range(1, int(os.environ.get('DB_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{i}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / f'db.replica{i}.sqlite3'}?mode=ro",
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+
+# Opt-in company sharding (see jobs/sharding.py). DB_SHARDS=N stores each company's postings, applications and
+# interviews in one of N shard databases; run `manage.py init_shards` after configuring them. Sharded mode is tested
+# by jobs.tests.ShardingTests alone (`DB_SHARDS=2 manage.py test jobs.tests.ShardingTests`); the other tests assume
+# sharding is off.
+for i in range(int(os.environ.get('DB_SHARDS', 0))):
+    DATABASES[f'shard{i}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.shard{i}.sqlite3',
+        'OPTIONS': DATABASES['default']['OPTIONS'],
+        'TEST': {'NAME': BASE_DIR / f'test_db.shard{i}.sqlite3'},
+    }
+DATABASE_SHARDS = [alias for alias in DATABASES if alias.startswith('shard')]
+DATABASE_ROUTERS = ['jobs.sharding.ShardRouter', 'jobs.routers.ReplicaRouter']
+# How long after a write a user's reads stay on the primary, so they never read their own writes from a lagging replica
+REPLICA_PIN_SECONDS = 10
+
+# One cache shared by every server process: read-your-writes pins, login throttling buckets, and cached feeds and
+# dashboards with their scope versions all depend on it (see jobs/routers.py, jobs/throttling.py, jobs/caching.py).
+# Set CACHE_REDIS_URL (e.g. redis://localhost:6379/1, needs the redis package) in production; otherwise the cache is
+# a table in the default database, created by `manage.py createcachetable`.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'jobs_cache'}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -123,6 +203,71 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+AUTHENTICATION_BACKENDS = ['jobs.auth.PooledModelBackend']
+
+# Password hashing runs in a process pool off the serving threads (see jobs/passwords.py).
+# At most WORKERS + QUEUE hashes are in flight per server process; a request that waits longer than
+# PASSWORD_HASH_WAIT seconds for a slot gets a 503 with Retry-After. 0 workers hashes inline.
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE = 2
+PASSWORD_HASH_WAIT = 0.1
+PASSWORD_HASH_RETRY_AFTER = 2
+
+# Token-bucket limits for login and registration, shared across processes through the cache (see jobs/throttling.py).
+# Login buckets are only spent by failed attempts.
+AUTH_THROTTLE_RATES = {
+    'login_ip': '30/min',
+    'login_username': '10/min',
+    'register_ip': '20/hour',
+}
+
+# Paginated counts are exact up to this many rows and estimated from database statistics above it (see jobs/pagination.py)
+EXACT_COUNT_THRESHOLD = 10000
+
+# Upper bound on operations in one /api/batch/ request
+BATCH_MAX_OPERATIONS = 20
+
+# ?since= change feeds (see ChangeLog): entries per response, how old an entry must be before it is served (so a
+# slower transaction can't commit an earlier entry behind a client's cursor), and how long `manage.py
+# prune_change_log` keeps entries
+CHANGE_FEED_LIMIT = 500
+CHANGE_FEED_SETTLE_SECONDS = 2
+CHANGE_LOG_RETENTION_DAYS = 30
+
+# Server-sent events at /api/events/ (see jobs/events.py, ASGI only). Set EVENTS_REDIS_URL to share events between
+# processes through Redis pub/sub; otherwise only events published by the serving process are delivered.
+EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL', '')
+EVENTS_HEARTBEAT_SECONDS = 25
+EVENTS_QUEUE_SIZE = 100
+
+# Idempotency-Key support on mutating actions (see jobs/idempotency.py): how long a response is kept for replay
+# (`manage.py prune_idempotency_keys` deletes older ones), how long a duplicate waits for the original request to
+# finish, and after how long an unfinished claim counts as abandoned by a crashed request
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60 # seconds
+IDEMPOTENCY_WAIT = 5
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+# Applicants must attach a resume before submitting an application
+APPLICATION_RESUME_REQUIRED = True
+
+# Resume and cover letter uploads (see jobs/attachments.py). Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to
+# a temporary file rather than held in memory. With ATTACHMENTS_ACCEL_REDIRECT set (e.g. '/protected/attachments/'),
+# downloads are handed to nginx, which needs a matching location:
+#   location /protected/attachments/ { internal; alias /path/to/var/attachments/; }
+ATTACHMENTS_ROOT = BASE_DIR / 'var' / 'attachments'
+ATTACHMENTS_ACCEL_REDIRECT = os.environ.get('ATTACHMENTS_ACCEL_REDIRECT', '')
+ATTACHMENT_MAX_BYTES = 10 * 1024 * 1024
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# Resume text extraction for candidate search (see jobs/extraction.py), run by the task workers in a process pool.
+# Limits are per document; EXTRACTION_WORKERS = 0 extracts inline without them.
+EXTRACTION_WORKERS = 2
+EXTRACTION_TIMEOUT = 30 # seconds
+EXTRACTION_MEMORY_LIMIT = 512 * 1024 * 1024 # bytes of address space per child process
+EXTRACTION_MAX_CHARS = 200000
+CANDIDATE_SEARCH_LIMIT = 50 # Results without ?page=
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -17,18 +17,19 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
     TokenRefreshView,
 )
-from jobs.views import LogoutView, RegisterView, MeView
+from jobs.views import LoginView, LogoutView, RegisterView, MeView, BatchView, DashboardView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     path('api/', include('jobs.urls')),
-    path('api/auth/login/', TokenObtainPairView.as_view(), name='jwt-login'),
+    path('api/auth/login/', LoginView.as_view(), name='jwt-login'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='jwt-refresh'),
     path("api/auth/logout/", LogoutView.as_view(), name="jwt-logout"),
     path("api/auth/register/", RegisterView.as_view(), name="register"),
     path("api/auth/me/", MeView.as_view(), name="auth-me"),
+    path("api/batch/", BatchView.as_view(), name="batch"),
+    path("api/dashboard/", DashboardView.as_view(), name="dashboard"),
 ]
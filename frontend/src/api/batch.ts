@@ -0,0 +1,27 @@
+import { api } from './client';
+
+export type BatchOperation = {
+  method: 'GET' | 'POST' | 'PUT' | 'PATCH' | 'DELETE';
+  path: string;
+  body?: unknown;
+};
+
+export type BatchResult<T = unknown> = {
+  status: number;
+  body: T;
+};
+
+// Runs several API calls in one round trip; each result carries its own status code
+export const batch = async (operations: BatchOperation[], atomic = false): Promise<BatchResult[]> => {
+  const response = await api.post<{ results: BatchResult[] }>('/api/batch/', { operations, atomic });
+  return response.data.results;
+};
+
+// Body of a successful result, or an Error for a failed one
+export const unwrap = <T>(result: BatchResult): T => {
+  if (result.status >= 400) {
+    const detail = (result.body as { detail?: string } | null)?.detail;
+    throw new Error(detail ?? `Request failed with status ${result.status}`);
+  }
+  return result.body as T;
+};
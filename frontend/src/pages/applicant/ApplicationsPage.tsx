@@ -1,9 +1,9 @@
 import { useEffect, useState, useCallback } from 'react';
 import { useAuth } from '../../auth/AuthContext';
-import { getJobPostings } from '../../api/jobs';
+import { batch, unwrap } from '../../api/batch';
 import type { JobPosting } from '../../api/jobs';
 import type { Application } from '../../api/applications';
-import { getApplications, submitApplication, withdrawApplication, deleteApplication } from '../../api/applications';
+import { submitApplication, withdrawApplication, deleteApplication } from '../../api/applications';
 import { Card } from '../../components/ui/Card';
 import { Button } from '../../components/ui/Button';
 import styles from './ApplicationsPage.module.css';
@@ -28,9 +28,12 @@ export default function ApplicantApplications() {
   const fetchData = useCallback(async () => {
     try {
       setLoading(true);
-      const [apps, jobPostings] = await Promise.all([getApplications(), getJobPostings()]);
-      setApplications(apps);
-      setJobs(jobPostings);
+      const [apps, jobPostings] = await batch([
+        { method: 'GET', path: '/api/applications/' },
+        { method: 'GET', path: '/api/job-postings/' },
+      ]);
+      setApplications(unwrap<Application[]>(apps));
+      setJobs(unwrap<JobPosting[]>(jobPostings));
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to load applications');
       console.error(err);
@@ -1,15 +1,66 @@
 from django.contrib import admin
-from .models import Profile, Company, JobPosting, Application, Interview
+from .models import Profile, Company, JobPosting, JobAppQuestion, Application, Interview
+from .pagination import EstimatedCountPaginator
 # Register your models here.
 
-admin.site.register(JobPosting)
-admin.site.register(Application)
-admin.site.register(Interview)
-#admin.site.register(Profile)
-admin.site.register(Company)
+# The job tables run to millions of rows, so their admins avoid anything that scans or loads a whole table:
+# raw-id widgets instead of <select>s of every user or posting, related rows joined up front for __str__,
+# exact-match searches on indexed columns, date drill-down on indexed dates, and estimated page counts
+# (show_full_result_count skips the second, unfiltered COUNT).
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+@admin.register(Company)
+class CompanyAdmin(admin.ModelAdmin):
+    list_display = ["name", "company_size", "industry"]
+    search_fields = ["name__istartswith"] # Needed by the company autocomplete widgets; served by company_name_idx
+    ordering = ["name"]
+
+class JobAppQuestionInline(admin.TabularInline):
+    model = JobAppQuestion
+    extra = 0
+
+@admin.register(JobPosting)
+class JobPostingAdmin(LargeTableAdmin):
+    list_display = ["id", "title", "company", "status", "posted_date", "application_count"]
+    list_select_related = ["company"]
+    list_filter = ["status", "employment_type"]
+    search_fields = ["id__exact", "company__id__exact"] # The company's id (see its admin), so both lookups use this table's indexes
+    autocomplete_fields = ["company"]
+    date_hierarchy = "posted_date"
+    ordering = ["-id"]
+    inlines = [JobAppQuestionInline]
+
+@admin.register(Application)
+class ApplicationAdmin(LargeTableAdmin):
+    list_display = ["id", "applicant", "job", "status", "application_date"]
+    list_select_related = ["applicant", "job__company"]
+    list_filter = ["status"]
+    search_fields = ["id__exact", "applicant__username__exact", "job__id__exact"]
+    raw_id_fields = ["applicant", "job"]
+    date_hierarchy = "application_date"
+    ordering = ["-id"]
+
+@admin.register(Interview)
+class InterviewAdmin(LargeTableAdmin):
+    list_display = ["id", "application", "interview_date", "interviewer_name", "means_of_interview"]
+    list_select_related = ["application__applicant", "application__job__company"]
+    list_filter = ["means_of_interview"]
+    search_fields = ["application__id__exact", "interviewer_name__exact", "application__applicant__username__exact"]
+    raw_id_fields = ["application"]
+    date_hierarchy = "interview_date"
+    ordering = ["-interview_date"]
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin): # Custom admin for Profile to ensure clean method is called
+    list_display = ["user", "account_type", "company"]
+    list_select_related = ["user", "company"]
+    search_fields = ["user__username__exact"]
+    raw_id_fields = ["user"]
+    autocomplete_fields = ["company"]
+
     def save_model(self, request, obj, form, change):
         obj.full_clean()  # This will call the clean() method on the model
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
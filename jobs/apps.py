@@ -3,4 +3,5 @@ from django.apps import AppConfig
 class JobsConfig(AppConfig):
     name = 'jobs'
     def ready(self):
-        import jobs.signals  # Import signals to ensure they are registered
\ No newline at end of file
+        import jobs.signals  # Import signals to ensure they are registered
+        import jobs.tasks  # Import task handlers so workers can find them
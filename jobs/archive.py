@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Application, ArchivedApplication, ArchivedJobPosting, JobAppAnswer, JobPosting
+from .sharding import all_shards
+
+# Moves closed and expired postings, with their applications, from the hot tables into the archive tables.
+# Each batch is copied and deleted in one transaction, so a posting is never in both places or neither.
+
+POSTING_FIELDS = [
+    "id", "title", "company_id", "location", "employment_means", "salary_range", "currency_code",
+    "description", "posted_date", "employment_type", "status", "expires_at", "closed_at",
+]
+APPLICATION_FIELDS = ["id", "applicant_id", "job_id", "notes", "resume", "cover_letter", "application_date", "status"]
+
+
+def interview_snapshot(application):
+    interview = getattr(application, "interview", None)
+    if interview is None:
+        return None
+    return {
+        "interview_date": interview.interview_date.isoformat(),
+        "duration_minutes": interview.duration_minutes,
+        "interviewer_name": interview.interviewer_name,
+        "means_of_interview": interview.means_of_interview,
+        "notes": interview.notes,
+    }
+
+
+def answers_snapshot(application):
+    # Questions are deleted with their posting, so the archive keeps the prompts alongside the answers
+    return [
+        {"question_prompt": answer.question.question_prompt, "answer_value": answer.answer_value}
+        for answer in application.answers.all()
+    ] or None
+
+
+def archive_batch(cutoff, batch_size, using=None):
+    # Archives up to batch_size postings closed before cutoff; returns (postings, applications) moved.
+    # using is the shard to work on when company sharding is on (None otherwise).
+    with transaction.atomic(using=using):
+        postings = list(
+            JobPosting.objects.using(using).select_for_update()
+            .filter(status__in=[JobPosting.CL, JobPosting.EX], closed_at__lt=cutoff)
+            .order_by("id")[:batch_size]
+        )
+        if not postings:
+            return 0, 0
+        ids = [posting.id for posting in postings]
+        applications = list(
+            Application.objects.using(using).filter(job_id__in=ids).select_related("interview")
+            .prefetch_related(Prefetch("answers", queryset=JobAppAnswer.objects.select_related("question")))
+        )
+
+        ArchivedJobPosting.objects.using(using).bulk_create(
+            [ArchivedJobPosting(**{field: getattr(posting, field) for field in POSTING_FIELDS}) for posting in postings]
+        )
+        ArchivedApplication.objects.using(using).bulk_create(
+            [
+                ArchivedApplication(interview=interview_snapshot(application), answers=answers_snapshot(application), **{field: getattr(application, field) for field in APPLICATION_FIELDS})
+                for application in applications
+            ],
+            batch_size=500,
+        )
+        # Cascades to the applications, their interviews and answers, and the questions
+        JobPosting.objects.using(using).filter(id__in=ids).delete()
+    return len(postings), len(applications)
+
+
+def archive_closed_postings(older_than, batch_size=100, max_batches=None):
+    cutoff = timezone.now() - older_than
+    postings = applications = 0
+    for alias in all_shards():
+        batches = 0 # max_batches applies per shard
+        while max_batches is None or batches < max_batches:
+            moved_postings, moved_applications = archive_batch(cutoff, batch_size, using=alias)
+            if not moved_postings:
+                break
+            postings += moved_postings
+            applications += moved_applications
+            batches += 1
+    return postings, applications
@@ -0,0 +1,155 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.deconstruct import deconstructible
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.negotiation import BaseContentNegotiation
+
+# Resumes and cover letters, stored by content: a file is saved as <upload_to>/<h[:2]>/<sha256><ext>, so the same
+# PDF uploaded to fifty applications is stored once, and the name doubles as a strong ETag.
+#
+# - Uploads are copied to disk in chunks while being hashed (Django spools large uploads to a temporary file),
+#   then renamed into place, so memory use doesn't grow with the file.
+# - Files are served by FileResponse (sendfile through wsgi.file_wrapper) or, with ATTACHMENTS_ACCEL_REDIRECT set,
+#   handed to the web server with X-Accel-Redirect. Range and If-None-Match / If-Range requests are answered here.
+# - Files are shared, so deleting an application never deletes its files; prune_attachments removes unreferenced ones.
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    temp_dir = "tmp"
+
+    # Read from settings on every access rather than cached, so ATTACHMENTS_ROOT can be overridden in tests
+    @property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.ATTACHMENTS_ROOT)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def get_available_name(self, name, max_length=None):
+        return name # Identical names mean identical content, so there's nothing to avoid
+
+    def _save(self, name, content):
+        directory, extension = posixpath.dirname(name), posixpath.splitext(name)[1].lower()[:10]
+        os.makedirs(self.path(self.temp_dir), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.path(self.temp_dir))
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(descriptor, "wb") as out:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+            sha256 = digest.hexdigest()
+            name = posixpath.join(directory, sha256[:2], sha256 + extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.unlink(temp_path) # Already stored
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, path) # Atomic, so a concurrent identical upload just replaces it with the same bytes
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return name
+
+
+attachment_storage = ContentAddressedStorage()
+
+
+def validate_attachment_size(file):
+    if file.size > settings.ATTACHMENT_MAX_BYTES:
+        raise ValidationError(f"Attachments can be at most {settings.ATTACHMENT_MAX_BYTES // (1024 * 1024)} MB.")
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    # File downloads answer with the file's own type, whatever Accept asks for
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def requested_range(request, etag, size):
+    # The (start, end) byte range to send, None for the whole file, or "unsatisfiable".
+    # Multiple ranges aren't supported; a server may answer those with the whole file.
+    header = request.headers.get("Range")
+    if not header or not size:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range is not None and if_range != etag:
+        return None # The client's partial copy is of different content
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    elif last:
+        start, end = max(size - int(last), 0), size - 1 # The last N bytes
+    else:
+        return None
+    if start > end or start >= size:
+        return "unsatisfiable"
+    return start, end
+
+
+def read_range(path, start, end):
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_attachment(request, field_file, download_name):
+    # Response for a stored attachment. The ETag comes from the file name, so a revalidation touches no file.
+    storage = field_file.storage
+    etag = quote_etag(posixpath.splitext(posixpath.basename(field_file.name))[0])
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Accept-Ranges": "bytes"}
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        return HttpResponseNotModified(headers=headers)
+    headers["Content-Type"] = mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+    headers["Content-Disposition"] = f'inline; filename="{download_name}"'
+
+    if settings.ATTACHMENTS_ACCEL_REDIRECT:
+        # The web server streams the file and answers Range itself; see ATTACHMENTS_ACCEL_REDIRECT in settings.py
+        response = HttpResponse(headers=headers)
+        response["X-Accel-Redirect"] = settings.ATTACHMENTS_ACCEL_REDIRECT.rstrip("/") + "/" + field_file.name
+        return response
+
+    path = storage.path(field_file.name)
+    size = storage.size(field_file.name)
+    byte_range = requested_range(request, etag, size)
+    if byte_range == "unsatisfiable":
+        return HttpResponse(status=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        content_type = headers.pop("Content-Type")
+        del headers["Content-Disposition"] # FileResponse sets both itself
+        return FileResponse(open(path, "rb"), content_type=content_type, filename=download_name, headers=headers)
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(path, start, end), status=206, headers=headers)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = end - start + 1
+    return response
@@ -1,8 +1,24 @@
 from datetime import datetime, timezone as datetime_timezone
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
+from .passwords import check_password, hash_password
+from .routers import pin_to_primary
+
+UserModel = get_user_model()
 
 class JWTLogoutAuthentication(JWTAuthentication):
+    pin_writes = True
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        # A write pins the user's reads to the primary for a while (see jobs/routers.py)
+        if result is not None and self.pin_writes and request.method not in SAFE_METHODS:
+            pin_to_primary(result[0].pk)
+        return result
+
     def get_user(self, validated_token):
         user = super().get_user(validated_token)
 
@@ -16,4 +32,30 @@ class JWTLogoutAuthentication(JWTAuthentication):
         if invalid_before and issued_at <= invalid_before:
             raise InvalidToken("Token is no longer valid (user logged out).")
 
-        return user
\ No newline at end of file
+        return user
+
+class BatchJWTAuthentication(JWTLogoutAuthentication):
+    # /api/batch/ is a POST even when every operation is a read; BatchView pins per write operation instead
+    pin_writes = False
+
+class PooledModelBackend(ModelBackend):
+    # ModelBackend with the password check run through the hashing pool (see jobs/passwords.py)
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so response time doesn't reveal which usernames exist
+            hash_password(password)
+            return None
+
+        is_correct, must_update = check_password(password, user.password)
+        if not is_correct:
+            return None
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=["password"])
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,47 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Cached responses are keyed by a per-scope version number (e.g. "company:3", "applicant:7").
+# Bumping a scope's version invalidates every cached entry for it without having to find and delete them.
+# Versions start from a timestamp so an evicted version key can never bring back an older cached entry.
+# Versions and cached bodies both live in the shared cache (CACHES), so a bump made by one server process
+# invalidates what every other process has cached.
+
+def _version_key(scope):
+    return f"scope-version:{scope}"
+
+
+def scope_version(scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_scopes(*scopes):
+    # Bump after commit so a concurrent reader cannot cache pre-commit data under the new version
+    def bump():
+        for scope in scopes:
+            key = _version_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+    transaction.on_commit(bump)
+
+
+def company_scope(company_id):
+    return f"company:{company_id}"
+
+
+def applicant_scope(user_id):
+    return f"applicant:{user_id}"
+
+
+def user_scope(user_id):
+    # The user's own account data (profile, role, company)
+    return f"user:{user_id}"
@@ -0,0 +1,89 @@
+import math
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .extraction import ExtractionError, extract_text
+from .models import Application, CandidateDocument, CandidateTerm
+from .recommend import tokenize
+from .sharding import shard_for_pk
+
+# Searchable candidate pool: resume text is extracted in the background (task "index_resume", see jobs/tasks.py)
+# and stored as CandidateTerm rows, an inverted index keyed by (company_id, term). A search ranks a company's
+# applications with BM25: term weights are stored saturated (k1), the IDF is computed per company at query time
+# from the same index, so it stays right as candidates come and go.
+#
+# Indexing is idempotent: a document whose source (the file's content hash) is already indexed is skipped, and a file
+# extracted for one application is reused for any other application with the same file.
+
+K1 = 1.2 # BM25 term-frequency saturation
+MAX_TERMS = 2000 # Per document, the most frequent ones; keeps the index bounded for very long documents
+MAX_TERM_LENGTH = 40
+
+
+def term_weights(text):
+    counts = Counter(token for token in tokenize(text) if len(token) <= MAX_TERM_LENGTH)
+    return {term: count * (K1 + 1) / (count + K1) for term, count in counts.most_common(MAX_TERMS)}
+
+
+def index_resume(application_id, force=False):
+    db = shard_for_pk(application_id)
+    application = Application.objects.using(db).select_related("job").filter(pk=application_id).first()
+    if application is None:
+        return # Deleted since; its index rows went with it
+    source = application.resume.name if application.resume else ""
+    document = CandidateDocument.objects.using(db).filter(application_id=application_id).first()
+    if not force and document is not None and document.source == source and document.status != CandidateDocument.PENDING:
+        return # Already processed this exact file
+
+    status, text, error = CandidateDocument.DONE, "", ""
+    if source:
+        reusable = CandidateDocument.objects.using(db).filter(source=source, status=CandidateDocument.DONE).exclude(application_id=application_id).first()
+        if reusable is not None and not force:
+            text = reusable.text
+        else:
+            # The task isn't atomic, so a slow document doesn't hold a transaction open
+            try:
+                text = extract_text(application.resume.path)
+            except ExtractionError as e:
+                status, error = CandidateDocument.FAILED, str(e)
+
+    weights = term_weights(text)
+    with transaction.atomic(using=db):
+        CandidateDocument.objects.using(db).update_or_create(
+            application_id=application_id,
+            defaults={"source": source, "status": status, "text": text, "error": error, "extracted_at": timezone.now(),
+                      "company_id": application.job.company_id},
+        )
+        CandidateTerm.objects.using(db).filter(application_id=application_id).delete()
+        CandidateTerm.objects.using(db).bulk_create(
+            [CandidateTerm(application_id=application_id, company_id=application.job.company_id, term=term, weight=weight) for term, weight in weights.items()],
+            batch_size=500,
+        )
+
+
+def search(applications, company_id, query):
+    # applications (a queryset the caller has already scoped) that match query, best first, annotated with score.
+    # Only terms indexed from the application's current resume count, so a replaced file stops matching at once.
+    terms = sorted(set(term for term in tokenize(query) if len(term) <= MAX_TERM_LENGTH))
+    if not terms:
+        return applications.none()
+    db = applications.db
+    postings = CandidateTerm.objects.using(db).filter(company_id=company_id, term__in=terms)
+    document_frequency = dict(postings.values("term").annotate(n=Count("id")).values_list("term", "n"))
+    # From the company's indexed documents, one row each, rather than its (far larger) slice of the term index
+    documents = CandidateDocument.objects.using(db).filter(company_id=company_id, status=CandidateDocument.DONE).count()
+    idf = {term: math.log(1 + (documents - n + 0.5) / (n + 0.5)) for term, n in document_frequency.items()}
+    if not idf:
+        return applications.none()
+
+    weight_by_term = Case(*[When(candidate_terms__term=term, then=Value(value)) for term, value in idf.items()], output_field=FloatField())
+    return (
+        applications
+        .filter(candidate_terms__company_id=company_id, candidate_terms__term__in=list(idf),
+                candidate_document__source=F("resume"))
+        .annotate(score=Sum(F("candidate_terms__weight") * weight_by_term, output_field=FloatField()))
+        .order_by("-score", "-pk")
+    )
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+
+# Server-sent events for application status and interview changes, served straight from backend/asgi.py at
+# /api/events/ so an idle connection costs one coroutine and a small queue rather than a thread.
+#
+# - Events are published after the change commits, to the same channels as the cache scopes ("applicant:7",
+#   "company:3"); a stream subscribes to its user's channel.
+# - The broker is in-process. With EVENTS_REDIS_URL set, events go through Redis pub/sub instead and one Redis
+#   subscription per process fans them out, so events published by other processes (task workers) arrive too.
+# - A stream whose queue overflows is closed; the client reconnects and catches up with the ?since= change feeds.
+# - Streams end when their access token expires, so a logged-out user is cut off within ACCESS_TOKEN_LIFETIME.
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Called on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {} # channel -> set of Subscription
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self.lock:
+            for channel in channels:
+                self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscriptions[channel]
+
+    def deliver(self, channel, event):
+        # Safe from any thread: each subscriber's queue is only touched on its own loop
+        with self.lock:
+            subscribers = list(self.subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+
+class RedisBroker(Broker):
+    prefix = "events:"
+
+    def __init__(self, url):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("EVENTS_REDIS_URL is set but the redis package is not installed.")
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        self.listener = None
+
+    def subscribe(self, channels):
+        subscription = super().subscribe(channels)
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(self.listen())
+        return subscription
+
+    async def listen(self):
+        # One pattern subscription per process, fanned out to the local subscribers
+        import redis.asyncio
+
+        pubsub = redis.asyncio.Redis.from_url(self.url).pubsub()
+        await pubsub.psubscribe(f"{self.prefix}*")
+        async for message in pubsub.listen():
+            if message["type"] == "pmessage":
+                channel = message["channel"].decode().removeprefix(self.prefix)
+                self.deliver(channel, json.loads(message["data"]))
+
+    def publish(self, channel, event):
+        self.client.publish(f"{self.prefix}{channel}", json.dumps(event))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = RedisBroker(settings.EVENTS_REDIS_URL) if settings.EVENTS_REDIS_URL else Broker()
+        return _broker
+
+
+def publish_on_commit(channels, event):
+    # Publishing is best effort: a lost event only delays the client until its next change feed poll
+    def publish():
+        broker = get_broker()
+        for channel in channels:
+            try:
+                broker.publish(channel, event)
+            except Exception:
+                logger.exception("Could not publish %s to %s", event.get("type"), channel)
+    transaction.on_commit(publish)
+
+
+def authenticate(raw_token):
+    # Same rules as the API (JWTLogoutAuthentication: signature, expiry, logout); returns (user, expires_at)
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+    from .auth import JWTLogoutAuthentication
+
+    authenticator = JWTLogoutAuthentication()
+    try:
+        token = authenticator.get_validated_token(raw_token)
+        user = authenticator.get_user(token)
+        user.profile # loaded here, while we're on a thread that may touch the database
+        return user, token["exp"]
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None, None
+    finally:
+        close_old_connections()
+
+
+def channels_for(user):
+    # The same scopes the cached feeds use; events are published to them
+    from .caching import applicant_scope, company_scope
+    from .models import Profile
+
+    profile = user.profile
+    if profile.account_type == Profile.ACCOUNT_EMPLOYER and profile.company_id is not None:
+        return [company_scope(profile.company_id)]
+    return [applicant_scope(user.pk)]
+
+
+def raw_token_from(scope):
+    # EventSource can't set headers, so the token may also come as ?token=
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            kind, _, token = value.decode("latin-1").partition(" ")
+            if kind.lower() == "bearer" and token:
+                return token
+    tokens = parse_qs(scope.get("query_string", b"").decode()).get("token")
+    return tokens[0] if tokens else None
+
+
+async def respond(send, status, detail):
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def event_stream(scope, receive, send):
+    if scope["method"] != "GET":
+        return await respond(send, 405, 'Method "%s" not allowed.' % scope["method"])
+    raw_token = raw_token_from(scope)
+    if raw_token is None:
+        return await respond(send, 401, "Authentication credentials were not provided.")
+    user, expires_at = await sync_to_async(authenticate)(raw_token)
+    if user is None:
+        return await respond(send, 401, "Given token not valid for any token type")
+    channels = channels_for(user) # no queries, the profile was loaded by authenticate()
+
+    subscription = get_broker().subscribe(channels)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        headers = [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]
+        if getattr(settings, "CORS_ALLOW_ALL_ORIGINS", False):
+            headers.append((b"access-control-allow-origin", b"*"))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+        while not disconnected.done() and not subscription.overflowed:
+            timeout = min(settings.EVENTS_HEARTBEAT_SECONDS, expires_at - time.time())
+            if timeout <= 0:
+                break # token expired; the client reconnects with a fresh one
+            getter = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait({getter, disconnected}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                event = getter.result()
+                chunk = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                getter.cancel()
+                chunk = ": keepalive\n\n" # also how a dead connection gets noticed
+            if not disconnected.done():
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        if not disconnected.done():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        subscription.close()
+        disconnected.cancel()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
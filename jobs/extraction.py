@@ -0,0 +1,159 @@
+import html
+import multiprocessing
+import re
+import signal
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from django.conf import settings
+
+# Text extraction from uploaded resumes, run in a small process pool so parsing an untrusted document can't stall or
+# exhaust the worker that asked for it. Each child process runs with an address-space limit (EXTRACTION_MEMORY_LIMIT)
+# and every extraction with a wall-clock alarm (EXTRACTION_TIMEOUT) plus a CPU-time limit as a backstop; a child
+# that dies anyway breaks the pool, which is replaced. EXTRACTION_WORKERS = 0 extracts inline, without the limits.
+#
+# PDFs are read with pypdf when it is installed, otherwise by a small built-in reader that handles the text
+# operators of ordinary (uncompressed or Flate-compressed) PDFs. .docx, .txt and .md are read with the standard library.
+
+
+class ExtractionError(Exception):
+    pass
+
+
+PDF_STREAM_RE = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+PDF_TEXT_RE = re.compile(rb"\[((?:[^\]\\]|\\.)*)\]\s*TJ|\(((?:[^()\\]|\\.)*)\)\s*(?:Tj|'|\")|(T\*|Td|TD|ET)")
+PDF_STRING_RE = re.compile(rb"\(((?:[^()\\]|\\.)*)\)")
+PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"", b"f": b"", b"(": b"(", b")": b")", b"\\": b"\\"}
+XML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _unescape_pdf_string(raw):
+    def replace(match):
+        escaped = match.group(1)
+        if escaped[:1].isdigit():
+            return bytes([int(escaped, 8) & 0xFF])
+        return PDF_ESCAPES.get(escaped, escaped)
+    return re.sub(rb"\\([0-7]{1,3}|.)", replace, raw, flags=re.S).decode("latin-1")
+
+
+def _pdf_text_builtin(data):
+    parts = []
+    for match in PDF_STREAM_RE.finditer(data):
+        stream = match.group(1)
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass # Uncompressed, or a filter we don't read (images, fonts)
+        for array, string, operator in PDF_TEXT_RE.findall(stream):
+            if operator:
+                parts.append("\n")
+            elif array:
+                parts.append("".join(_unescape_pdf_string(item) for item in PDF_STRING_RE.findall(array)))
+            else:
+                parts.append(_unescape_pdf_string(string))
+    return "".join(parts)
+
+
+def _pdf_text(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return _pdf_text_builtin(Path(path).read_bytes())
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def _docx_text(path):
+    with zipfile.ZipFile(path) as archive:
+        xml = archive.read("word/document.xml").decode("utf-8")
+    xml = xml.replace("</w:p>", "\n").replace("<w:tab/>", "\t")
+    return html.unescape(XML_TAG_RE.sub("", xml))
+
+
+EXTRACTORS = {
+    ".pdf": _pdf_text,
+    ".docx": _docx_text,
+    ".txt": lambda path: Path(path).read_text(errors="replace"),
+    ".md": lambda path: Path(path).read_text(errors="replace"),
+}
+
+
+def _timed_out(signum, frame):
+    raise TimeoutError
+
+
+# Run in the pool's child processes (and _extract inline when EXTRACTION_WORKERS = 0); no Django settings needed
+def _limit_child(memory_limit):
+    import resource
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    signal.signal(signal.SIGALRM, _timed_out)
+
+
+def _extract(path, timeout, max_chars, limited=False):
+    extractor = EXTRACTORS.get(Path(path).suffix.lower())
+    if extractor is None:
+        raise ExtractionError(f"Can't extract text from {Path(path).suffix or 'extensionless'} files.")
+    if limited:
+        import resource
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime) + 1 + timeout
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard)) # SIGXCPU ends a runaway parse even if the alarm can't
+        signal.alarm(timeout)
+    try:
+        return " ".join(extractor(path).split())[:max_chars]
+    except TimeoutError:
+        raise ExtractionError(f"Extraction took longer than {timeout} seconds.")
+    except MemoryError:
+        raise ExtractionError("Extraction ran out of memory.")
+    except ExtractionError:
+        raise
+    except Exception as e: # Malformed documents fail in all sorts of ways inside the parsers
+        raise ExtractionError(f"Could not read the document: {e.__class__.__name__}: {e}")
+    finally:
+        if limited:
+            signal.alarm(0)
+
+
+_lock = threading.Lock()
+_state = {"config": None, "pool": None}
+
+
+def _config():
+    return (settings.EXTRACTION_WORKERS, settings.EXTRACTION_MEMORY_LIMIT)
+
+
+def _get_pool(replace=False):
+    # Created lazily per process and rebuilt if the settings change or a child died
+    config = _config()
+    with _lock:
+        if _state["config"] != config or replace:
+            if _state["pool"] is not None:
+                _state["pool"].shutdown(wait=False, cancel_futures=True)
+            workers, memory_limit = config
+            _state["pool"] = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"), initializer=_limit_child, initargs=(memory_limit,)
+            ) if workers else None
+            _state["config"] = config
+        return _state["pool"]
+
+
+def extract_text(path):
+    # Plain text of the document at path, whitespace collapsed and capped at EXTRACTION_MAX_CHARS.
+    # Raises ExtractionError for documents that can't be read within the limits; retrying those won't help.
+    timeout, max_chars = settings.EXTRACTION_TIMEOUT, settings.EXTRACTION_MAX_CHARS
+    pool = _get_pool()
+    if pool is None:
+        return _extract(str(path), timeout, max_chars)
+    future = pool.submit(_extract, str(path), timeout, max_chars, limited=True)
+    try:
+        return future.result(timeout=timeout + 5)
+    except (BrokenProcessPool, FutureTimeout):
+        # The child was killed (CPU or memory limit) or is wedged; start a fresh pool for the next document
+        _get_pool(replace=True)
+        raise ExtractionError("Extraction was stopped for exceeding its time or memory limit.")
@@ -0,0 +1,116 @@
+import csv
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.db.models import F, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+# Offline geocoding of free-text locations ("Austin, TX", "London, UK") against the bundled gazetteer,
+# plus the bounding box / haversine helpers used by radius search.
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / "data" / "gazetteer.csv"
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.19 # slightly under the true value so the box always contains the circle
+
+REGION_NAMES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "california": "ca", "colorado": "co", "connecticut": "ct",
+    "district of columbia": "dc", "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maryland": "md",
+    "massachusetts": "ma", "michigan": "mi", "minnesota": "mn", "missouri": "mo", "nebraska": "ne", "nevada": "nv",
+    "new jersey": "nj", "new mexico": "nm", "new york": "ny", "north carolina": "nc", "ohio": "oh", "oklahoma": "ok",
+    "oregon": "or", "pennsylvania": "pa", "rhode island": "ri", "tennessee": "tn", "texas": "tx", "utah": "ut",
+    "virginia": "va", "washington": "wa", "wisconsin": "wi",
+    "alberta": "ab", "british columbia": "bc", "manitoba": "mb", "ontario": "on", "quebec": "qc",
+    "england": "eng", "scotland": "sct",
+}
+COUNTRY_NAMES = {
+    "usa": "us", "united states": "us", "united states of america": "us", "canada": "ca", "mexico": "mx",
+    "uk": "gb", "united kingdom": "gb", "great britain": "gb", "ireland": "ie", "france": "fr", "germany": "de",
+    "netherlands": "nl", "belgium": "be", "switzerland": "ch", "austria": "at", "spain": "es", "portugal": "pt",
+    "italy": "it", "sweden": "se", "denmark": "dk", "norway": "no", "finland": "fi", "poland": "pl",
+    "czech republic": "cz", "czechia": "cz", "hungary": "hu", "greece": "gr", "turkey": "tr", "israel": "il",
+    "uae": "ae", "united arab emirates": "ae", "india": "in", "singapore": "sg", "hong kong": "hk", "china": "cn",
+    "japan": "jp", "south korea": "kr", "korea": "kr", "taiwan": "tw", "philippines": "ph", "indonesia": "id",
+    "thailand": "th", "australia": "au", "new zealand": "nz", "brazil": "br", "argentina": "ar", "colombia": "co",
+    "peru": "pe", "chile": "cl", "south africa": "za", "nigeria": "ng", "kenya": "ke", "egypt": "eg",
+}
+COORDINATES_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text.lower().replace(".", "")).strip()
+
+
+@lru_cache(maxsize=1)
+def _gazetteer():
+    # Maps "city", "city|region" and "city|country" keys to (latitude, longitude); bare city names go to the largest place
+    places = {}
+    with open(GAZETTEER_PATH, newline="", encoding="utf-8") as f:
+        rows = sorted(csv.DictReader(f), key=lambda row: -int(row["population"]))
+    for row in rows:
+        city = _normalize(row["name"])
+        point = (float(row["latitude"]), float(row["longitude"]))
+        keys = [city, f"{city}|{row['country'].lower()}"]
+        if row["region"]:
+            keys.append(f"{city}|{row['region'].lower()}")
+        for key in keys:
+            places.setdefault(key, point)
+    return places
+
+
+@lru_cache(maxsize=4096)
+def resolve_location(text):
+    # Returns (latitude, longitude) or None for unknown or non-physical locations such as "Remote"
+    if not text:
+        return None
+    match = COORDINATES_RE.match(text)
+    if match:
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            return latitude, longitude
+        return None
+
+    places = _gazetteer()
+    parts = [_normalize(part) for part in text.split(",") if part.strip()]
+    if not parts:
+        return None
+    city = parts[0]
+    # "Austin, TX", "Austin, Texas, USA", "London, UK"
+    for qualifier in parts[1:]:
+        qualifier = REGION_NAMES.get(qualifier, COUNTRY_NAMES.get(qualifier, qualifier))
+        point = places.get(f"{city}|{qualifier}")
+        if point is not None:
+            return point
+    return places.get(city)
+
+
+def bounding_box_q(latitude, longitude, radius_km, prefix=""):
+    # Cheap pre-filter that the (latitude, longitude) index can answer; it contains every point within radius_km
+    lat_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    min_lat, max_lat = max(latitude - lat_delta, -90), min(latitude + lat_delta, 90)
+    q = Q(**{f"{prefix}latitude__range": (min_lat, max_lat)})
+    if min_lat == -90 or max_lat == 90:
+        return q  # the circle covers a pole, so every longitude is in range
+
+    lon_delta = lat_delta / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if lon_delta >= 180:
+        return q
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+    if min_lon < -180: # the box wraps around the antimeridian
+        lon_q = Q(**{f"{prefix}longitude__gte": min_lon + 360}) | Q(**{f"{prefix}longitude__lte": max_lon})
+    elif max_lon > 180:
+        lon_q = Q(**{f"{prefix}longitude__gte": min_lon}) | Q(**{f"{prefix}longitude__lte": max_lon - 360})
+    else:
+        lon_q = Q(**{f"{prefix}longitude__range": (min_lon, max_lon)})
+    return q & lon_q
+
+
+def haversine_expression(latitude, longitude, prefix=""):
+    # Great-circle distance in km from a fixed point to the row's coordinates, evaluated by the database
+    lat = Radians(F(f"{prefix}latitude"))
+    lon = Radians(F(f"{prefix}longitude"))
+    origin_lat, origin_lon = math.radians(latitude), math.radians(longitude)
+    a = Power(Sin((lat - origin_lat) / 2), 2) + math.cos(origin_lat) * Cos(lat) * Power(Sin((lon - origin_lon) / 2), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
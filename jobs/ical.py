@@ -0,0 +1,78 @@
+from datetime import timezone as datetime_timezone
+
+from django.utils import timezone
+
+# Minimal RFC 5545 writer for interview feeds
+
+PRODID = "-//jobtracker//Interviews//EN"
+
+
+def escape_text(value):
+    return (
+        str(value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line):
+    # Content lines longer than 75 octets are folded with CRLF followed by a space
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Never split inside a multi-byte character
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_datetime(value):
+    return value.astimezone(datetime_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def interview_event(interview, for_employer, stamp):
+    application = interview.application
+    job = application.job
+    if for_employer:
+        summary = f"Interview: {application.applicant.username} for {job.title}"
+    else:
+        summary = f"Interview: {job.title} at {job.company.name}"
+    description = f"Interviewer: {interview.interviewer_name}\nFormat: {interview.get_means_of_interview_display()}"
+    if interview.notes:
+        description += f"\n\n{interview.notes}"
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:interview-{interview.id}@jobtracker",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{format_datetime(interview.interview_date)}",
+        f"DTEND:{format_datetime(interview.interview_end)}",
+        f"SUMMARY:{escape_text(summary)}",
+        f"DESCRIPTION:{escape_text(description)}",
+        "END:VEVENT",
+    ]
+    return "".join(fold_line(line) for line in lines)
+
+
+def render_calendar(interviews, name, for_employer):
+    # Yields the calendar piece by piece so large feeds are streamed rather than built up front
+    stamp = format_datetime(timezone.now())
+    yield "".join(fold_line(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ])
+    for interview in interviews:
+        yield interview_event(interview, for_employer, stamp)
+    yield fold_line("END:VCALENDAR")
@@ -0,0 +1,111 @@
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status as http_status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# Idempotency-Key support for mutating actions, so a client can safely retry a request whose response it never got.
+# The first request with a key claims it by inserting an IdempotencyKey row (unique per user and key), runs the
+# view and stores the response on the row; a retry with the same key replays that response without running the view.
+# A duplicate that arrives while the first is still running waits up to IDEMPOTENCY_WAIT seconds for its response,
+# so concurrent duplicates coalesce into one execution even across server processes.
+#
+# - Responses are kept for IDEMPOTENCY_KEY_TTL seconds (`manage.py prune_idempotency_keys` deletes older ones).
+# - Reusing a key for a different request (method, path or body) is a 422.
+# - Exceptions and 5xx responses release the key, since the request may not have happened; retries run the view again.
+# - A claim older than IDEMPOTENCY_LOCK_SECONDS is taken to be from a crashed request and can be taken over.
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05 # seconds, doubling up to MAX_POLL_INTERVAL while waiting for a duplicate to finish
+MAX_POLL_INTERVAL = 0.5
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.get_full_path()} {body}".encode()).hexdigest()
+
+
+def acquire(user, key, fingerprint):
+    # (record, owned): owned means this request took the claim and should run the view. Otherwise record is the
+    # finished request to replay, or one still running once IDEMPOTENCY_WAIT has passed.
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    interval = POLL_INTERVAL
+    while True:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, key=key, fingerprint=fingerprint), True
+        except IntegrityError:
+            pass
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            continue # Released by a failed attempt just now; claim it again
+        now = timezone.now()
+        finished = record.status_code is not None
+        expired = now - record.created_at > timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        abandoned = not finished and now - record.created_at > timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        if expired or abandoned:
+            # Compare-and-swap on created_at, so only one of several waiting duplicates takes it over
+            taken = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+                fingerprint=fingerprint, status_code=None, body=None, created_at=now,
+            )
+            if taken:
+                record.fingerprint, record.status_code, record.body, record.created_at = fingerprint, None, None, now
+                return record, True
+            continue
+        if finished or record.fingerprint != fingerprint or time.monotonic() >= deadline:
+            return record, False
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+
+def replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": f"This {HEADER} was already used for a different request."},
+            status=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return Response(
+            {"detail": f"A request with this {HEADER} is still being processed."},
+            status=http_status.HTTP_409_CONFLICT, headers={"Retry-After": "1"},
+        )
+    return Response(record.body, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(view_method):
+    # For viewset actions: requests carrying an Idempotency-Key run the action at most once per user and key
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters."}, status=http_status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, owned = acquire(request.user, key, fingerprint)
+        if not owned:
+            return replay(record, fingerprint)
+        claim = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at)
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except BaseException:
+            claim.delete()
+            raise
+        if response.status_code >= 500:
+            claim.delete()
+        else:
+            claim.update(status_code=response.status_code, body=response.data)
+        return response
+    return wrapper
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.archive import archive_closed_postings
+
+
+class Command(BaseCommand):
+    help = "Move job postings closed or expired for a while, and their applications, into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=settings.JOB_ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=100, help="Postings moved per transaction.")
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        postings, applications = archive_closed_postings(
+            timedelta(days=options["older_than_days"]),
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {postings} job postings and {applications} applications."))
@@ -0,0 +1,121 @@
+import json
+import random
+import sqlite3
+import time
+from contextlib import closing
+
+from django.core.management.base import BaseCommand
+
+
+# The two layouts compared, in plain SQLite so the benchmark never touches the project's databases:
+# - "rows": one answer row per (application, question), as JobAppAnswer stores them
+# - "json": one JSON object per application, {question_id: value}, in a column on the application
+SCHEMAS = {
+    "rows": """
+        CREATE TABLE question (id INTEGER PRIMARY KEY, job_id INTEGER, required INTEGER);
+        CREATE TABLE application (id INTEGER PRIMARY KEY, job_id INTEGER);
+        CREATE TABLE answer (
+            id INTEGER PRIMARY KEY, application_id INTEGER, question_id INTEGER, answer_value TEXT,
+            UNIQUE (application_id, question_id)
+        );
+        CREATE INDEX answer_question ON answer (question_id, answer_value);
+    """,
+    "json": """
+        CREATE TABLE question (id INTEGER PRIMARY KEY, job_id INTEGER, required INTEGER);
+        CREATE TABLE application (id INTEGER PRIMARY KEY, job_id INTEGER, answers TEXT NOT NULL DEFAULT '{}');
+    """,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare storing application answers as rows (JobAppAnswer) with a JSON column on the application: "
+        "bulk upsert, the required-answers check on submit, loading a page with answers, and filtering by an answer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--applications", type=int, default=20000)
+        parser.add_argument("--questions", type=int, default=8)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        applications, questions = options["applications"], options["questions"]
+        rng = random.Random(0)
+        values = [
+            {q: rng.choice(["yes", "no", "", str(rng.randint(0, 20))]) for q in range(1, questions + 1)}
+            for _ in range(applications)
+        ]
+        self.stdout.write(f"{applications} applications x {questions} questions")
+        results = {}
+        for layout in SCHEMAS:
+            with closing(sqlite3.connect(":memory:")) as db:
+                db.executescript(SCHEMAS[layout])
+                db.executemany("INSERT INTO question VALUES (?, 1, ?)", [(q, q % 2) for q in range(1, questions + 1)])
+                db.executemany("INSERT INTO application (id, job_id) VALUES (?, 1)", [(a,) for a in range(1, applications + 1)])
+                results[layout] = {
+                    "upsert": self.best(options["repeat"], lambda: getattr(self, f"upsert_{layout}")(db, values)),
+                    "required check": self.best(options["repeat"], lambda: [getattr(self, f"missing_{layout}")(db, a) for a in range(1, 1001)]),
+                    "page of 100": self.best(options["repeat"], lambda: [getattr(self, f"page_{layout}")(db, a) for a in range(1, applications, 100)]),
+                    "filter by answer": self.best(options["repeat"], lambda: getattr(self, f"filter_{layout}")(db)),
+                }
+
+        for operation in results["rows"]:
+            rows, json_column = results["rows"][operation], results["json"][operation]
+            self.stdout.write(f"  {operation:<18} rows {rows * 1000:8.1f} ms   json {json_column * 1000:8.1f} ms   json/rows {json_column / rows:5.2f}")
+
+    def best(self, repeat, operation):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            operation()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    # Saving every application's answers, one statement per request as the API does
+    def upsert_rows(self, db, values):
+        with db:
+            for application_id, answers in enumerate(values, start=1):
+                db.executemany(
+                    "INSERT INTO answer (application_id, question_id, answer_value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (application_id, question_id) DO UPDATE SET answer_value = excluded.answer_value",
+                    [(application_id, q, v) for q, v in answers.items()],
+                )
+
+    def upsert_json(self, db, values):
+        # A partial update has to merge into the stored object; json_patch does it without a read round trip
+        with db:
+            for application_id, answers in enumerate(values, start=1):
+                db.execute("UPDATE application SET answers = json_patch(answers, ?) WHERE id = ?", (json.dumps(answers), application_id))
+
+    def missing_rows(self, db, application_id):
+        return db.execute(
+            "SELECT q.id FROM question q JOIN application a ON a.job_id = q.job_id AND a.id = ? WHERE q.required AND NOT EXISTS "
+            "(SELECT 1 FROM answer s WHERE s.application_id = a.id AND s.question_id = q.id AND s.answer_value <> '')",
+            (application_id,),
+        ).fetchall()
+
+    def missing_json(self, db, application_id):
+        return db.execute(
+            "SELECT q.id FROM question q JOIN application a ON a.job_id = q.job_id AND a.id = ? WHERE q.required "
+            "AND COALESCE(json_extract(a.answers, '$.\"' || q.id || '\"'), '') = ''",
+            (application_id,),
+        ).fetchall()
+
+    def page_rows(self, db, first_id):
+        # Two queries, as the prefetch does: the page, then its answers
+        ids = [row[0] for row in db.execute("SELECT id FROM application WHERE id >= ? ORDER BY id LIMIT 100", (first_id,))]
+        placeholders = ",".join("?" * len(ids))
+        return db.execute(f"SELECT application_id, question_id, answer_value FROM answer WHERE application_id IN ({placeholders})", ids).fetchall()
+
+    def page_json(self, db, first_id):
+        return [
+            (application_id, json.loads(answers))
+            for application_id, answers in db.execute("SELECT id, answers FROM application WHERE id >= ? ORDER BY id LIMIT 100", (first_id,))
+        ]
+
+    def filter_rows(self, db):
+        return db.execute("SELECT application_id FROM answer WHERE question_id = 1 AND answer_value = 'yes'").fetchall()
+
+    def filter_json(self, db):
+        return db.execute("SELECT id FROM application WHERE json_extract(answers, '$.\"1\"') = 'yes'").fetchall()
@@ -0,0 +1,91 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from jobs.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure /api/job-postings/ latency while a burst of logins hits the same serving threads, "
+        "with inline hashing and with the password hashing pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--serving-threads", type=int, default=8, help="Threads standing in for the server's request workers.")
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument("--reads", type=int, default=200)
+        parser.add_argument("--workers", default="0,2", help="Comma-separated PASSWORD_HASH_WORKERS values to compare; 0 is inline.")
+
+    def handle(self, *args, **options):
+        user, created = User.objects.get_or_create(username="bench-login")
+        if created:
+            user.set_password("bench-pass-123")
+            user.save()
+        Profile.objects.filter(user=user).update(account_type=Profile.ACCOUNT_APPLICANT)
+
+        for workers in [int(w) for w in options["workers"].split(",")]:
+            # Throttling off: the storm is legitimate traffic, we only measure hashing contention
+            with override_settings(PASSWORD_HASH_WORKERS=workers, AUTH_THROTTLE_RATES={}):
+                self.storm(workers, options)
+
+    def storm(self, workers, options):
+        cache.clear()
+        local = threading.local()
+
+        def client():
+            if not hasattr(local, "client"):
+                local.client = APIClient(SERVER_NAME="localhost")
+            return local.client
+
+        access = client().post("/api/auth/login/", {"username": "bench-login", "password": "bench-pass-123"}, format="json").data["access"]
+
+        def login(submitted):
+            close_old_connections()
+            res = client().post("/api/auth/login/", {"username": "bench-login", "password": "bench-pass-123"}, format="json")
+            return "login", res.status_code, time.perf_counter() - submitted
+
+        def read(submitted):
+            close_old_connections()
+            res = client().get("/api/job-postings/", HTTP_AUTHORIZATION=f"Bearer {access}")
+            return "read", res.status_code, time.perf_counter() - submitted
+
+        # Logins and reads are queued on the same threads, so a read's latency includes waiting behind hashing
+        jobs = []
+        ratio = max(1, options["logins"] // max(1, options["reads"]))
+        logins, reads = options["logins"], options["reads"]
+        while logins or reads:
+            for _ in range(min(ratio, logins)):
+                jobs.append(login)
+                logins -= 1
+            if reads:
+                jobs.append(read)
+                reads -= 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["serving_threads"]) as pool:
+            results = [f.result() for f in [pool.submit(job, time.perf_counter()) for job in jobs]]
+        elapsed = time.perf_counter() - started
+
+        read_latencies = sorted(latency for kind, _, latency in results if kind == "read")
+        login_statuses = {}
+        for kind, status, _ in results:
+            if kind == "login":
+                login_statuses[status] = login_statuses.get(status, 0) + 1
+
+        label = "inline" if workers == 0 else f"pool of {workers}"
+        self.stdout.write(f"{label}: {len(jobs)} requests in {elapsed:.2f}s, logins by status {login_statuses}")
+        if len(read_latencies) >= 2:
+            p = statistics.quantiles(read_latencies, n=100)
+            self.stdout.write(
+                f"  /api/job-postings/ p50 {p[49] * 1000:7.1f} ms  p95 {p[94] * 1000:7.1f} ms  "
+                f"p99 {p[98] * 1000:7.1f} ms  max {read_latencies[-1] * 1000:7.1f} ms"
+            )
@@ -0,0 +1,61 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from jobs.models import Application, Company, JobPosting
+from jobs.renderers import MessagePackRenderer, ORJSONRenderer
+from jobs.serializers import ApplicationSerializer, JobPostingSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare encode time and payload size of the API renderers on large list responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        # Unsaved instances, so the benchmark never touches the database
+        company = Company(id=1, name="BenchCo")
+        applicant = User(id=1, username="bench")
+        jobs = [
+            JobPosting(
+                id=i, title=f"Engineer {i}", company=company, location="Austin, TX",
+                salary_range="80k-100k", description="Build things. " * 20, posted_date=date(2026, 1, 1),
+            )
+            for i in range(rows)
+        ]
+        applications = [
+            Application(id=i, applicant=applicant, job=job, notes="Looking forward to it.", application_date=date(2026, 1, 2))
+            for i, job in enumerate(jobs)
+        ]
+
+        payloads = {
+            "job-postings": JobPostingSerializer(jobs, many=True).data,
+            "applications": ApplicationSerializer(applications, many=True).data,
+        }
+        renderers = [
+            ("drf-json", JSONRenderer()),
+            ("orjson", ORJSONRenderer()),
+            ("msgpack", MessagePackRenderer()),
+        ]
+
+        for name, data in payloads.items():
+            self.stdout.write(f"{name} ({rows} rows)")
+            baseline = None
+            for label, renderer in renderers:
+                best = None
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    body = renderer.render(data)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                if baseline is None:
+                    baseline = best
+                self.stdout.write(
+                    f"  {label:<10} {best * 1000:8.1f} ms  {len(body) / 1024:9.1f} KiB  {baseline / best:5.1f}x"
+                )
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.notifications import dispatch
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox notifications in batches. Run a single dispatcher per deployment."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = dispatch(batch_size=options["batch_size"])
+            if stats.batches:
+                self.stdout.write(
+                    f"{stats.messages} messages -> {stats.notifications} notifications in {stats.batches} batches, "
+                    f"{stats.seconds:.2f}s ({stats.messages_per_second:.0f} msg/s), {stats.failures} failed notifications, "
+                    f"{stats.dead_lettered} messages dead-lettered"
+                )
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from jobs.models import JobPosting
+
+
+class Command(BaseCommand):
+    help = "Mark open job postings whose expiry date has passed as expired. Meant to run daily from a scheduler."
+
+    def handle(self, *args, **options):
+        expired = JobPosting.expire_due()
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} job postings."))
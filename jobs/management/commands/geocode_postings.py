@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from jobs.models import JobPosting
+from jobs.sharding import all_shards
+
+
+class Command(BaseCommand):
+    help = "Backfill job posting coordinates from their location strings using the offline gazetteer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--all", action="store_true", help="Re-geocode every posting, not only those without coordinates.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = JobPosting.objects.select_related("company").order_by("id")
+        if not options["all"]:
+            queryset = queryset.filter(latitude__isnull=True)
+
+        # Walk the table (on each shard) by primary key in batches so memory use and transaction size stay bounded
+        resolved, total = 0, 0
+        for alias in all_shards():
+            last_id = 0
+            while True:
+                batch = list(queryset.using(alias).filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                for posting in batch:
+                    posting.geocode()
+                    resolved += posting.latitude is not None
+                JobPosting.objects.using(alias).bulk_update(batch, ["latitude", "longitude"])
+                total += len(batch)
+                last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Geocoded {resolved} of {total} postings."))
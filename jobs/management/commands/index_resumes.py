@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from jobs.models import Application, CandidateDocument
+from jobs.sharding import all_shards
+from jobs.taskqueue import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue resume text extraction for applications whose current resume isn't indexed yet, e.g. after a backfill. "
+        "Indexing is idempotent, so re-running only queues what is missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retry-failed", action="store_true", help="Also re-extract documents that failed before.")
+        parser.add_argument("--force", action="store_true", help="Re-extract every resume, e.g. after improving the extractor.")
+
+    def handle(self, *args, **options):
+        queued = 0
+        for alias in all_shards():
+            applications = Application.objects.using(alias).exclude(resume="").exclude(resume__isnull=True)
+            if not options["force"]:
+                indexed = CandidateDocument.objects.using(alias).filter(application=OuterRef("pk"), source=OuterRef("resume"))
+                if not options["retry_failed"]:
+                    indexed = indexed.filter(status__in=[CandidateDocument.DONE, CandidateDocument.FAILED])
+                else:
+                    indexed = indexed.filter(status=CandidateDocument.DONE)
+                applications = applications.filter(~Exists(indexed))
+            for application_id in applications.values_list("pk", flat=True).iterator(chunk_size=500):
+                enqueue("index_resume", application_id=application_id, force=options["force"] or options["retry_failed"])
+                queued += 1
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} resumes for indexing."))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from jobs.models import Company
+from jobs.sharding import replicate, seed_id_range
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepare the company shards (DB_SHARDS=N): migrate each one, start its id range and copy the existing "
+        "users and companies onto it. Safe to re-run after adding shards or migrations."
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_SHARDS:
+            self.stdout.write("No shards configured; set DB_SHARDS=N to enable company sharding.")
+            return
+
+        for alias in settings.DATABASE_SHARDS:
+            call_command("migrate", database=alias, verbosity=0, interactive=False)
+            seed_id_range(alias)
+            self.stdout.write(self.style.SUCCESS(f"Migrated {alias}."))
+
+        # Saves from now on replicate through signals; this copies the rows that existed before
+        copied = 0
+        for model in (User, Company):
+            for instance in model.objects.using("default").order_by("pk").iterator(chunk_size=500):
+                replicate(instance)
+                copied += 1
+        self.stdout.write(self.style.SUCCESS(f"Copied {copied} users and companies to {len(settings.DATABASE_SHARDS)} shards."))
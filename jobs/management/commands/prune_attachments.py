@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.attachments import attachment_storage
+from jobs.models import Application, ArchivedApplication
+from jobs.sharding import all_shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored resumes and cover letters no application or archived application refers to any more. "
+        "Files are shared between applications, so they are never deleted along with one."
+    )
+
+    def add_arguments(self, parser):
+        # Files younger than this may belong to an upload whose transaction hasn't committed yet
+        parser.add_argument("--grace-hours", type=int, default=24)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options["grace_hours"] * 3600
+        deleted = 0
+        batch = []
+        for name in self.stored_files(cutoff):
+            batch.append(name)
+            if len(batch) >= options["batch_size"]:
+                deleted += self.prune(batch, options["dry_run"])
+                batch = []
+        if batch:
+            deleted += self.prune(batch, options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced attachments."))
+
+    def stored_files(self, cutoff):
+        # Storage names of the files older than cutoff, walked lazily so memory doesn't grow with the store
+        root = attachment_storage.location
+        for directory, _, files in os.walk(root):
+            relative = os.path.relpath(directory, root)
+            if relative.split(os.sep)[0] == attachment_storage.temp_dir:
+                continue
+            for file_name in files:
+                if os.path.getmtime(os.path.join(directory, file_name)) < cutoff:
+                    yield os.path.join(relative, file_name).replace(os.sep, "/")
+
+    def prune(self, names, dry_run):
+        referenced = set()
+        for alias in all_shards():
+            for model in (Application, ArchivedApplication):
+                for field in ("resume", "cover_letter"):
+                    referenced.update(model.objects.using(alias).filter(**{f"{field}__in": names}).values_list(field, flat=True))
+        unreferenced = [name for name in names if name not in referenced]
+        if not dry_run:
+            for name in unreferenced:
+                attachment_storage.delete(name)
+        return len(unreferenced)
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = "Delete change feed entries older than the retention period. Clients with older cursors get 410 and resync."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=settings.CHANGE_LOG_RETENTION_DAYS)
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        deleted = 0
+        while True:
+            # By id range in batches, so each delete stays short
+            ids = list(ChangeLog.objects.filter(changed_at__lt=cutoff).order_by("id").values_list("id", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            deleted += ChangeLog.objects.filter(id__lte=ids[-1], changed_at__lt=cutoff).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change log entries."))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL. Retries with those keys run again."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        deleted = 0
+        while True:
+            # By id range in batches, so each delete stays short
+            ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff).order_by("id").values_list("id", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__lte=ids[-1], created_at__lt=cutoff).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} idempotency keys."))
@@ -0,0 +1,20 @@
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+
+from jobs.models import JobPosting
+from jobs.recommend import get_index
+from jobs.sharding import all_shards
+
+
+class Command(BaseCommand):
+    help = "Rebuild the TF-IDF job posting index from scratch, recomputing IDF weights."
+
+    def handle(self, *args, **options):
+        documents = chain.from_iterable(
+            JobPosting.objects.using(alias).values_list("id", "title", "description").iterator(chunk_size=2000)
+            for alias in all_shards()
+        )
+        index = get_index()
+        index.rebuild(documents)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {len(index)} job postings."))
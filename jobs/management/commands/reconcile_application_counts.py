@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from jobs.models import Application, JobPosting
+from jobs.sharding import all_shards
+
+
+class Command(BaseCommand):
+    help = "Recount each job posting's application counters from the applications table and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Only report postings whose counters are off.")
+
+    def handle(self, *args, **options):
+        fields = ["application_count", *Application.STATUS_COUNTERS.values()]
+        checked, fixed = 0, 0
+        for alias in all_shards():
+            last_id = 0
+            while True:
+                # Lock the batch so in-flight F() updates apply on top of the recount instead of racing it
+                with transaction.atomic(using=alias):
+                    postings = list(JobPosting.objects.using(alias).select_for_update().filter(id__gt=last_id).order_by("id").only("id", *fields)[:options["batch_size"]])
+                    if not postings:
+                        break
+                    last_id = postings[-1].id
+                    counts = {}
+                    rows = (
+                        Application.objects.using(alias).filter(job_id__in=[posting.id for posting in postings])
+                        .values("job_id", "status").annotate(n=Count("id")).order_by()
+                    )
+                    for row in rows:
+                        counts.setdefault(row["job_id"], {})[row["status"]] = row["n"]
+
+                    drifted = []
+                    for posting in postings:
+                        by_status = counts.get(posting.id, {})
+                        expected = {field: by_status.get(status, 0) for status, field in Application.STATUS_COUNTERS.items()}
+                        expected["application_count"] = sum(n for status, n in by_status.items() if status != Application.DR)
+                        if any(getattr(posting, field) != value for field, value in expected.items()):
+                            self.stdout.write(f"Posting {posting.id}: " + ", ".join(
+                                f"{field} {getattr(posting, field)} -> {value}" for field, value in expected.items() if getattr(posting, field) != value
+                            ))
+                            for field, value in expected.items():
+                                setattr(posting, field, value)
+                            drifted.append(posting)
+                    if drifted and not options["dry_run"]:
+                        JobPosting.objects.using(alias).bulk_update(drifted, fields)
+                checked += len(postings)
+                fixed += len(drifted)
+
+        verb = "Found" if options["dry_run"] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} postings. {verb} {fixed} with drifted counters."))
@@ -0,0 +1,31 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.taskqueue import Worker, run_worker_pool
+
+
+class Command(BaseCommand):
+    help = "Run background task workers against the database task queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument("--task", action="append", dest="names", help="Only run tasks with this name (repeatable).")
+        parser.add_argument("--once", action="store_true", help="Run every task that is ready, then exit.")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            processed = Worker(options["names"]).drain()
+            self.stdout.write(f"Processed {processed} tasks.")
+            return
+
+        pool, stop_event = run_worker_pool(options["threads"], options["poll_interval"], options["names"])
+        # Let running tasks finish on Ctrl-C / SIGTERM; unfinished leases expire and are retried elsewhere
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+        self.stdout.write(f"Started {len(pool)} task workers.")
+        while any(thread.is_alive() for thread in pool):
+            for thread in pool:
+                thread.join(timeout=1)
+        self.stdout.write("Workers stopped.")
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the local SQLite stand-in replicas (DB_REPLICAS=N) with a consistent copy of the primary. "
+        "Real replicas are kept up to date by the database's own replication."
+    )
+
+    def handle(self, *args, **options):
+        primary = connections["default"]
+        if primary.vendor != "sqlite":
+            raise CommandError("sync_replicas only copies SQLite databases.")
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write("No replicas configured; set DB_REPLICAS=N to add local copies.")
+            return
+
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            # Replicas are opened read-only through a file: URI; the copy needs the plain path
+            path = str(settings.DATABASES[alias]["NAME"]).removeprefix("file:").split("?")[0]
+            # The backup API copies a transactionally consistent snapshot, even while the primary is being written,
+            # and readers with the replica open see the new contents from their next transaction
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"Copied the primary to {alias} ({path})."))
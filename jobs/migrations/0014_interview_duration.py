@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:19
+
+import datetime
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def fill_interview_end(apps, schema_editor):
+    Interview = apps.get_model('jobs', 'Interview')
+    db = schema_editor.connection.alias
+    interviews = list(Interview.objects.using(db).only('id', 'interview_date', 'duration_minutes'))
+    for interview in interviews:
+        interview.interview_end = interview.interview_date + datetime.timedelta(minutes=interview.duration_minutes)
+    Interview.objects.using(db).bulk_update(interviews, ['interview_end'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0013_jobposting_currency_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(480)]),
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='interview_end',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_interview_end, migrations.RunPython.noop, hints={'model_name': 'interview'}),
+        migrations.AlterField(
+            model_name='interview',
+            name='interview_end',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['interview_date'], name='interview_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['interviewer_name', 'interview_date'], name='interview_interviewer_date_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:05
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # The unique index can't be built over existing duplicates, and which account keeps an address isn't
+    # something a migration should decide; list them so they can be merged or changed by hand first.
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias).exclude(email='')
+        .values(address=Lower('email')).annotate(n=Count('id')).filter(n__gt=1)
+        .order_by('address').values_list('address', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Cannot add the unique email index: these addresses (compared case-insensitively) belong to "
+            f"more than one user: {', '.join(duplicates)}. Change or clear them, then migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0018_outboxmessage'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    # Registration relies on this index instead of checking for an existing email first.
+    # Partial, because users created outside registration (e.g. createsuperuser) may have no email,
+    # and on lower(email) because addresses differing only in case reach the same mailbox.
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX auth_user_email_unique ON auth_user (lower(email)) WHERE email <> ''",
+            reverse_sql="DROP INDEX auth_user_email_unique",
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0019_user_email_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('application_date', models.DateField()),
+                ('status', models.CharField(max_length=2)),
+                ('interview', models.JSONField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedJobPosting',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('location', models.CharField(max_length=100)),
+                ('employment_means', models.CharField(max_length=2)),
+                ('salary_range', models.CharField(blank=True, max_length=50, null=True)),
+                ('currency_code', models.CharField(max_length=3)),
+                ('description', models.TextField()),
+                ('posted_date', models.DateField()),
+                ('employment_type', models.CharField(max_length=2)),
+                ('status', models.CharField(max_length=2)),
+                ('expires_at', models.DateField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-posted_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='expires_at',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='status',
+            field=models.CharField(choices=[('OP', 'Open'), ('CL', 'Closed'), ('EX', 'Expired')], default='OP', max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name='jobposting',
+            index=models.Index(fields=['status', '-posted_date'], name='jobposting_status_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobposting',
+            index=models.Index(fields=['status', 'expires_at'], name='jobposting_status_expiry_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedapplication',
+            name='applicant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_applications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedjobposting',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_job_postings', to='jobs.company'),
+        ),
+        migrations.AddField(
+            model_name='archivedapplication',
+            name='job',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='jobs.archivedjobposting'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.1 on 2026-10-19 20:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+STATUS_COUNTERS = {'DR': 'draft_count', 'AP': 'applied_count', 'IN': 'interview_count', 'OF': 'offer_count', 'RE': 'rejected_count'}
+
+
+def backfill_counters(apps, schema_editor):
+    JobPosting = apps.get_model('jobs', 'JobPosting')
+    Application = apps.get_model('jobs', 'Application')
+    db = schema_editor.connection.alias
+    counts = {}
+    for row in Application.objects.using(db).values('job_id', 'status').annotate(n=Count('id')).order_by():
+        counts.setdefault(row['job_id'], {})[row['status']] = row['n']
+    postings = []
+    for posting in JobPosting.objects.using(db).filter(id__in=counts):
+        by_status = counts[posting.id]
+        for status, field in STATUS_COUNTERS.items():
+            setattr(posting, field, by_status.get(status, 0))
+        posting.application_count = sum(n for status, n in by_status.items() if status != 'DR')
+        postings.append(posting)
+    JobPosting.objects.using(db).bulk_update(postings, ['application_count', *STATUS_COUNTERS.values()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0020_jobposting_lifecycle_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobposting',
+            name='application_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='applied_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='draft_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='interview_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='offer_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='jobposting',
+            name='rejected_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop, hints={'model_name': 'jobposting'}),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0021_jobposting_application_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('resource', models.CharField(choices=[('job-postings', 'Job postings'), ('applications', 'Applications'), ('interviews', 'Interviews')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('company_id', models.BigIntegerField(blank=True, null=True)),
+                ('applicant_id', models.BigIntegerField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resource', 'id'], name='changelog_resource_idx'), models.Index(fields=['resource', 'company_id', 'id'], name='changelog_company_idx'), models.Index(fields=['resource', 'applicant_id', 'id'], name='changelog_applicant_idx')],
+            },
+        ),
+    ]
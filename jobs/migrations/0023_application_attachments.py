@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 23:10
+
+import jobs.attachments
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0022_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='cover_letter',
+            field=models.FileField(blank=True, null=True, storage=jobs.attachments.ContentAddressedStorage(), upload_to='cover-letters/', validators=[jobs.attachments.validate_attachment_size]),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='resume',
+            field=models.FileField(blank=True, null=True, storage=jobs.attachments.ContentAddressedStorage(), upload_to='resumes/', validators=[jobs.attachments.validate_attachment_size]),
+        ),
+        migrations.AddField(
+            model_name='archivedapplication',
+            name='cover_letter',
+            field=models.FileField(blank=True, null=True, storage=jobs.attachments.ContentAddressedStorage(), upload_to='cover-letters/'),
+        ),
+        migrations.AddField(
+            model_name='archivedapplication',
+            name='resume',
+            field=models.FileField(blank=True, null=True, storage=jobs.attachments.ContentAddressedStorage(), upload_to='resumes/'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-19 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0023_application_attachments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateDocument',
+            fields=[
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='candidate_document', serialize=False, to='jobs.application')),
+                ('source', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('PE', 'Pending'), ('DO', 'Done'), ('FA', 'Failed')], default='PE', max_length=2)),
+                ('text', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('extracted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'status'], name='candidatedoc_source_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CandidateTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_id', models.BigIntegerField()),
+                ('term', models.CharField(max_length=40)),
+                ('weight', models.FloatField()),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidate_terms', to='jobs.application')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company_id', 'term'], name='candidateterm_company_idx')],
+                'constraints': [models.UniqueConstraint(fields=('application', 'term'), name='unique_candidate_term')],
+            },
+        ),
+    ]
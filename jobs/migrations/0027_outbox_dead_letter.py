@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-20 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0026_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-20 09:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_company(apps, schema_editor):
+    CandidateDocument = apps.get_model('jobs', 'CandidateDocument')
+    Application = apps.get_model('jobs', 'Application')
+    db = schema_editor.connection.alias
+    company = Application.objects.using(db).filter(pk=OuterRef('application_id')).values('job__company_id')[:1]
+    CandidateDocument.objects.using(db).update(company_id=Subquery(company))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0027_outbox_dead_letter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidatedocument',
+            name='company_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_company, migrations.RunPython.noop, hints={'model_name': 'candidatedocument'}),
+        migrations.AddIndex(
+            model_name='candidatedocument',
+            index=models.Index(fields=['company_id', 'status'], name='candidatedoc_company_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-20 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0028_candidate_document_company'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='changelog_resource_idx',
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='employer_only',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['resource', 'employer_only', 'id'], name='changelog_resource_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-20 10:30
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0029_changelog_employer_only'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['application_date'], name='application_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'NOCASE'), name='company_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobposting',
+            index=models.Index(fields=['posted_date'], name='jobposting_posted_idx'),
+        ),
+    ]
@@ -1,10 +1,27 @@
-from django.db import models
+import datetime
+import secrets
+
+from django.db import models, connections, router, transaction
+from django.db.models.functions import Collate
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .attachments import attachment_storage, validate_attachment_size
+from .caching import applicant_scope, bump_scopes, company_scope
+from .events import publish_on_commit
+from .geo import resolve_location
+from .sharding import ShardedQuerySet, all_shards, shard_for_company, shard_for_pk
 
 # Create your models here.
 
+class TransitionConflict(Exception):
+    # Raised when another request changed an application's status between reading and updating it
+    pass
+
 class Profile(models.Model):
     ACCOUNT_APPLICANT = 'AP'
     ACCOUNT_EMPLOYER = 'EM'
@@ -19,6 +36,7 @@ class Profile(models.Model):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     company = models.ForeignKey('Company', on_delete=models.SET_NULL, blank=True, null=True)
     token_invalid_before = models.DateTimeField(default=timezone.make_aware(timezone.datetime.min))
+    calendar_token = models.CharField(max_length=64, unique=True, blank=True, null=True) # Secret for the iCalendar feed URL
 
     def clean(self):
         super().clean()
@@ -28,6 +46,12 @@ class Profile(models.Model):
             })
         # If the profile is an employer, a company association is not mandatory, so no need to validate that case.
 
+    def rotate_calendar_token(self):
+        # Issuing a new token revokes any previously shared feed URL
+        self.calendar_token = secrets.token_urlsafe(32)
+        self.save(update_fields=["calendar_token"])
+        return self.calendar_token
+
 
     def __str__(self):
         return f"{self.user.username} - {self.account_type}"
@@ -47,6 +71,10 @@ class Company(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        # NOCASE so the admin's case-insensitive name__istartswith (LIKE 'x%') is a range scan on SQLite
+        indexes = [models.Index(Collate('name', 'NOCASE'), name='company_name_idx')]
+
 class JobPosting(models.Model):
     title = models.CharField(max_length=100)
     company = models.ForeignKey(Company, on_delete=models.CASCADE) # Each job posting is linked to a company
@@ -78,16 +106,89 @@ class JobPosting(models.Model):
         ('CT', 'Contract'),
         ('IN', 'Internship'),
     ], default='FT')
+    # Resolved from location (or the company's location) with the offline gazetteer, used for radius search
+    latitude = models.FloatField(blank=True, null=True, editable=False)
+    longitude = models.FloatField(blank=True, null=True, editable=False)
+
+    OP = 'OP' ; CL = 'CL' ; EX = 'EX'
+    status = models.CharField(max_length=2, choices=[
+        (OP, 'Open'),
+        (CL, 'Closed'),
+        (EX, 'Expired'),
+    ], default=OP)
+    expires_at = models.DateField(blank=True, null=True) # Moved to Expired by `manage.py expire_job_postings` once past
+    closed_at = models.DateTimeField(blank=True, null=True, editable=False) # When it stopped being open; drives archival
+
+    # Denormalized from the applications (see Application.adjust_job_counters) so employer lists don't COUNT per posting;
+    # `manage.py reconcile_application_counts` repairs any drift
+    application_count = models.IntegerField(default=0, editable=False) # Submitted, i.e. non-draft, applications
+    draft_count = models.IntegerField(default=0, editable=False)
+    applied_count = models.IntegerField(default=0, editable=False)
+    interview_count = models.IntegerField(default=0, editable=False)
+    offer_count = models.IntegerField(default=0, editable=False)
+    rejected_count = models.IntegerField(default=0, editable=False)
+
+    objects = ShardedQuerySet.as_manager() # create() lands on the company's shard when sharding is on
+
+    def geocode(self):
+        point = resolve_location(self.location) or resolve_location(self.company.location)
+        self.latitude, self.longitude = point if point else (None, None)
+
+    COUNTER_FIELDS = ('application_count', 'draft_count', 'applied_count', 'interview_count', 'offer_count', 'rejected_count')
+
+    def save(self, *args, **kwargs):
+        self.geocode()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Never write back the counters loaded with this instance; they only change through F() updates
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude'}
+        super().save(*args, **kwargs)
+
+    def close(self):
+        # Compare-and-swap so a posting is only closed once; returns False if it was no longer open
+        now = timezone.now()
+        if not JobPosting.objects.using(shard_for_pk(self.pk)).filter(pk=self.pk, status=self.OP).update(status=self.CL, closed_at=now):
+            return False
+        self.status, self.closed_at = self.CL, now
+        ChangeLog.record(ChangeLog.JOB_POSTINGS, self.pk, self.company_id)
+        bump_scopes(company_scope(self.company_id))
+        return True
+
+    @classmethod
+    def expire_due(cls, today=None):
+        # Open postings whose expiry date has passed become Expired; returns how many
+        today = today or timezone.localdate()
+        expired = 0
+        for alias in all_shards():
+            due = cls.objects.using(alias).filter(status=cls.OP, expires_at__lt=today)
+            rows = list(due.values_list('id', 'company_id'))
+            expired += due.update(status=cls.EX, closed_at=timezone.now())
+            ChangeLog.record_many(ChangeLog.JOB_POSTINGS, [(posting_id, company_id, None) for posting_id, company_id in rows])
+            bump_scopes(*{company_scope(company_id) for _, company_id in rows})
+        return expired
 
     def __str__(self):
         return f"{self.title} at {self.company.name}"
     class Meta:
         ordering = ['-posted_date']  # Order job postings by the date they were posted, most recent first
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='jobposting_coordinates_idx'),
+            models.Index(fields=['status', '-posted_date'], name='jobposting_status_posted_idx'), # Applicant feed
+            models.Index(fields=['status', 'expires_at'], name='jobposting_status_expiry_idx'), # Expiry sweep
+            models.Index(fields=['posted_date'], name='jobposting_posted_idx'), # Admin date drill-down
+        ]
 
 class Application(models.Model):
     applicant = models.ForeignKey(User, on_delete=models.CASCADE) # Each application is linked to a profile
     job = models.ForeignKey(JobPosting, on_delete=models.CASCADE) # Each application is linked to a job posting
     notes = models.TextField(max_length=1000, blank=True, null=True, help_text="Additional notes for the employer")
+    # Stored by content hash and shared between applications, see attachments.py
+    resume = models.FileField(upload_to='resumes/', storage=attachment_storage, validators=[validate_attachment_size], blank=True, null=True)
+    cover_letter = models.FileField(upload_to='cover-letters/', storage=attachment_storage, validators=[validate_attachment_size], blank=True, null=True)
     application_date = models.DateField(auto_now_add=True)
     status = models.CharField(max_length=2, choices=[
         ('DR', 'Draft'),
@@ -105,22 +206,206 @@ class Application(models.Model):
         OF: set(),
         RE: set(),
     }
+    NOTIFY_STATUSES = {IN, OF, RE} # Employer decisions the applicant is notified about
+    SUBMITTED_STATUS_COUNTERS = {AP: 'applied_count', IN: 'interview_count', OF: 'offer_count', RE: 'rejected_count'} # What employers see
+    STATUS_COUNTERS = {DR: 'draft_count', **SUBMITTED_STATUS_COUNTERS}
+
+    objects = ShardedQuerySet.as_manager() # create() lands on the company's shard when sharding is on
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(Application, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            Application.adjust_job_counters(self.job_id, self.job.company_id, new_status=self.status)
+
+    @classmethod
+    def adjust_job_counters(cls, job_id, company_id, old_status=None, new_status=None):
+        # Moves one application between the posting's counters (None for created / deleted) with F() increments,
+        # so concurrent changes never overwrite each other. Call it in the same transaction as the change.
+        # company_id is the posting's, for its change feed entry; counters are only shown to the posting's employers,
+        # so applicants' posting feeds skip the entry.
+        deltas = {}
+        for status, step in ((old_status, -1), (new_status, 1)):
+            if status is None:
+                continue
+            fields = [cls.STATUS_COUNTERS[status]] + (['application_count'] if status != cls.DR else [])
+            for field in fields:
+                deltas[field] = deltas.get(field, 0) + step
+        updates = {field: models.F(field) + delta for field, delta in deltas.items() if delta}
+        if updates:
+            JobPosting.objects.using(shard_for_pk(job_id)).filter(pk=job_id).update(**updates)
+            ChangeLog.record(ChangeLog.JOB_POSTINGS, job_id, company_id, employer_only=True)
 
     def transition_status(self, new_status):
         if new_status not in self.ACCEPTED_STATUSES[self.status]:
             raise ValidationError(f"Cannot transition from status {self.status} to status {new_status}.")
+        db = router.db_for_write(Application, instance=self)
+        # Outbox and change log rows live on the primary; with company sharding the application's shard commits first,
+        # so a failure between the two commits loses the side effects rather than inventing them
+        with transaction.atomic(), transaction.atomic(using=db, savepoint=False):
+            # Compare-and-swap: the UPDATE only matches if the status is still the one validated above
+            updated = Application.objects.using(db).filter(pk=self.pk, status=self.status).update(status=new_status)
+            if updated == 0:
+                raise TransitionConflict(f"Application is no longer in status {self.status}; it was changed by another request.")
+            # Side effects only happen if this transition commits; the notification is delivered in the background
+            # by the outbox dispatcher
+            Application.adjust_job_counters(self.job_id, self.job.company_id, self.status, new_status)
+            ChangeLog.record(ChangeLog.APPLICATIONS, self.pk, self.job.company_id, self.applicant_id)
+            if new_status in self.NOTIFY_STATUSES:
+                OutboxMessage.objects.create(
+                    recipient_id=self.applicant_id,
+                    topic=OutboxMessage.APPLICATION_STATUS,
+                    payload={"application_id": self.pk, "old_status": self.status, "new_status": new_status},
+                )
+            bump_scopes(applicant_scope(self.applicant_id), company_scope(self.job.company_id))
+            publish_on_commit([applicant_scope(self.applicant_id), company_scope(self.job.company_id)], {
+                "type": "application_status", "application_id": self.pk, "job_id": self.job_id,
+                "old_status": self.status, "new_status": new_status,
+            })
         self.status = new_status
-        self.save(update_fields=['status'])
+
+    @classmethod
+    def get_or_create_draft(cls, applicant, job):
+        # Single INSERT ... ON CONFLICT DO NOTHING, so concurrent applies never race into the unique constraint.
+        # The row is only re-read when another request already created it.
+        db = shard_for_company(job.company_id) or router.db_for_write(cls)
+        connection = connections[db]
+        qn = connection.ops.quote_name
+        today = datetime.date.today()
+        with transaction.atomic(using=db), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {qn(cls._meta.db_table)} ({qn('applicant_id')}, {qn('job_id')}, {qn('status')}, {qn('application_date')}) "
+                f"VALUES (%s, %s, %s, %s) "
+                f"ON CONFLICT ({qn('applicant_id')}, {qn('job_id')}) DO NOTHING RETURNING {qn('id')}",
+                [applicant.pk, job.pk, cls.DR, connection.ops.adapt_datefield_value(today)],
+            )
+            row = cursor.fetchone()
+            if row is not None:
+                cls.adjust_job_counters(job.pk, job.company_id, new_status=cls.DR)
+                ChangeLog.record(ChangeLog.APPLICATIONS, row[0], job.company_id, applicant.pk)
+                bump_scopes(applicant_scope(applicant.pk), company_scope(job.company_id))
+
+        if row is not None:
+            application = cls(id=row[0], applicant=applicant, job=job, status=cls.DR, application_date=today)
+            application._state.adding = False
+            application._state.db = db
+            return application, True
+        return cls.objects.using(db).select_related('applicant').get(applicant=applicant, job=job), False
 
     def __str__(self):
         return f"{self.job.title} at {self.job.company.name} - {self.applicant.username}"
     
     class Meta:
         unique_together = ('applicant', 'job')  # Prevent duplicate applications for the same job by the same user
+        indexes = [models.Index(fields=['application_date'], name='application_date_idx')] # Admin date drill-down
+
+class JobAppQuestion(models.Model):
+    # Employer-defined question on a posting; applying creates a blank answer for each
+    SHORT = 'Short Answer' ; LONG = 'Long Answer' ; NUMBER = 'Number' ; DATE = 'Date' ; YES_NO = 'Yes/No' ; CHOICES = 'Choices'
+
+    job = models.ForeignKey(JobPosting, on_delete=models.CASCADE, related_name='questions')
+    question_prompt = models.CharField(max_length=255)
+    answer_type = models.CharField(max_length=20, choices=[
+        (SHORT, 'Short Answer'),
+        (LONG, 'Long Answer'),
+        (NUMBER, 'Number'),
+        (DATE, 'Date'),
+        (YES_NO, 'Yes/No'),
+        (CHOICES, 'Choices'),
+    ], default=LONG)
+    required = models.BooleanField(default=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.question_prompt} ({self.job.title})"
+
+    class Meta:
+        ordering = ['id']
+
+    def clean_answer(self, value):
+        # The answer as stored, or ValidationError if it doesn't fit answer_type. Blank means unanswered.
+        value = (value or '').strip()
+        if not value:
+            return ''
+        if self.answer_type == self.NUMBER:
+            try:
+                float(value)
+            except ValueError:
+                raise ValidationError("Enter a number.")
+        elif self.answer_type == self.DATE:
+            try:
+                valid = parse_date(value) is not None
+            except ValueError:
+                valid = False
+            if not valid:
+                raise ValidationError("Enter a date as YYYY-MM-DD.")
+        elif self.answer_type == self.YES_NO:
+            if value.lower() not in ('yes', 'no'):
+                raise ValidationError('Answer "Yes" or "No".')
+            value = value.capitalize()
+        elif self.answer_type == self.SHORT and len(value) > 255:
+            raise ValidationError("Short answers can be at most 255 characters.")
+        return value
+
+    @classmethod
+    def missing_required(cls, application):
+        # Ids of the posting's required questions the application has no non-blank answer to, in one query
+        answered = JobAppAnswer.objects.filter(application_id=application.pk, question=models.OuterRef('pk')).exclude(answer_value__isnull=True).exclude(answer_value='')
+        return list(
+            cls.objects.using(shard_for_pk(application.job_id))
+            .filter(job_id=application.job_id, required=True)
+            .exclude(models.Exists(answered))
+            .values_list('id', flat=True)
+        )
+
+
+class JobAppAnswer(models.Model):
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(JobAppQuestion, on_delete=models.CASCADE)
+    answer_value = models.TextField(blank=True, null=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Answer to {self.question_id} on application {self.application_id}"
+
+    @classmethod
+    def create_blank(cls, application):
+        # A blank answer for each of the posting's questions the application has none for yet (e.g. on apply)
+        db = shard_for_pk(application.job_id)
+        question_ids = JobAppQuestion.objects.using(db).filter(job_id=application.job_id).values_list('id', flat=True)
+        cls.objects.using(db).bulk_create(
+            [cls(application_id=application.pk, question_id=question_id) for question_id in question_ids],
+            ignore_conflicts=True, batch_size=500,
+        )
+
+    @classmethod
+    def upsert(cls, application, values):
+        # values: {question_id: answer_value}. One INSERT ... ON CONFLICT DO UPDATE for all of them.
+        db = shard_for_pk(application.job_id)
+        with transaction.atomic(using=db):
+            cls.objects.using(db).bulk_create(
+                [cls(application_id=application.pk, question_id=question_id, answer_value=value) for question_id, value in values.items()],
+                update_conflicts=True, unique_fields=['application', 'question'], update_fields=['answer_value'], batch_size=500,
+            )
+            # bulk_create sends no signals, so invalidate and log the application here
+            bump_scopes(applicant_scope(application.applicant_id), company_scope(application.job.company_id))
+            ChangeLog.record(ChangeLog.APPLICATIONS, application.pk, application.job.company_id, application.applicant_id)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['application', 'question'], name='unique_answer_per_question')]
+
 
 class Interview(models.Model):
+    MAX_DURATION_MINUTES = 8 * 60 # Upper bound on duration, lets overlap queries use a bounded range on interview_date
+
     application = models.OneToOneField(Application, on_delete=models.CASCADE) # Each interview is linked to an application
     interview_date = models.DateTimeField()
+    duration_minutes = models.PositiveIntegerField(default=60, validators=[MinValueValidator(5), MaxValueValidator(MAX_DURATION_MINUTES)])
+    interview_end = models.DateTimeField(editable=False) # Derived from interview_date + duration_minutes on save
     interviewer_name = models.CharField(max_length=100)
     notes = models.TextField(max_length=1000, blank=True, null=True)
     means_of_interview = models.CharField(max_length=2, choices=[
@@ -129,5 +414,238 @@ class Interview(models.Model):
         ('IN', 'In-Person'),
     ], default='PH')
 
+    objects = ShardedQuerySet.as_manager() # create() lands on the company's shard when sharding is on
+
+    def save(self, *args, **kwargs):
+        self.interview_end = self.interview_date + datetime.timedelta(minutes=self.duration_minutes)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ('interview_date' in update_fields or 'duration_minutes' in update_fields):
+            kwargs['update_fields'] = {*update_fields, 'interview_end'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def overlapping(cls, start, end, queryset=None):
+        # Interviews that overlap [start, end). Any overlapping interview must start after start - MAX_DURATION_MINUTES,
+        # so the lower bound keeps this an index range scan instead of a scan of every earlier interview.
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.filter(
+            interview_date__lt=end,
+            interview_date__gt=start - datetime.timedelta(minutes=cls.MAX_DURATION_MINUTES),
+            interview_end__gt=start,
+        )
+
+    @classmethod
+    def conflicting(cls, company, interviewer_name, start, end, exclude_pk=None):
+        # Interviews at the same company that would double-book this interviewer
+        queryset = cls.objects.using(shard_for_company(getattr(company, "pk", company))).filter(
+            interviewer_name=interviewer_name, application__job__company=company
+        )
+        return cls.overlapping(start, end, queryset).exclude(pk=exclude_pk)
+
+    def __str__(self):
+        return f"Interview for {self.application.job.title} with {self.interviewer_name} on {self.interview_date}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['interview_date'], name='interview_date_idx'),
+            models.Index(fields=['interviewer_name', 'interview_date'], name='interview_interviewer_date_idx'),
+        ]
+
+
+class CandidateDocument(models.Model):
+    # Text extracted from an application's resume in the background (see jobs/candidates.py). source is the stored
+    # file's name, i.e. its content hash, so reprocessing the same file is a no-op and its text can be reused.
+    PENDING = 'PE' ; DONE = 'DO' ; FAILED = 'FA'
+
+    application = models.OneToOneField(Application, on_delete=models.CASCADE, primary_key=True, related_name='candidate_document')
+    source = models.CharField(max_length=100)
+    status = models.CharField(max_length=2, choices=[
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ], default=PENDING)
+    text = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    extracted_at = models.DateTimeField(blank=True, null=True)
+    company_id = models.BigIntegerField(blank=True, null=True) # The posting's, as on CandidateTerm; searches count a company's documents
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Resume text for application {self.application_id} ({self.get_status_display()})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source', 'status'], name='candidatedoc_source_idx'), # Reuse by content hash
+            models.Index(fields=['company_id', 'status'], name='candidatedoc_company_idx'),
+        ]
+
+
+class CandidateTerm(models.Model):
+    # Inverted index over resume text, per company: one row per (application, term) with the term's weight in the
+    # document. company_id is the posting's, copied here so a search reads one company's slice of the index.
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='candidate_terms')
+    company_id = models.BigIntegerField()
+    term = models.CharField(max_length=40)
+    weight = models.FloatField()
+
+    objects = ShardedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.term} ({self.weight:.2f}) in application {self.application_id}"
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['application', 'term'], name='unique_candidate_term')]
+        indexes = [models.Index(fields=['company_id', 'term'], name='candidateterm_company_idx')]
+
+
+class Task(models.Model):
+    # Durable background task, see jobs/taskqueue.py
+    PENDING = 'PE' ; RUNNING = 'RU' ; DONE = 'DO' ; FAILED = 'FA'
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=2, choices=[
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ], default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now) # Not claimable before this time (used for retry backoff)
+    locked_until = models.DateTimeField(blank=True, null=True) # Visibility timeout of a running task; expired leases can be reclaimed
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.get_status_display()})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_claim_idx'),
+            models.Index(fields=['status', 'locked_until'], name='task_lease_idx'),
+        ]
+
+
+class OutboxMessage(models.Model):
+    # Transactional outbox: written in the same transaction as the change it describes,
+    # deleted by the dispatcher (jobs/notifications.py) once delivered
+    APPLICATION_STATUS = 'application_status'
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    failed_at = models.DateTimeField(blank=True, null=True) # Dead-lettered after NOTIFICATION_MAX_ATTEMPTS; kept, never retried
+
+    def __str__(self):
+        return f"{self.topic} for user {self.recipient_id}"
+
+
+class ChangeLog(models.Model):
+    # Append-only sequence of row changes behind the ?since= delta feeds; an entry only says which row changed, the
+    # feed reads the row itself. Plain ids rather than foreign keys, so entries outlive the rows they describe
+    # (tombstones). Written in the same transaction as the change where the change is on the primary.
+    JOB_POSTINGS = 'job-postings' ; APPLICATIONS = 'applications' ; INTERVIEWS = 'interviews'
+
+    id = models.BigAutoField(primary_key=True) # The feed cursor
+    resource = models.CharField(max_length=20, choices=[
+        (JOB_POSTINGS, 'Job postings'),
+        (APPLICATIONS, 'Applications'),
+        (INTERVIEWS, 'Interviews'),
+    ])
+    object_id = models.BigIntegerField()
+    company_id = models.BigIntegerField(blank=True, null=True) # Whose employers see the row
+    applicant_id = models.BigIntegerField(blank=True, null=True) # Which applicant sees it, for applications and interviews
+    employer_only = models.BooleanField(default=False) # A change only employers can see, e.g. a posting's counters
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def record(cls, resource, object_id, company_id, applicant_id=None, employer_only=False):
+        cls.objects.create(resource=resource, object_id=object_id, company_id=company_id, applicant_id=applicant_id, employer_only=employer_only)
+
+    @classmethod
+    def record_many(cls, resource, rows):
+        # rows of (object_id, company_id, applicant_id)
+        cls.objects.bulk_create(
+            [cls(resource=resource, object_id=object_id, company_id=company_id, applicant_id=applicant_id) for object_id, company_id, applicant_id in rows],
+            batch_size=500,
+        )
+
+    @classmethod
+    def latest_cursor(cls):
+        return cls.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def __str__(self):
+        return f"{self.resource} {self.object_id} (#{self.id})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'employer_only', 'id'], name='changelog_resource_idx'), # Applicant job feed
+            models.Index(fields=['resource', 'company_id', 'id'], name='changelog_company_idx'),
+            models.Index(fields=['resource', 'applicant_id', 'id'], name='changelog_applicant_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    # A client's Idempotency-Key for a mutating request and, once it finished, the response to replay for retries
+    # (see jobs/idempotency.py). Rows without a status_code are claimed by a request that is still running.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64) # SHA-256 of method, path and body, so a reused key can be told apart
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    body = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now) # When the current claim was taken
+
+    def __str__(self):
+        return f"{self.key} for user {self.user_id}"
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user')]
+        indexes = [models.Index(fields=['created_at'], name='idempotency_created_idx')] # Pruning
+
+
+class ArchivedJobPosting(models.Model):
+    # Cold copy of a closed or expired JobPosting, keeping its id; moved by `manage.py archive_job_postings`
+    # so the hot table and its indexes only hold postings that are still in use. Codes are as on JobPosting.
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=100)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='archived_job_postings')
+    location = models.CharField(max_length=100)
+    employment_means = models.CharField(max_length=2)
+    salary_range = models.CharField(max_length=50, blank=True, null=True)
+    currency_code = models.CharField(max_length=3)
+    description = models.TextField()
+    posted_date = models.DateField()
+    employment_type = models.CharField(max_length=2)
+    status = models.CharField(max_length=2)
+    expires_at = models.DateField(blank=True, null=True)
+    closed_at = models.DateTimeField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.title} at {self.company.name} (archived)"
+
+    class Meta:
+        ordering = ['-posted_date']
+
+
+class ArchivedApplication(models.Model):
+    # Cold copy of an Application to an archived posting, keeping its id
+    id = models.BigIntegerField(primary_key=True)
+    applicant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_applications')
+    job = models.ForeignKey(ArchivedJobPosting, on_delete=models.CASCADE, related_name='applications')
+    notes = models.TextField(blank=True, null=True)
+    resume = models.FileField(upload_to='resumes/', storage=attachment_storage, blank=True, null=True)
+    cover_letter = models.FileField(upload_to='cover-letters/', storage=attachment_storage, blank=True, null=True)
+    application_date = models.DateField()
+    status = models.CharField(max_length=2)
+    interview = models.JSONField(blank=True, null=True) # Snapshot of the interview, if one was scheduled
+    answers = models.JSONField(blank=True, null=True) # Snapshot of the question answers, [{question_prompt, answer_value}, ...]
+
     def __str__(self):
-        return f"Interview for {self.application.job.title} with {self.interviewer_name} on {self.interview_date}"
\ No newline at end of file
+        return f"{self.job.title} - {self.applicant.username} (archived)"
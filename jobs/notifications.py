@@ -0,0 +1,171 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import get_connection, EmailMessage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Application, OutboxMessage
+from .sharding import in_bulk
+
+# Drains the outbox in batches and delivers one coalesced notification per recipient through a pluggable sink.
+# A recipient's messages are deleted only after the sink delivered their notification, so delivery is at-least-once:
+# a crash between delivery and deletion sends the same changes again.
+#
+# Sinks report failures per recipient (deliver() returns {recipient_id: error}; raising fails the whole batch), so one
+# bad address doesn't hold back or resend the rest of its batch. A recipient's messages are retried on later runs and
+# dead-lettered (failed_at set, kept for inspection) after NOTIFICATION_MAX_ATTEMPTS failed deliveries.
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Notification:
+    recipient_id: int
+    username: str
+    email: str
+    changes: list # [{"application_id", "job_title", "company", "old_status", "new_status"}], oldest first
+
+
+@dataclass
+class DispatchStats:
+    messages: int = 0
+    notifications: int = 0
+    batches: int = 0
+    failures: int = 0 # Notifications not delivered
+    dead_lettered: int = 0 # Messages given up on
+    seconds: float = 0.0
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+        return self
+
+    @property
+    def messages_per_second(self):
+        return self.messages / self.seconds if self.seconds else 0.0
+
+
+class FileSink:
+    # Appends one JSON line per notification; the local stand-in for a real delivery channel
+    def __init__(self, path=None):
+        self.path = Path(path or settings.NOTIFICATION_FILE)
+
+    def deliver(self, notifications):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for notification in notifications:
+                f.write(json.dumps(notification.__dict__) + "\n")
+        return {}
+
+
+class EmailSink:
+    # Sends through Django's email backend (SMTP in production, locmem in tests) over one connection per batch
+    status_labels = dict(Application._meta.get_field("status").choices)
+
+    def deliver(self, notifications):
+        failed = {}
+        # One message at a time over a shared connection, so a rejected address only fails its own recipient
+        with get_connection(fail_silently=False) as connection:
+            for notification in notifications:
+                if not notification.email:
+                    continue
+                message = EmailMessage(
+                    subject="Update on your job applications",
+                    body="\n".join(
+                        f"{change['job_title']} at {change['company']}: {self.status_labels.get(change['new_status'], change['new_status'])}"
+                        for change in notification.changes
+                    ),
+                    to=[notification.email],
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    failed[notification.recipient_id] = f"{e.__class__.__name__}: {e}"
+        return failed
+
+
+def get_sink():
+    return import_string(settings.NOTIFICATION_SINK)()
+
+
+def coalesce(messages):
+    # One notification per recipient; repeated changes to the same application collapse into the latest one
+    applications = in_bulk(
+        Application.objects.select_related("applicant", "job__company"),
+        {message.payload["application_id"] for message in messages},
+    )
+    per_recipient = OrderedDict()
+    for message in messages:
+        application = applications.get(message.payload["application_id"])
+        if application is None: # deleted since the change was recorded
+            continue
+        notification = per_recipient.get(message.recipient_id)
+        if notification is None:
+            notification = per_recipient[message.recipient_id] = Notification(
+                message.recipient_id, application.applicant.username, application.applicant.email, []
+            )
+        change = {
+            "application_id": application.id,
+            "job_title": application.job.title,
+            "company": application.job.company.name,
+            "old_status": message.payload["old_status"],
+            "new_status": message.payload["new_status"],
+        }
+        previous = next((c for c in notification.changes if c["application_id"] == application.id), None)
+        if previous is None:
+            notification.changes.append(change)
+        else:
+            previous["new_status"] = change["new_status"]
+    return list(per_recipient.values())
+
+
+def dispatch(batch_size=500, max_batches=None, sink=None):
+    # Drains the outbox until it is empty (or max_batches), returning throughput stats
+    sink = sink or get_sink()
+    stats = DispatchStats()
+    last_id = 0
+    while max_batches is None or stats.batches < max_batches:
+        batch = list(
+            OutboxMessage.objects.filter(topic=OutboxMessage.APPLICATION_STATUS, failed_at__isnull=True, id__gt=last_id)
+            .order_by("id")[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        stats.batches += 1
+        notifications = coalesce(batch)
+        try:
+            failed = sink.deliver(notifications) or {}
+        except Exception as e:
+            # Nothing in the batch was delivered
+            logger.exception("Notification batch of %s messages failed", len(batch))
+            failed = {notification.recipient_id: f"{e.__class__.__name__}: {e}" for notification in notifications}
+
+        failed_ids = []
+        for error in set(failed.values()):
+            ids = [message.id for message in batch if failed.get(message.recipient_id) == error]
+            OutboxMessage.objects.filter(id__in=ids).update(attempts=F("attempts") + 1, last_error=error)
+            failed_ids.extend(ids)
+        if failed_ids:
+            stats.dead_lettered += OutboxMessage.objects.filter(id__in=failed_ids, attempts__gte=settings.NOTIFICATION_MAX_ATTEMPTS).update(failed_at=timezone.now())
+        delivered = [message.id for message in batch if message.recipient_id not in failed]
+        OutboxMessage.objects.filter(id__in=delivered).delete()
+        stats.messages += len(delivered)
+        stats.notifications += len(notifications) - len(failed)
+        stats.failures += len(failed)
+    stats.finish()
+    if stats.batches:
+        logger.info(
+            "Dispatched %s outbox messages as %s notifications in %s batches (%.0f msg/s, %s failed notifications, %s messages dead-lettered)",
+            stats.messages, stats.notifications, stats.batches, stats.messages_per_second, stats.failures, stats.dead_lettered,
+        )
+    if stats.dead_lettered:
+        logger.error("%s outbox messages reached NOTIFICATION_MAX_ATTEMPTS and will not be retried", stats.dead_lettered)
+    return stats
@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from .sharding import evaluate, fan_out, needs_fan_out
+
+# Counting every matching row is the slowest part of paging through a large table. Counts are exact up to
+# EXACT_COUNT_THRESHOLD (a COUNT over at most that many rows), and above it fall back to the database's own
+# estimate where it has one for the query, so "page 1 of ~4,000" costs the same as "page 1 of 3". A view can supply
+# a cheaper count of its own, e.g. from maintained counters, with count_hint(queryset) -> (count, is_approximate) or None.
+
+
+def bounded_count(queryset, limit):
+    # COUNT(*) over a LIMITed subquery, so it stops after limit + 1 rows
+    return queryset.order_by()[:limit + 1].count()
+
+
+def planner_estimate(queryset):
+    # The database's row estimate: the query plan's on PostgreSQL, the table's ANALYZE statistics on SQLite.
+    # SQLite's are the whole table's, so filtered querysets get None there, as they do when there are no statistics.
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            return int(plan[0]["Plan"]["Plan Rows"])
+        if connection.vendor == "sqlite":
+            if queryset.query.has_filters():
+                return None
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+def estimate_count(queryset, threshold=None):
+    # Returns (count, is_approximate)
+    threshold = settings.EXACT_COUNT_THRESHOLD if threshold is None else threshold
+    count = bounded_count(queryset, threshold)
+    if count <= threshold:
+        return count, False
+    estimate = planner_estimate(queryset)
+    if estimate is None and queryset.query.has_filters():
+        return queryset.count(), False # e.g. one company's rows on SQLite; the table's size would misstate the pages
+    return max(estimate or 0, count), True
+
+
+class MergedShards:
+    # A queryset that fans out to every shard, as a paginator's object list. Page n is merged from the first
+    # n * page_size rows of each shard (each shard sorts and sends no more), and the count is the shards' counts summed.
+    ordered = True # The pagination orders querysets before wrapping them
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def estimate_count(self):
+        counts = fan_out(lambda alias: estimate_count(self.queryset.using(alias)))
+        return sum(count for count, _ in counts), any(approximate for _, approximate in counts)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None or key.stop is None:
+            raise TypeError("MergedShards only supports bounded slices.")
+        return evaluate(self.queryset, limit=key.stop)[key.start or 0:]
+
+
+class EstimatedCountPaginator(Paginator):
+    # Django paginator, used as is by the admin's change lists
+    count_is_approximate = False
+    count_hint = None
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, MergedShards):
+            count, self.count_is_approximate = self.object_list.estimate_count()
+            return count
+        if not hasattr(self.object_list, "query"):
+            return super().count
+        hint = self.count_hint(self.object_list) if self.count_hint else None
+        count, self.count_is_approximate = hint if hint is not None else estimate_count(self.object_list)
+        return count
+
+    def page(self, number):
+        if not self.count or not self.count_is_approximate:
+            return super().page(number)
+        # An estimate can be off either way, so pages aren't clamped to it; one extra row tells whether more follow
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        self.count = max(self.count, bottom + len(rows)) # so has_next() is right when the estimate is low
+        return self._get_page(rows[:self.per_page], number, self)
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    # Opt-in: lists stay plain arrays unless ?page= is given, so existing clients keep working
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def django_paginator_class(self, queryset, page_size):
+        paginator = EstimatedCountPaginator(queryset, page_size)
+        paginator.count_hint = self.count_hint
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params:
+            return None
+        self.count_hint = getattr(view, "count_hint", None)
+        if not queryset.ordered:
+            queryset = queryset.order_by("-pk") # Pages need a stable order; newest first
+        if needs_fan_out(queryset):
+            queryset = MergedShards(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "count_is_approximate": self.page.paginator.count_is_approximate,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_approximate"] = {"type": "boolean"}
+        return response_schema
@@ -0,0 +1,103 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, is_password_usable
+
+# Password hashing (PBKDF2 by default) is deliberately slow, so it runs in a small process pool instead of on the
+# serving threads. Admission is bounded: at most PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE hashes are in flight per
+# process, and a request that can't get a slot within PASSWORD_HASH_WAIT seconds is shed with HashingUnavailable.
+# PASSWORD_HASH_WORKERS = 0 hashes inline on the calling thread, without admission control.
+
+
+class HashingUnavailable(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Password hashing is at capacity.")
+        self.retry_after = retry_after
+
+
+# Run in the pool's child processes; the hasher instance is pickled over, so the child never needs Django settings
+def _encode(hasher, password, salt):
+    return hasher.encode(password, salt)
+
+
+def _verify(hasher, password, encoded):
+    return hasher.verify(password, encoded)
+
+
+def _harden_runtime(hasher, password, encoded):
+    hasher.harden_runtime(password, encoded)
+
+
+_lock = threading.Lock()
+_state = {"config": None, "pool": None, "admission": None}
+
+
+def _config():
+    return (
+        settings.PASSWORD_HASH_WORKERS,
+        settings.PASSWORD_HASH_QUEUE,
+    )
+
+
+def _get_pool():
+    # Created lazily per process (after any server fork) and rebuilt if the settings change
+    config = _config()
+    with _lock:
+        if _state["config"] != config:
+            if _state["pool"] is not None:
+                _state["pool"].shutdown(wait=False, cancel_futures=True)
+            workers, queue = config
+            _state["pool"] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if workers else None
+            _state["admission"] = threading.BoundedSemaphore(workers + queue) if workers else None
+            _state["config"] = config
+        return _state["pool"], _state["admission"]
+
+
+@contextmanager
+def admitted():
+    pool, admission = _get_pool()
+    if admission is None:
+        yield pool
+        return
+    if not admission.acquire(timeout=settings.PASSWORD_HASH_WAIT):
+        raise HashingUnavailable(settings.PASSWORD_HASH_RETRY_AFTER)
+    try:
+        yield pool
+    finally:
+        admission.release()
+
+
+def _run(func, *args):
+    with admitted() as pool:
+        if pool is None:
+            return func(*args)
+        return pool.submit(func, *args).result()
+
+
+def hash_password(password):
+    # Offloaded equivalent of django.contrib.auth.hashers.make_password
+    hasher = get_hasher("default")
+    return _run(_encode, hasher, password, hasher.salt())
+
+
+def check_password(password, encoded):
+    # Offloaded equivalent of django.contrib.auth.hashers.check_password. Returns (is_correct, must_update);
+    # the caller re-hashes with hash_password() when must_update is set.
+    if password is None or not is_password_usable(encoded):
+        return False, False
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, False
+
+    preferred = get_hasher("default")
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    is_correct = _run(_verify, hasher, password, encoded)
+    # Same as Django: a wrong password against an outdated hash takes as long as against a current one
+    if not is_correct and not hasher_changed and must_update:
+        _run(_harden_runtime, hasher, password, encoded)
+    return is_correct, is_correct and must_update
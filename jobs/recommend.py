@@ -0,0 +1,337 @@
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+# TF-IDF index over job posting titles and descriptions used for "similar jobs" and recommendations.
+#
+# On disk the index is an immutable base segment (CSR arrays saved as .npy and opened with mmap_mode="r", so every
+# worker process shares the same pages) plus a small delta segment and tombstone list kept in manifest.json.
+# Rows are stored L2-normalised, so cosine similarity is a sparse dot product. IDF weights are fixed when the base is
+# built; terms first seen by incremental adds get the IDF of a term that appears in a single document.
+# Each time the delta grows by another COMPACT_AFTER rows, a "compact_job_index" task (jobs/tasks.py) merges it into a
+# new base generation, off the request that saved the posting.
+# Request threads in one process share the index object, so reads and in-place updates (add/remove append to terms,
+# idf and the delta) hold an RLock; a query never sees a vocabulary grown past its column arrays, or a half-loaded manifest.
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this to we will with you your".split()
+)
+TITLE_WEIGHT = 2 # Title terms count double compared to description terms
+COMPACT_AFTER = 1000
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or "").lower()) if token not in STOP_WORDS and len(token) > 1]
+
+
+def posting_terms(title, description):
+    counts = Counter(tokenize(description))
+    for token in tokenize(title):
+        counts[token] += TITLE_WEIGHT
+    return counts
+
+
+def _csr(rows, columns):
+    # rows: list of (column indices, weights) pairs
+    indptr, indices, data = [0], [], []
+    for row_columns, row_weights in rows:
+        indices.extend(row_columns)
+        data.extend(row_weights)
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(rows), columns),
+    )
+
+
+class JobIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._load()
+
+    # --- persistence ---
+
+    def _manifest_path(self):
+        return self.path / "manifest.json"
+
+    def _state(self):
+        # Changes whenever a writer (in any process) publishes a new manifest
+        try:
+            stat = self._manifest_path().stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _load(self):
+        self._loaded_state = self._state()
+        if self._loaded_state is None:
+            self.generation, self.documents = 0, 0
+            self.terms, self.idf = [], np.zeros(0, dtype=np.float32)
+            self.base, self.base_ids = _csr([], 0), np.zeros(0, dtype=np.int64)
+            self.delta, self.delta_ids, self.tombstones = _csr([], 0), [], set()
+        else:
+            manifest = json.loads(self._manifest_path().read_text())
+            self.generation = manifest["generation"]
+            self.documents = manifest["documents"]
+            base_dir = self.path / f"base-{self.generation}"
+            extra_terms = manifest["extra_terms"]
+            self.terms = json.loads((base_dir / "terms.json").read_text()) + [term for term, _ in extra_terms]
+            self.idf = np.concatenate([np.load(base_dir / "idf.npy"), np.asarray([idf for _, idf in extra_terms], dtype=np.float32)])
+            base_columns = len(self.terms) - len(extra_terms)
+            self.base_ids = np.load(base_dir / "ids.npy", mmap_mode="r")
+            self.base = sparse.csr_matrix(
+                (np.load(base_dir / "data.npy", mmap_mode="r"),
+                 np.load(base_dir / "indices.npy", mmap_mode="r"),
+                 np.load(base_dir / "indptr.npy", mmap_mode="r")),
+                shape=(len(self.base_ids), base_columns),
+                copy=False,
+            )
+            delta = manifest["delta"]
+            self.delta_ids = delta["ids"]
+            self.delta = _csr(list(zip(delta["indices"], delta["data"])), len(self.terms))
+            self.tombstones = set(manifest["tombstones"])
+        self.columns = {term: column for column, term in enumerate(self.terms)}
+
+    def refresh(self):
+        # Cheap stat() check; reload only if another process published changes
+        with self._lock:
+            if self._state() != self._loaded_state:
+                try:
+                    self._load()
+                except FileNotFoundError: # a writer replaced the generation while we were reading it
+                    self._load()
+
+    @contextmanager
+    def _writing(self):
+        # Writers in different processes are serialised with an exclusive file lock, threads in this one by self._lock
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path / "index.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_base(self, matrix, ids, columns):
+        # Base rows are sorted by posting id so lookups are a binary search
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        matrix = sparse.csr_matrix(matrix)[order]
+        generation = self.generation + 1
+        base_dir = self.path / f"base-{generation}"
+        shutil.rmtree(base_dir, ignore_errors=True)
+        base_dir.mkdir(parents=True)
+        np.save(base_dir / "data.npy", matrix.data.astype(np.float32))
+        np.save(base_dir / "indices.npy", matrix.indices.astype(np.int32))
+        np.save(base_dir / "indptr.npy", matrix.indptr.astype(np.int64))
+        np.save(base_dir / "ids.npy", ids[order])
+        np.save(base_dir / "idf.npy", self.idf[:columns].astype(np.float32))
+        (base_dir / "terms.json").write_text(json.dumps(self.terms[:columns]))
+        return generation
+
+    def _publish(self, generation, base_columns):
+        previous = self.generation
+        manifest = {
+            "generation": generation,
+            "documents": self.documents,
+            "extra_terms": [[term, float(self.idf[column])] for column, term in enumerate(self.terms) if column >= base_columns],
+            "delta": {
+                "ids": [int(posting_id) for posting_id in self.delta_ids],
+                "indices": [self.delta.indices[start:end].tolist() for start, end in zip(self.delta.indptr, self.delta.indptr[1:])],
+                "data": [self.delta.data[start:end].tolist() for start, end in zip(self.delta.indptr, self.delta.indptr[1:])],
+            },
+            "tombstones": sorted(int(posting_id) for posting_id in self.tombstones),
+        }
+        tmp = self.path / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self._manifest_path())
+        self._load()
+        # Processes still mapping the old generation keep their open file handles, so removing it is safe on POSIX
+        if previous and previous != generation:
+            shutil.rmtree(self.path / f"base-{previous}", ignore_errors=True)
+
+    # --- building and incremental updates ---
+
+    def _vector(self, counts):
+        # Sublinear TF weighted by IDF, L2-normalised. Unknown terms are appended to the vocabulary.
+        columns, weights = [], []
+        new_term_idf = math.log((1 + self.documents) / 2) + 1
+        for term, count in counts.items():
+            column = self.columns.get(term)
+            if column is None:
+                column = len(self.terms)
+                self.terms.append(term)
+                self.columns[term] = column
+                self.idf = np.append(self.idf, np.float32(new_term_idf))
+            columns.append(column)
+            weights.append((1 + math.log(count)) * float(self.idf[column]))
+        order = np.argsort(columns)
+        columns = np.asarray(columns, dtype=np.int32)[order]
+        weights = np.asarray(weights, dtype=np.float32)[order]
+        norm = np.linalg.norm(weights)
+        if norm:
+            weights /= norm
+        return columns, weights
+
+    def rebuild(self, documents):
+        # documents: iterable of (posting_id, title, description). Recomputes IDF from scratch.
+        with self._writing():
+            ids, term_counts, df = [], [], Counter()
+            for posting_id, title, description in documents:
+                counts = posting_terms(title, description)
+                ids.append(posting_id)
+                term_counts.append(counts)
+                df.update(counts.keys())
+            self.documents = len(ids)
+            self.terms = sorted(df)
+            self.columns = {term: column for column, term in enumerate(self.terms)}
+            self.idf = np.asarray([math.log((1 + self.documents) / (1 + df[term])) + 1 for term in self.terms], dtype=np.float32)
+            matrix = _csr([self._vector(counts) for counts in term_counts], len(self.terms))
+            self.delta, self.delta_ids, self.tombstones = _csr([], len(self.terms)), [], set()
+            self._publish(self._write_base(matrix, ids, len(self.terms)), len(self.terms))
+
+    def add(self, posting_id, title, description):
+        # Adds or replaces a posting's vector. Returns whether a compaction is due (see compact).
+        with self._writing():
+            rows = self._delta_rows(exclude=posting_id)
+            rows.append((posting_id, self._vector(posting_terms(title, description))))
+            return self._store(posting_id, rows)
+
+    def remove(self, posting_id):
+        with self._writing():
+            return self._store(posting_id, self._delta_rows(exclude=posting_id))
+
+    def compact(self):
+        # Rewrites the whole base, so it runs as a background task rather than in a request. A no-op if another
+        # compaction already merged the delta.
+        with self._writing():
+            if len(self.delta_ids) >= COMPACT_AFTER:
+                self._compact()
+
+    def _delta_rows(self, exclude):
+        return [
+            (posting_id, (self.delta.indices[start:end], self.delta.data[start:end]))
+            for posting_id, start, end in zip(self.delta_ids, self.delta.indptr, self.delta.indptr[1:])
+            if posting_id != exclude
+        ]
+
+    def _store(self, posting_id, rows):
+        if self._base_row(posting_id) is not None:
+            self.tombstones.add(posting_id)
+        self.delta_ids = [row_id for row_id, _ in rows]
+        self.delta = _csr([vector for _, vector in rows], len(self.terms))
+        if self.generation == 0:
+            self._publish(self._write_base(_csr([], 0), [], 0), 0)
+        else:
+            self._publish(self.generation, self.base.shape[1])
+        # Once per COMPACT_AFTER rows, so a compaction that hasn't run yet (or failed) doesn't get queued on every save
+        return bool(rows) and len(rows) % COMPACT_AFTER == 0
+
+    def _compact(self):
+        # Merge live base rows and the delta into a new base generation
+        keep = ~np.isin(self.base_ids, list(self.tombstones))
+        matrix = sparse.vstack([self._widen(self.base)[keep], self.delta], format="csr")
+        ids = np.concatenate([np.asarray(self.base_ids)[keep], np.asarray(self.delta_ids, dtype=np.int64)])
+        self.documents = len(ids)
+        self.delta, self.delta_ids, self.tombstones = _csr([], len(self.terms)), [], set()
+        self._publish(self._write_base(matrix, ids, len(self.terms)), len(self.terms))
+
+    def _widen(self, matrix):
+        # The base has fewer columns than the vocabulary once incremental adds introduce new terms
+        matrix = sparse.csr_matrix(matrix)
+        matrix.resize((matrix.shape[0], len(self.terms)))
+        return matrix
+
+    def _base_row(self, posting_id):
+        row = int(np.searchsorted(self.base_ids, posting_id))
+        if row < len(self.base_ids) and self.base_ids[row] == posting_id:
+            return row
+        return None
+
+    # --- queries ---
+
+    def __len__(self):
+        with self._lock:
+            return len(self.base_ids) - len(self.tombstones) + len(self.delta_ids)
+
+    def vectors(self, posting_ids):
+        # Stored vectors for the given postings as one sparse matrix; unknown ids are skipped
+        with self._lock:
+            self.refresh()
+            rows = []
+            for posting_id in posting_ids:
+                if posting_id in self.delta_ids:
+                    rows.append(self.delta[self.delta_ids.index(posting_id)])
+                elif posting_id not in self.tombstones and (row := self._base_row(posting_id)) is not None:
+                    rows.append(self._widen(self.base[row]))
+            if not rows:
+                return _csr([], len(self.terms))
+            return sparse.vstack(rows, format="csr")
+
+    def top_k(self, queries, k=10, exclude=()):
+        # Batched cosine similarity: one list of (posting_id, score) per query row, best first
+        with self._lock:
+            self.refresh()
+            if queries.shape[0] == 0:
+                return []
+            queries = sparse.csr_matrix(queries, dtype=np.float32)
+            scores = np.vstack([
+                (self.base @ queries[:, :self.base.shape[1]].T).toarray(),
+                (self.delta @ queries[:, :self.delta.shape[1]].T).toarray(),
+            ])
+            ids = np.concatenate([np.asarray(self.base_ids), np.asarray(self.delta_ids, dtype=np.int64)])
+            if self.tombstones:
+                # Tombstoned base rows share their id with the replacement delta row, so only mask base rows
+                scores[:len(self.base_ids)][np.isin(self.base_ids, list(self.tombstones))] = 0
+            if exclude:
+                scores[np.isin(ids, list(exclude))] = 0
+
+            results = []
+            for column in scores.T:
+                count = min(k, int(np.count_nonzero(column > 0)))
+                if count == 0:
+                    results.append([])
+                    continue
+                best = np.argpartition(-column, count - 1)[:count]
+                best = best[np.argsort(-column[best], kind="stable")]
+                results.append([(int(ids[row]), float(column[row])) for row in best])
+            return results
+
+    def similar(self, posting_id, k=10):
+        with self._lock: # the query vector's columns must match the vocabulary it is scored against
+            vectors = self.vectors([posting_id])
+            return self.top_k(vectors, k, exclude={posting_id})[0] if vectors.shape[0] else []
+
+    def recommend(self, history_ids, k=10):
+        # Centroid of the postings someone applied to, excluding those postings
+        with self._lock:
+            history = self.vectors(history_ids)
+            if history.shape[0] == 0:
+                return []
+            centroid = sparse.csr_matrix(history.mean(axis=0))
+            return self.top_k(centroid, k, exclude=set(history_ids))[0]
+
+
+_index = None
+
+
+def get_index():
+    # One index object per process; it reloads itself when another process publishes changes
+    global _index
+    if _index is None or _index.path != Path(settings.JOB_INDEX_DIR):
+        _index = JobIndex(settings.JOB_INDEX_DIR)
+    return _index
@@ -0,0 +1,45 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Sends reads to a random replica only while replica_reads is set, which the API viewsets do for GET requests from
+# users who haven't written recently (ReplicaReadsMixin in views.py). Everything else, including writes, transactions,
+# background workers and management commands, uses the primary. Pins are kept in the shared cache (CACHES), so a
+# write handled by one server process keeps the user's next read on the primary whichever process serves it.
+
+replica_reads = ContextVar("replica_reads", default=False)
+
+
+def choose_replica():
+    return random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+
+
+def pin_to_primary(user_id):
+    # Called on every authenticated write; the timestamp lets REPLICA_PIN_SECONDS change without waiting out old keys
+    cache.set(f"replica-pin:{user_id}", time.time(), timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    pinned_at = cache.get(f"replica-pin:{user_id}")
+    return pinned_at is not None and time.time() - pinned_at < settings.REPLICA_PIN_SECONDS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "django_cache":
+            return "default" # DatabaseCache's table; a lagging replica would hand out stale pins and versions
+        return choose_replica() if replica_reads.get() else "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db not in settings.DATABASE_REPLICAS
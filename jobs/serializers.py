@@ -1,6 +1,14 @@
+from datetime import timedelta
+
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django.contrib.auth import get_user_model
-from .models import Interview, JobPosting, Application, Profile, Company
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, router, transaction
+from .models import Interview, JobPosting, Application, Profile, Company, ArchivedJobPosting, ArchivedApplication, JobAppQuestion, JobAppAnswer
+from .attachments import validate_attachment_size
+from .passwords import hash_password
+from .sharding import shard_for_pk
 
 User = get_user_model()
 
@@ -19,45 +27,108 @@ class RegisterSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True, min_length=8)
 
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("Username already taken.")
-        return value
-
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Email already registered.")
-        return value
-
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data["username"],
-            email=validated_data["email"],
-            password=validated_data["password"],
-        )
-
-        profile = user.profile
-        profile.account_type = Profile.ACCOUNT_APPLICANT
-        profile.company = None
-        profile.save(update_fields=["account_type", "company"])
-
-        return user
+        # Hashed in the password pool, outside the transaction, rather than by create_user() on the serving thread
+        password = hash_password(validated_data["password"])
+        # Uniqueness is left to the username and email unique indexes instead of exists() checks up front;
+        # the new user's applicant profile is created by the post_save signal.
+        try:
+            with transaction.atomic():
+                return User.objects.create(
+                    username=validated_data["username"],
+                    email=User.objects.normalize_email(validated_data["email"]),
+                    password=password,
+                )
+        except IntegrityError:
+            # Find out which index it was from the rows themselves; error messages differ between databases
+            if User.objects.filter(username=validated_data["username"]).exists():
+                raise serializers.ValidationError({"username": ["Username already taken."]})
+            if User.objects.filter(email__iexact=validated_data["email"]).exists(): # The email index is on lower(email)
+                raise serializers.ValidationError({"email": ["Email already registered."]})
+            raise
 
 class JobPostingSerializer(serializers.ModelSerializer):
     company = CompanySerializer(read_only=True)
+    distance_km = serializers.FloatField(read_only=True) # Only present on ?near= searches
+    status_counts = serializers.SerializerMethodField()
 
     class Meta:
         model = JobPosting
-        fields = ['id', 'title', 'company', 'location', 'employment_means', 'salary_range', 'currency_code', 'description', 'posted_date', 'employment_type']
-        read_only_fields = ["id", "company", "posted_date"]
+        fields = ['id', 'title', 'company', 'location', 'employment_means', 'salary_range', 'currency_code', 'description', 'posted_date', 'employment_type', 'latitude', 'longitude', 'distance_km', 'status', 'expires_at', 'closed_at', 'application_count', 'status_counts']
+        read_only_fields = ["id", "company", "posted_date", "latitude", "longitude", "status", "closed_at", "application_count"]
+
+    def get_status_counts(self, obj):
+        # Drafts aren't visible to employers, so they aren't counted for them either
+        return {status: getattr(obj, field) for status, field in Application.SUBMITTED_STATUS_COUNTERS.items()}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Applicant numbers are only shown to the posting's own employers
+        request = self.context.get("request")
+        profile = getattr(getattr(request, "user", None), "profile", None)
+        if profile is None or profile.account_type != Profile.ACCOUNT_EMPLOYER or profile.company_id != instance.company_id:
+            data.pop("application_count", None)
+            data.pop("status_counts", None)
+        return data
         
+class ArchivedJobPostingSerializer(serializers.ModelSerializer):
+    company = CompanySerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedJobPosting
+        fields = ['id', 'title', 'company', 'location', 'employment_means', 'salary_range', 'currency_code', 'description', 'posted_date', 'employment_type', 'status', 'expires_at', 'closed_at', 'archived_at']
+        read_only_fields = fields
+
+class JobAppQuestionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobAppQuestion
+        fields = ['id', 'question_prompt', 'answer_type', 'required']
+
+class JobAppAnswerSerializer(serializers.ModelSerializer):
+    # Read side; the question is joined in (select_related / Prefetch) so listing answers costs no extra queries
+    question_prompt = serializers.CharField(source='question.question_prompt', read_only=True)
+    answer_type = serializers.CharField(source='question.answer_type', read_only=True)
+    required = serializers.BooleanField(source='question.required', read_only=True)
+
+    class Meta:
+        model = JobAppAnswer
+        fields = ['question', 'question_prompt', 'answer_type', 'required', 'answer_value']
+        read_only_fields = fields
+
+class AnswerInputSerializer(serializers.Serializer):
+    question = serializers.IntegerField()
+    answer_value = serializers.CharField(max_length=5000, allow_blank=True, allow_null=True, trim_whitespace=True)
+
+class AttachmentField(serializers.FileField):
+    # Files aren't publicly served, so the representation is the API URL that serves them (see attachments.py)
+    def to_representation(self, value):
+        if not value:
+            return None
+        url_name = "applications-" + self.source.replace("_", "-")
+        url = reverse(url_name, args=[value.instance.pk], request=self.context.get("request"))
+        return url + "?archived=1" if isinstance(value.instance, ArchivedApplication) else url
+
+class ArchivedApplicationSerializer(serializers.ModelSerializer):
+    applicant = UserSerializer(read_only=True)
+    job = ArchivedJobPostingSerializer(read_only=True)
+    resume = AttachmentField(read_only=True)
+    cover_letter = AttachmentField(read_only=True)
+
+    class Meta:
+        model = ArchivedApplication
+        fields = ['id', 'applicant', 'job', 'notes', 'resume', 'cover_letter', 'application_date', 'status', 'interview', 'answers']
+        read_only_fields = fields
+
 class ApplicationSerializer(serializers.ModelSerializer):
     applicant = UserSerializer(read_only=True)
     job = JobPostingSerializer(read_only=True)
+    resume = AttachmentField(required=False, allow_null=True, validators=[validate_attachment_size])
+    cover_letter = AttachmentField(required=False, allow_null=True, validators=[validate_attachment_size])
+    answers = JobAppAnswerSerializer(many=True, read_only=True)
 
     class Meta:
         model = Application
-        fields = ['id', 'applicant', 'job', 'notes', 'application_date', 'status']
+        fields = ['id', 'applicant', 'job', 'notes', 'resume', 'cover_letter', 'application_date', 'status', 'answers']
         read_only_fields = ['id', 'applicant', 'job', 'application_date', 'status']
 
     def validate(self, data):
@@ -74,7 +145,7 @@ class ApplicationSerializer(serializers.ModelSerializer):
 
         # Prevent duplicate applications on creation
         if self.instance is None:
-            if Application.objects.filter(applicant=user, job=job).exists():
+            if Application.objects.using(shard_for_pk(job.pk)).filter(applicant=user, job=job).exists():
                 raise serializers.ValidationError("You have already applied for this job.")
 
         return data
@@ -84,12 +155,29 @@ class ApplicationSerializer(serializers.ModelSerializer):
         validated_data['applicant'] = request.user
         return super().create(validated_data)
     
+class CandidateSearchResultSerializer(ApplicationSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(ApplicationSerializer.Meta):
+        fields = ApplicationSerializer.Meta.fields + ['score']
+
+class ShardedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    # Looks the id up on the shard it encodes when company sharding is on
+    def to_internal_value(self, data):
+        try:
+            return self.get_queryset().using(shard_for_pk(data)).get(pk=data)
+        except ObjectDoesNotExist:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
 class InterviewSerializer(serializers.ModelSerializer):
+    application = ShardedPrimaryKeyRelatedField(queryset=Application.objects.all())
 
     class Meta:
         model = Interview
-        fields = ['id', 'application', 'interview_date', 'interviewer_name', 'notes', 'means_of_interview']
-        read_only_fields = ['id']
+        fields = ['id', 'application', 'interview_date', 'duration_minutes', 'interview_end', 'interviewer_name', 'notes', 'means_of_interview']
+        read_only_fields = ['id', 'interview_end']
 
     def allowCreateOnlyForAuthorizedUsers(self, application, user):
         company = getattr(getattr(user, "profile", None), "company", None)
@@ -103,14 +191,37 @@ class InterviewSerializer(serializers.ModelSerializer):
         application = data.get("application") or getattr(self.instance, "application", None)
 
         if self.instance is None: # Creation
-            if Interview.objects.filter(application=application).exists():
+            if Interview.objects.using(shard_for_pk(application.pk)).filter(application=application).exists():
                 raise serializers.ValidationError("An interview for this application already exists.")
             self.allowCreateOnlyForAuthorizedUsers(application, user)
         else: # Update
             if application != self.instance.application:
                 raise serializers.ValidationError("You cannot change the application of an existing interview.")
 
+        self.check_interviewer_is_free(application, data)
         return data
+
+    def check_interviewer_is_free(self, application, data):
+        # Prevent double-booking the interviewer within the company
+        start = data.get("interview_date", getattr(self.instance, "interview_date", None))
+        duration = data.get("duration_minutes", getattr(self.instance, "duration_minutes", Interview._meta.get_field("duration_minutes").default))
+        interviewer_name = data.get("interviewer_name", getattr(self.instance, "interviewer_name", None))
+        if application is not None and start is not None and interviewer_name:
+            end = start + timedelta(minutes=duration)
+            conflicts = Interview.conflicting(application.job.company_id, interviewer_name, start, end, exclude_pk=getattr(self.instance, "pk", None))
+            if conflicts.exists():
+                raise serializers.ValidationError({"interview_date": f"{interviewer_name} already has an interview scheduled during this time."})
+
+    def save(self, **kwargs):
+        # validate() checks outside any transaction, so two concurrent bookings for one interviewer could both pass.
+        # Check again in the transaction that writes: it holds the write lock from its first statement (transaction_mode
+        # IMMEDIATE), and locking the company row serializes a company's bookings on databases with row locks.
+        application = self.validated_data.get("application") or self.instance.application
+        db = router.db_for_write(Application, instance=application)
+        with transaction.atomic(using=db):
+            Company.objects.using(db).select_for_update().get(pk=application.job.company_id)
+            self.check_interviewer_is_free(application, self.validated_data)
+            return super().save(**kwargs)
     
 # Serializer for the authenticated user's own data
 class MeSerializer(serializers.ModelSerializer):
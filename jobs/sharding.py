@@ -0,0 +1,227 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from functools import cmp_to_key
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, models
+
+# Opt-in company sharding (DB_SHARDS=N, see settings.py). Each company's postings, applications and interviews
+# (and their archived copies and resume index) live on shard DATABASE_SHARDS[company_id % N], so tenants don't contend on one database.
+#
+# - Primary keys encode their shard: shard i allocates ids from i << SHARD_ID_BITS (seed_id_range), so any
+#   posting, application or interview id routes to its shard without a lookup.
+# - Reference tables the sharded rows point at (users, companies) are replicated to every shard on save, so the
+#   shards keep their foreign keys and joins.
+# - Queries scoped to one company or id are pinned with .using(shard); unscoped ones (an applicant's own
+#   applications, the public job feed) run on every shard in parallel and are merged (evaluate, in_bulk).
+#
+# With sharding off every helper returns None, so .using(None) leaves routing to the other routers as before.
+
+SHARD_ID_BITS = 40
+SHARDED_MODELS = {"jobposting", "application", "interview", "archivedjobposting", "archivedapplication", "candidatedocument", "candidateterm",
+                  "jobappquestion", "jobappanswer"}
+
+
+def enabled():
+    return bool(settings.DATABASE_SHARDS)
+
+
+def is_sharded(model):
+    return model._meta.app_label == "jobs" and model._meta.model_name in SHARDED_MODELS
+
+
+def shard_for_company(company_id):
+    if not enabled() or company_id is None:
+        return None
+    return settings.DATABASE_SHARDS[int(company_id) % len(settings.DATABASE_SHARDS)]
+
+
+def shard_for_pk(pk):
+    if not enabled() or pk is None:
+        return None
+    index = int(pk) >> SHARD_ID_BITS
+    if index >= len(settings.DATABASE_SHARDS):
+        raise ValueError(f"Id {pk} does not belong to any shard.")
+    return settings.DATABASE_SHARDS[index]
+
+
+def shard_of(instance):
+    # The shard a sharded model instance is stored on, from its own id or its parent's
+    model_name = instance._meta.model_name
+    if model_name in ("jobposting", "archivedjobposting"):
+        return shard_for_pk(instance.pk) if instance.pk else shard_for_company(instance.company_id)
+    if model_name in ("application", "archivedapplication"):
+        return shard_for_pk(instance.job_id)
+    if model_name == "jobappquestion":
+        return shard_for_pk(instance.job_id)
+    if model_name in ("interview", "candidatedocument", "candidateterm", "jobappanswer"):
+        return shard_for_pk(instance.application_id)
+    return None
+
+
+def all_shards():
+    # Aliases to loop over for table-wide work (sweeps, backfills); [None] when sharding is off
+    return list(settings.DATABASE_SHARDS) or [None]
+
+
+def group_by_shard(pks):
+    groups = {}
+    for pk in pks:
+        groups.setdefault(shard_for_pk(pk), []).append(pk)
+    return groups
+
+
+def fan_out(func):
+    # Calls func(alias) for every shard in parallel and returns the results in shard order
+    if not enabled():
+        return [func(None)]
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            connections.close_all() # this worker thread's connections
+
+    with ThreadPoolExecutor(max_workers=len(settings.DATABASE_SHARDS)) as pool:
+        return list(pool.map(run, settings.DATABASE_SHARDS))
+
+
+def ordering_key(ordering):
+    # Comparison key for model instances following a queryset's order_by ("-posted_date", "distance_km", ...)
+    fields = [(name.lstrip("-"), name.startswith("-")) for name in ordering if isinstance(name, str) and "__" not in name]
+
+    def compare(a, b):
+        for name, descending in fields:
+            x, y = getattr(a, name), getattr(b, name)
+            if x != y:
+                return (-1 if x > y else 1) if descending else (-1 if x < y else 1)
+        return 0
+
+    return cmp_to_key(compare)
+
+
+def needs_fan_out(queryset):
+    # Whether the queryset has to run on every shard, i.e. sharding is on and it isn't pinned to one
+    return enabled() and queryset._db is None
+
+
+def evaluate(queryset, limit=None):
+    # Runs a queryset on the shard it is pinned to, or on every shard and merges the already-ordered results.
+    # With limit, only the first limit rows are returned, and no shard sends more than that.
+    if limit is not None:
+        queryset = queryset[:limit]
+    if not needs_fan_out(queryset):
+        return list(queryset)
+    results = fan_out(lambda alias: list(queryset.using(alias)))
+    ordering = queryset.query.order_by or (queryset.model._meta.ordering if queryset.query.default_ordering else ())
+    if not ordering:
+        return [row for rows in results for row in rows][:limit]
+    return list(islice(heapq.merge(*results, key=ordering_key(ordering)), limit))
+
+
+def iterate(queryset, chunk_size=500):
+    # Streams a queryset pinned to one database; an unpinned one is fanned out and merged in memory first
+    if not needs_fan_out(queryset):
+        return queryset.iterator(chunk_size=chunk_size)
+    return iter(evaluate(queryset))
+
+
+def in_bulk(queryset, pks):
+    # queryset.in_bulk(pks), with each id looked up on its own shard
+    if not needs_fan_out(queryset):
+        return queryset.in_bulk(pks)
+    found = {}
+    for alias, ids in group_by_shard(pks).items():
+        found.update(queryset.using(alias).in_bulk(ids))
+    return found
+
+
+def replicate(instance):
+    # Upserts a reference row (user, company) on every shard; a copy, so the original keeps its database state
+    if not enabled():
+        return
+    model = type(instance)
+    copy = model(**{field.attname: getattr(instance, field.attname) for field in model._meta.concrete_fields})
+    update_fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    for alias in settings.DATABASE_SHARDS:
+        model._base_manager.using(alias).bulk_create(
+            [copy], update_conflicts=True, unique_fields=[model._meta.pk.name], update_fields=update_fields
+        )
+
+
+def unreplicate(instance):
+    if enabled():
+        for alias in settings.DATABASE_SHARDS:
+            type(instance)._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+def seed_id_range(alias):
+    # Starts the shard's id sequences at its range so ids stay globally unique and encode the shard
+    from django.apps import apps
+
+    start = settings.DATABASE_SHARDS.index(alias) << SHARD_ID_BITS
+    if start == 0:
+        return
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for model in apps.get_app_config("jobs").get_models():
+            if not is_sharded(model) or not model._meta.pk.get_internal_type().endswith("AutoField"):
+                continue
+            table = model._meta.db_table
+            if connection.vendor == "sqlite":
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) SELECT %s, 0 WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)", [table, table])
+                cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s", [start, table])
+            elif connection.vendor == "postgresql":
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})))",
+                    [table, start],
+                )
+            else:
+                raise NotImplementedError(f"Seeding id ranges is not implemented for {connection.vendor}.")
+
+
+class ShardedQuerySet(models.QuerySet):
+    # Manager.create() asks the routers without the new instance, so pick its shard here
+    def create(self, **kwargs):
+        if enabled() and self._db is None:
+            return super().using(shard_of(self.model(**kwargs))).create(**kwargs)
+        return super().create(**kwargs)
+
+
+class ShardRouter:
+    # Goes before ReplicaRouter in DATABASE_ROUTERS and only answers for sharded models
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if enabled() and is_sharded(model) and instance is not None and instance._state.db in settings.DATABASE_SHARDS:
+            return instance._state.db # e.g. application.job, job.application_set
+        return None
+
+    def db_for_write(self, model, **hints):
+        if not enabled() or not is_sharded(model):
+            return None
+        instance = hints.get("instance")
+        if isinstance(instance, model):
+            return shard_of(instance)
+        if instance is not None and instance._state.db in settings.DATABASE_SHARDS:
+            return instance._state.db
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Reference rows exist on every shard, so sharded rows may point at objects loaded from the primary
+        if not enabled():
+            return None
+        if is_sharded(type(obj1)) or is_sharded(type(obj2)):
+            return True
+        if obj1._state.db in settings.DATABASE_SHARDS and obj1._state.db == obj2._state.db:
+            return True # e.g. permissions and content types created when a shard is migrated
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not enabled():
+            return None
+        if db in settings.DATABASE_SHARDS:
+            return True # full schema, so the replicated reference tables and their joins exist
+        if app_label == "jobs" and model_name in SHARDED_MODELS:
+            return False
+        return None
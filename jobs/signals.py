@@ -1,13 +1,119 @@
-from .models import Profile
+from .models import Profile, Application, Interview, JobPosting, Company, ChangeLog
+from .caching import bump_scopes, company_scope, applicant_scope, user_scope
+from .events import publish_on_commit
+from .recommend import get_index
+from .sharding import replicate, unreplicate, shard_for_pk
+from .taskqueue import enqueue
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
-def ensure_profile_exists(sender, instance, **kwargs):
-    Profile.objects.get_or_create(
-        user=instance,
-        defaults={"account_type": Profile.ACCOUNT_APPLICANT},
-    )
\ No newline at end of file
+def ensure_profile_exists(sender, instance, created, raw=False, **kwargs):
+    # Only new users need a profile; later saves (last_login, password changes) skip the lookup entirely
+    if created and not raw:
+        Profile.objects.create(user=instance, account_type=Profile.ACCOUNT_APPLICANT)
+
+# With company sharding on, users and companies are copied to every shard so sharded rows keep their foreign keys
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Company)
+def replicate_reference_row(sender, instance, raw=False, **kwargs):
+    if not raw and instance._state.db not in settings.DATABASE_SHARDS:
+        replicate(instance)
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Company)
+def unreplicate_reference_row(sender, instance, **kwargs):
+    if instance._state.db not in settings.DATABASE_SHARDS:
+        unreplicate(instance)
+
+def interview_changed(interview, change):
+    # Invalidate cached interview feeds for the applicant and the hiring company, log the change and push it
+    row = Application.objects.using(shard_for_pk(interview.application_id)).filter(pk=interview.application_id).values_list("applicant_id", "job__company_id").first()
+    if row is not None:
+        applicant_id, company_id = row
+        bump_scopes(applicant_scope(applicant_id), company_scope(company_id))
+        ChangeLog.record(ChangeLog.INTERVIEWS, interview.pk, company_id, applicant_id)
+        publish_on_commit([applicant_scope(applicant_id), company_scope(company_id)], {
+            "type": "interview", "change": change, "interview_id": interview.pk, "application_id": interview.application_id,
+            "interview_date": interview.interview_date.isoformat(),
+        })
+
+@receiver(post_save, sender=Interview)
+def interview_saved(sender, instance, created, **kwargs):
+    interview_changed(instance, "created" if created else "updated")
+
+# pre_delete so the application row still exists when an interview is removed by a cascade
+@receiver(pre_delete, sender=Interview)
+def interview_deleted(sender, instance, **kwargs):
+    interview_changed(instance, "deleted")
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def account_saved(sender, instance, raw=False, **kwargs):
+    # Account details and role are part of the cached dashboards
+    if not raw:
+        bump_scopes(user_scope(instance.pk if sender is User else instance.user_id))
+
+@receiver(post_save, sender=JobPosting)
+@receiver(post_delete, sender=JobPosting)
+def job_posting_saved(sender, instance, **kwargs):
+    # Postings appear in the company's dashboard and their titles in interview feeds
+    bump_scopes(company_scope(instance.company_id))
+    ChangeLog.record(ChangeLog.JOB_POSTINGS, instance.pk, instance.company_id)
+
+@receiver(pre_delete, sender=JobPosting)
+def job_posting_deleting(sender, instance, **kwargs):
+    # Tombstones for the applications the delete cascades to, in one query (application_deleted skips them)
+    rows = instance.application_set.values_list("id", "applicant_id")
+    ChangeLog.record_many(ChangeLog.APPLICATIONS, [(application_id, instance.company_id, applicant_id) for application_id, applicant_id in rows])
+
+@receiver(post_save, sender=Application)
+def application_saved(sender, instance, raw=False, **kwargs):
+    # Queryset updates (status transitions, inserts in get_or_create_draft) bump and log these themselves
+    if not raw:
+        bump_scopes(applicant_scope(instance.applicant_id), company_scope(instance.job.company_id))
+        ChangeLog.record(ChangeLog.APPLICATIONS, instance.pk, instance.job.company_id, instance.applicant_id)
+
+@receiver(pre_save, sender=Application)
+def note_resume_upload(sender, instance, raw=False, **kwargs):
+    # A resume that hasn't been stored yet is a new upload (FileField stores it during save)
+    instance._resume_uploaded = not raw and bool(instance.resume) and not instance.resume._committed
+
+@receiver(post_save, sender=Application)
+def queue_resume_indexing(sender, instance, **kwargs):
+    # Extract the new resume's text for employer search in the background, off the request
+    if getattr(instance, "_resume_uploaded", False):
+        instance._resume_uploaded = False
+        enqueue("index_resume", application_id=instance.pk)
+
+def queue_index_compaction(due):
+    # Merging the index's delta rewrites the whole index, so it runs on the task queue rather than in this request
+    if due:
+        enqueue("compact_job_index")
+
+@receiver(post_save, sender=JobPosting)
+def index_job_posting(sender, instance, **kwargs):
+    # Keep the similarity index in step with postings once the change commits
+    posting_id, title, description = instance.id, instance.title, instance.description
+    transaction.on_commit(lambda: queue_index_compaction(get_index().add(posting_id, title, description)), robust=True)
+
+@receiver(post_delete, sender=JobPosting)
+def unindex_job_posting(sender, instance, **kwargs):
+    posting_id = instance.id
+    transaction.on_commit(lambda: queue_index_compaction(get_index().remove(posting_id)), robust=True)
+
+@receiver(post_delete, sender=Application)
+def application_deleted(sender, instance, origin=None, **kwargs):
+    # Runs inside the delete's transaction. Nothing to count when the posting itself is being deleted.
+    bump_scopes(applicant_scope(instance.applicant_id))
+    if isinstance(origin, JobPosting) or getattr(origin, "model", None) is JobPosting:
+        return
+    company_id = instance.job.company_id
+    Application.adjust_job_counters(instance.job_id, company_id, old_status=instance.status)
+    bump_scopes(company_scope(company_id))
+    ChangeLog.record(ChangeLog.APPLICATIONS, instance.pk, company_id, instance.applicant_id)
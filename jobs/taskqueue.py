@@ -0,0 +1,194 @@
+import logging
+import random
+import threading
+import traceback
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Task
+
+# Database-backed durable task queue. No broker: tasks are rows in jobs_task.
+#
+# - enqueue() inserts a row in the caller's transaction, so a task only exists (and runs) if that transaction commits.
+# - Workers claim a task with a compare-and-swap UPDATE that sets status=RUNNING and a lease (locked_until).
+#   A task whose worker dies becomes claimable again once its lease expires (visibility timeout), unless that was
+#   its last attempt: then it is marked FAILED, so a task that keeps killing its worker isn't retried forever.
+# - Failures are retried with exponential backoff until max_attempts, then the task is marked FAILED.
+# - Each task type can cap how many of its tasks run at once across all workers.
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TaskType:
+    name: str
+    func: object
+    max_attempts: int = 5
+    timeout: int = 300 # seconds a claim is leased for; a task still running after that may be claimed again
+    concurrency: int | None = None # max running at once across all workers, None for no limit
+    backoff: int = 10 # seconds before the first retry, doubled each attempt
+    atomic: bool = True # run the handler in a transaction; handlers doing slow non-database work manage their own
+
+
+_registry = {}
+
+
+def task(name, max_attempts=5, timeout=300, concurrency=None, backoff=10, atomic=True):
+    # Decorator registering a task handler. Handlers receive the payload as keyword arguments.
+    def register(func):
+        _registry[name] = TaskType(name, func, max_attempts, timeout, concurrency, backoff, atomic)
+        return func
+    return register
+
+
+def get_task_type(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"No task registered as '{name}'.")
+
+
+def enqueue(name, delay=None, **payload):
+    task_type = get_task_type(name)
+    run_after = timezone.now() + delay if delay else timezone.now()
+    return Task.objects.create(name=name, payload=payload, max_attempts=task_type.max_attempts, run_after=run_after)
+
+
+def retry_delay(task_type, attempts):
+    # Exponential backoff with jitter, capped at an hour
+    delay = min(task_type.backoff * 2 ** (attempts - 1), 3600)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+class Worker:
+    def __init__(self, names=None):
+        self.names = list(names) if names else None
+        self.local_running = {}
+        self.lock = threading.Lock()
+
+    def claimable(self, now):
+        ready = Q(status=Task.PENDING, run_after__lte=now) | Q(status=Task.RUNNING, locked_until__lt=now)
+        queryset = Task.objects.filter(ready)
+        names = self.names or list(_registry)
+
+        # Skip task types that are at their concurrency limit
+        limited = {name: _registry[name].concurrency for name in names if name in _registry and _registry[name].concurrency}
+        if limited:
+            running = dict(
+                Task.objects.filter(name__in=limited, status=Task.RUNNING, locked_until__gte=now)
+                .values("name").annotate(count=Count("id")).values_list("name", "count")
+            )
+            names = [name for name in names if running.get(name, 0) < limited.get(name, float("inf"))]
+        return queryset.filter(name__in=names)
+
+    def claim(self):
+        now = timezone.now()
+        candidates = list(self.claimable(now).order_by("run_after").values("id", "name", "status", "attempts", "max_attempts")[:10])
+        random.shuffle(candidates) # spread concurrent workers over different rows
+        for candidate in candidates:
+            task_type = _registry[candidate["name"]]
+            if candidate["status"] == Task.RUNNING and candidate["attempts"] >= candidate["max_attempts"]:
+                self.fail_abandoned(candidate, now)
+                continue
+            if not self.reserve_local_slot(task_type):
+                continue
+            # Compare-and-swap on attempts: only one worker can move the task past this attempt number
+            claimed = Task.objects.filter(id=candidate["id"], attempts=candidate["attempts"]).filter(
+                Q(status=Task.PENDING) | Q(status=Task.RUNNING, locked_until__lt=now)
+            ).update(
+                status=Task.RUNNING,
+                attempts=F("attempts") + 1,
+                locked_until=now + timedelta(seconds=task_type.timeout),
+            )
+            if claimed:
+                return Task.objects.get(id=candidate["id"])
+            self.release_local_slot(task_type)
+        return None
+
+    def fail_abandoned(self, candidate, now):
+        # The lease of the task's last attempt expired, so its worker died or hung; dead-letter it instead of retrying
+        failed = Task.objects.filter(
+            id=candidate["id"], attempts=candidate["attempts"], status=Task.RUNNING, locked_until__lt=now,
+        ).update(status=Task.FAILED, finished_at=now, locked_until=None, last_error="Lease expired on the last attempt.")
+        if failed:
+            logger.error("Task %s #%s failed: lease expired on attempt %s/%s", candidate["name"], candidate["id"], candidate["attempts"], candidate["max_attempts"])
+
+    def reserve_local_slot(self, task_type):
+        # The database count in claimable() can be stale between workers of this process, so also count locally
+        if task_type.concurrency is None:
+            return True
+        with self.lock:
+            if self.local_running.get(task_type.name, 0) >= task_type.concurrency:
+                return False
+            self.local_running[task_type.name] = self.local_running.get(task_type.name, 0) + 1
+            return True
+
+    def release_local_slot(self, task_type):
+        if task_type.concurrency is not None:
+            with self.lock:
+                self.local_running[task_type.name] -= 1
+
+    def execute(self, claimed):
+        task_type = _registry[claimed.name]
+        # Results are only recorded while we still hold the lease (same attempt number)
+        ours = Task.objects.filter(id=claimed.id, attempts=claimed.attempts, status=Task.RUNNING)
+        try:
+            with transaction.atomic() if task_type.atomic else nullcontext():
+                task_type.func(**claimed.payload)
+                ours.update(status=Task.DONE, finished_at=timezone.now(), locked_until=None, last_error="")
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning("Task %s #%s failed (attempt %s/%s)", claimed.name, claimed.id, claimed.attempts, claimed.max_attempts)
+            if claimed.attempts >= claimed.max_attempts:
+                ours.update(status=Task.FAILED, finished_at=timezone.now(), locked_until=None, last_error=error)
+            else:
+                ours.update(
+                    status=Task.PENDING,
+                    run_after=timezone.now() + retry_delay(task_type, claimed.attempts),
+                    locked_until=None,
+                    last_error=error,
+                )
+        finally:
+            self.release_local_slot(task_type)
+
+    def run_once(self):
+        # Claims and runs a single task; returns False when nothing was claimable
+        claimed = self.claim()
+        if claimed is None:
+            return False
+        self.execute(claimed)
+        return True
+
+    def drain(self, limit=None):
+        processed = 0
+        while (limit is None or processed < limit) and self.run_once():
+            processed += 1
+        return processed
+
+
+def run_worker_pool(threads=4, poll_interval=1.0, names=None, stop_event=None):
+    # Runs worker threads until stop_event is set; idle threads poll with a little jitter
+    stop_event = stop_event or threading.Event()
+    worker = Worker(names)
+
+    def loop():
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                busy = worker.run_once()
+            except Exception:
+                logger.exception("Task worker error")
+                busy = False
+            if not busy:
+                stop_event.wait(poll_interval * random.uniform(0.5, 1.5))
+        close_old_connections()
+
+    pool = [threading.Thread(target=loop, name=f"task-worker-{i}", daemon=True) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    return pool, stop_event
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+from .taskqueue import task
+
+# Background task handlers, run by `manage.py run_workers`
+
+
+@task("compact_job_index", concurrency=1, atomic=False)
+def compact_job_index():
+    # Merge the similar-jobs index's delta into a new base generation; queued by posting saves (see jobs/signals.py)
+    from .recommend import get_index
+    get_index().compact()
+
+
+@task("index_resume", max_attempts=3, timeout=settings.EXTRACTION_TIMEOUT * 4, concurrency=settings.EXTRACTION_WORKERS or None, atomic=False)
+def index_resume(application_id, force=False):
+    # Extract and index an application's resume for employer search; a no-op if that file is already indexed
+    from .candidates import index_resume
+    index_resume(application_id, force=force)
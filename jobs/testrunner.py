@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TempStorageTestRunner(DiscoverRunner):
+    # Points the on-disk stores under var/ at a temporary directory for the whole run, so tests never write into a
+    # developer's real index or uploads
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.storage_dir = tempfile.TemporaryDirectory()
+        self.storage_override = override_settings(
+            JOB_INDEX_DIR=os.path.join(self.storage_dir.name, "job-index"),
+            ATTACHMENTS_ROOT=os.path.join(self.storage_dir.name, "attachments"),
+        )
+        self.storage_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.storage_override.disable()
+        self.storage_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -1,9 +1,61 @@
+import asyncio
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta, timezone as datetime_timezone
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+import msgpack
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from rest_framework.test import APITestCase
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.core.management import call_command
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.db import transaction
+from django.db import connection
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import Company, JobPosting, JobAppQuestion, JobAppAnswer, Application, Interview, Profile, Task, TransitionConflict, OutboxMessage, ChangeLog, CandidateDocument, IdempotencyKey
+from .notifications import dispatch
+from .pagination import EstimatedCountPaginator
+from .passwords import admitted
+from .recommend import get_index
+from .routers import ReplicaRouter
+from .serializers import InterviewSerializer
+from .sharding import SHARD_ID_BITS, all_shards, seed_id_range, shard_for_company, shard_for_pk
+from .taskqueue import Worker, enqueue, task
+
+# For tests that count a view's own queries: without CACHE_REDIS_URL the shared cache is a table in the same database
+PROCESS_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
-from .models import Company, JobPosting, JobAppQuestion, JobAppAnswer, Application, Interview, Profile
+
+@contextmanager
+def in_another_process():
+    # Runs the block the way another server process would: without this process's LocMemCache memory
+    stores = [*locmem._caches.values(), *locmem._expire_info.values()]
+    saved = [store.copy() for store in stores]
+    for store in stores:
+        store.clear()
+    try:
+        yield
+    finally:
+        for store, contents in zip(stores, saved):
+            store.clear()
+            store.update(contents)
 
 
 class APIRoutes:
@@ -89,11 +141,10 @@ class ApplicationFlowTests(APITestCase):
         }
 
         r = self.client.post("/api/job-postings/", payload, format="json")
-        print(r.status_code, r.data)  # helpful if it still fails
-        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED, r.data)
 
-        # sanity check: created job belongs to employer company
-        self.assertEqual(r.data["company"], self.company.id)  # if serializer returns company
+        # sanity check: created job belongs to employer company (nested by CompanySerializer)
+        self.assertEqual(r.data["company"]["id"], self.company.id)
 
 
     def test_applicant_apply_creates_draft_and_answers(self):
@@ -344,3 +395,1437 @@ class ApplicationFlowTests(APITestCase):
         )
         self.assertEqual(r.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Interview.objects.filter(application=app).exists())
+
+
+class RendererTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345", email="e@e.com")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.client.force_authenticate(user=self.employer)
+
+    def test_msgpack_and_json_encode_the_same_data(self):
+        r = self.client.get("/api/job-postings/", HTTP_ACCEPT="application/json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        json_data = json.loads(r.content)
+
+        r = self.client.get("/api/job-postings/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(r.content, raw=False), json_data)
+        self.assertEqual(json_data[0]["posted_date"], self.job.posted_date.isoformat())
+
+    def test_msgpack_request_body_is_parsed(self):
+        payload = {"title": "Designer", "location": "Remote", "description": "Design things", "employment_means": "RE"}
+        r = self.client.post(
+            "/api/job-postings/",
+            msgpack.packb(payload),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(r.content, raw=False)["employment_means"], "RE")
+
+
+class ConcurrentApplyTests(APITransactionTestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345", email="a@a.com")
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+
+    def apply_once(self, _):
+        client = APIClient()
+        client.force_authenticate(user=self.applicant)
+        try:
+            return client.post(f"/api/job-postings/{self.job.id}/apply/", {}, format="json").status_code
+        finally:
+            connection.close()
+
+    def test_simultaneous_applies_create_exactly_one_draft(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            codes = list(pool.map(self.apply_once, range(200)))
+
+        self.assertEqual(Application.objects.filter(applicant=self.applicant, job=self.job).count(), 1)
+        self.assertEqual(codes.count(status.HTTP_201_CREATED), 1)
+        self.assertEqual(codes.count(status.HTTP_200_OK), 199)
+
+    def test_apply_after_submit_is_a_clean_conflict(self):
+        Application.objects.create(applicant=self.applicant, job=self.job, status=Application.AP)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            codes = list(pool.map(self.apply_once, range(50)))
+
+        self.assertEqual(set(codes), {status.HTTP_409_CONFLICT})
+
+
+class StatusTransitionConflictTests(APITransactionTestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345", email="a@a.com")
+        self.employer = User.objects.create_user(username="employer", password="pass12345", email="e@e.com")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.app = Application.objects.create(applicant=self.applicant, job=self.job, status=Application.AP)
+
+    def test_stale_transition_raises_conflict(self):
+        first = Application.objects.get(id=self.app.id)
+        second = Application.objects.get(id=self.app.id)
+        first.transition_status(Application.OF)
+
+        with self.assertRaises(TransitionConflict):
+            second.transition_status(Application.RE)
+        self.app.refresh_from_db()
+        self.assertEqual(self.app.status, Application.OF)
+
+    def transition(self, action):
+        client = APIClient()
+        client.force_authenticate(user=self.employer)
+        try:
+            return action, client.post(f"/api/applications/{self.app.id}/{action}/", {}, format="json").status_code
+        finally:
+            connection.close()
+
+    def test_concurrent_offer_and_reject_have_a_single_winner(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(self.transition, ["offer", "reject"] * 50))
+
+        winners = [action for action, code in results if code == status.HTTP_200_OK]
+        self.assertEqual(len(winners), 1)
+        self.assertTrue(all(code in (status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST, status.HTTP_409_CONFLICT) for _, code in results))
+        self.app.refresh_from_db()
+        self.assertEqual(self.app.status, Application.OF if winners[0] == "offer" else Application.RE)
+
+
+class InterviewSchedulingTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345", email="e@e.com")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.apps = []
+        for i in range(3):
+            applicant = User.objects.create_user(username=f"applicant{i}", password="pass12345")
+            self.apps.append(Application.objects.create(applicant=applicant, job=self.job, status=Application.IN))
+        self.client.force_authenticate(user=self.employer)
+
+    def schedule(self, app, when, duration=60, interviewer="Jane"):
+        payload = {"application": app.id, "interview_date": when, "duration_minutes": duration, "interviewer_name": interviewer}
+        return self.client.post("/api/interviews/", payload, format="json")
+
+    def test_double_booking_an_interviewer_is_rejected(self):
+        r = self.schedule(self.apps[0], "2026-02-02T12:00:00Z", duration=60)
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(r.data["interview_end"], "2026-02-02T13:00:00Z")
+
+        r = self.schedule(self.apps[1], "2026-02-02T12:30:00Z")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("interview_date", r.data)
+
+        # back-to-back and other interviewers are fine
+        self.assertEqual(self.schedule(self.apps[1], "2026-02-02T13:00:00Z").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.schedule(self.apps[2], "2026-02-02T12:30:00Z", interviewer="Bob").status_code, status.HTTP_201_CREATED)
+
+    def test_booking_that_commits_after_validation_is_caught_on_save(self):
+        # Another request books Jane in the gap between this request's validation and its write
+        validate = InterviewSerializer.validate
+        def validate_then_race(serializer, data):
+            data = validate(serializer, data)
+            Interview.objects.create(application=self.apps[1], interview_date=datetime(2026, 2, 2, 12, 30, tzinfo=datetime_timezone.utc), interviewer_name="Jane")
+            return data
+        with mock.patch.object(InterviewSerializer, "validate", validate_then_race):
+            r = self.schedule(self.apps[0], "2026-02-02T12:00:00Z")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("interview_date", r.data)
+        self.assertFalse(Interview.objects.filter(application=self.apps[0]).exists())
+
+    def test_calendar_returns_interviews_overlapping_the_range(self):
+        self.schedule(self.apps[0], "2026-02-02T09:00:00Z")
+        self.schedule(self.apps[1], "2026-02-05T23:30:00Z")
+        self.schedule(self.apps[2], "2026-02-10T09:00:00Z")
+
+        r = self.client.get("/api/interviews/calendar/", {"start": "2026-02-02", "end": "2026-02-06"})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([i["application"] for i in r.data], [self.apps[0].id, self.apps[1].id])
+
+        r = self.client.get("/api/interviews/calendar/", {"start": "2026-02-06T00:15:00Z", "end": "2026-02-07"})
+        self.assertEqual([i["application"] for i in r.data], [self.apps[1].id])
+
+        r = self.client.get("/api/interviews/calendar/", {"start": "not-a-date"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345", email="e@e.com")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.app = Application.objects.create(applicant=self.applicant, job=self.job, status=Application.IN)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.interview = Interview.objects.create(
+                application=self.app, interview_date=datetime(2026, 2, 2, 12, tzinfo=datetime_timezone.utc), interviewer_name="Jane", notes="Bring, a laptop"
+            )
+
+    def feed_path(self, user):
+        self.client.force_authenticate(user=user)
+        url = self.client.get("/api/calendar/").data["url"]
+        self.client.force_authenticate(user=None)
+        return url.replace("http://testserver", "")
+
+    @override_settings(CACHES=PROCESS_CACHE)
+    def test_feed_is_served_from_cache_and_revalidated_with_etag(self):
+        path = self.feed_path(self.applicant)
+        r = self.client.get(path)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        body = b"".join(r.streaming_content).decode()
+        self.assertIn("DTSTART:20260202T120000Z", body)
+        self.assertIn("DTEND:20260202T130000Z", body)
+        self.assertIn("Bring\\, a laptop", body)
+        etag = r["ETag"]
+
+        # Only the token lookup hits the database once the feed is cached
+        with self.assertNumQueries(1):
+            r = self.client.get(path)
+        self.assertEqual(r.content.decode(), body)
+        r = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.interview.interviewer_name = "Bob"
+            self.interview.save()
+        r = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(r["ETag"], etag)
+        self.assertIn("Interviewer: Bob", b"".join(r.streaming_content).decode())
+
+    def test_changes_made_by_another_process_invalidate_the_feed(self):
+        path = self.feed_path(self.applicant)
+        etag = self.client.get(path)["ETag"]
+        # The interview changes on another worker, which bumps the scope version in the shared cache
+        with in_another_process(), self.captureOnCommitCallbacks(execute=True):
+            self.interview.interviewer_name = "Bob"
+            self.interview.save()
+        r = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertIn("Interviewer: Bob", b"".join(r.streaming_content).decode())
+
+    def test_employer_feed_and_token_rotation(self):
+        path = self.feed_path(self.employer)
+        r = self.client.get(path)
+        self.assertIn("Interview: applicant for Engineer", b"".join(r.streaming_content).decode())
+
+        self.client.force_authenticate(user=self.employer)
+        self.client.post("/api/calendar/")
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(path).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SimilarJobsTests(APITestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        self.settings_override = override_settings(JOB_INDEX_DIR=self.index_dir.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.company = Company.objects.create(name="TestCo")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.backend = JobPosting.objects.create(title="Python backend engineer", company=self.company, location="Remote", description="Django and PostgreSQL APIs")
+            self.django = JobPosting.objects.create(title="Django developer", company=self.company, location="Remote", description="Python web services with Django")
+            self.frontend = JobPosting.objects.create(title="Frontend engineer", company=self.company, location="Remote", description="React and TypeScript")
+            self.nurse = JobPosting.objects.create(title="Registered nurse", company=self.company, location="Austin", description="Patient care")
+        self.client.force_authenticate(user=self.applicant)
+
+    def test_similar_ranks_related_postings_first(self):
+        r = self.client.get(f"/api/job-postings/{self.backend.id}/similar/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        ids = [job["id"] for job in r.data]
+        self.assertEqual(ids[0], self.django.id)
+        self.assertNotIn(self.backend.id, ids)
+        self.assertNotIn(self.nurse.id, ids)
+
+    def test_index_follows_posting_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nurse.title = "Python data engineer"
+            self.nurse.description = "Django pipelines"
+            self.nurse.save()
+            self.frontend.delete()
+
+        r = self.client.get(f"/api/job-postings/{self.backend.id}/similar/")
+        ids = [job["id"] for job in r.data]
+        self.assertIn(self.nurse.id, ids)
+        self.assertNotIn(self.frontend.id, ids)
+
+    def test_compaction_runs_on_the_task_queue(self):
+        index = get_index()
+        generation = index.generation
+        with mock.patch("jobs.recommend.COMPACT_AFTER", 5), self.captureOnCommitCallbacks(execute=True):
+            platform = JobPosting.objects.create(title="Python platform engineer", company=self.company, location="Remote", description="Django")
+        self.assertEqual((index.generation, len(index.delta_ids)), (generation, 5)) # not in the request
+        with mock.patch("jobs.recommend.COMPACT_AFTER", 5):
+            self.assertEqual(Worker(["compact_job_index"]).drain(), 1)
+        index.refresh()
+        self.assertEqual((index.generation, len(index.delta_ids), len(index)), (generation + 1, 0, 5))
+        r = self.client.get(f"/api/job-postings/{self.backend.id}/similar/")
+        self.assertEqual({job["id"] for job in r.data[:2]}, {self.django.id, platform.id})
+
+    def test_queries_from_other_threads_see_consistent_index(self):
+        # Every add grows the vocabulary in place; queries running alongside must never see it half-updated
+        index = get_index()
+
+        def add(n):
+            index.add(10_000 + n, f"Forklift driver{n}", f"Warehouse shift{n} pallets{n}")
+
+        def query(_):
+            return [posting_id for posting_id, _ in index.similar(self.backend.id)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            adds = [pool.submit(add, n) for n in range(40)]
+            queries = [pool.submit(query, n) for n in range(200)]
+            for future in adds:
+                future.result()
+            for future in queries:
+                self.assertIn(self.django.id, future.result())
+        self.assertEqual(len(index), 44)
+        self.assertEqual(len(index.terms), len(index.idf))
+
+    def test_recommendations_use_application_history(self):
+        Application.objects.create(applicant=self.applicant, job=self.backend)
+        r = self.client.get("/api/job-postings/recommended/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data[0]["id"], self.django.id)
+        self.assertNotIn(self.backend.id, [job["id"] for job in r.data])
+
+
+class RadiusSearchTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo", location="Seattle, WA")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.austin = JobPosting.objects.create(title="A", company=self.company, location="Austin, TX", description="Desc")
+        self.round_rock = JobPosting.objects.create(title="B", company=self.company, location="Round Rock, Texas", description="Desc")
+        self.san_antonio = JobPosting.objects.create(title="C", company=self.company, location="San Antonio, TX", description="Desc")
+        self.on_site = JobPosting.objects.create(title="D", company=self.company, location="On-site", description="Desc")
+        self.remote = JobPosting.objects.create(title="E", company=Company.objects.create(name="Remote Co"), location="Remote", description="Desc")
+        self.client.force_authenticate(user=self.applicant)
+
+    def test_locations_resolve_with_company_fallback(self):
+        self.assertAlmostEqual(self.austin.latitude, 30.2672)
+        self.assertAlmostEqual(self.on_site.latitude, 47.6062)  # falls back to the company's Seattle location
+        self.assertIsNone(self.remote.latitude)
+
+    def test_near_filters_by_radius_and_orders_by_distance(self):
+        r = self.client.get("/api/job-postings/", {"near": "Austin, TX", "radius": 50})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([job["id"] for job in r.data], [self.austin.id, self.round_rock.id])
+        self.assertLess(r.data[1]["distance_km"], 50)
+
+        r = self.client.get("/api/job-postings/", {"near": "30.2672,-97.7431", "radius": 150})
+        self.assertEqual([job["id"] for job in r.data], [self.austin.id, self.round_rock.id, self.san_antonio.id])
+
+    def test_unknown_place_or_bad_radius_is_rejected(self):
+        self.assertEqual(self.client.get("/api/job-postings/", {"near": "Atlantis"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/job-postings/", {"near": "Austin", "radius": "far"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_backfill_command_geocodes_missing_rows(self):
+        JobPosting.objects.update(latitude=None, longitude=None)
+        call_command("geocode_postings", batch_size=2, stdout=io.StringIO())
+        self.austin.refresh_from_db()
+        self.assertAlmostEqual(self.austin.longitude, -97.7431)
+
+
+flaky_calls = []
+
+@task("test_flaky", max_attempts=3, backoff=0)
+def flaky_task(fail_times):
+    flaky_calls.append(fail_times)
+    if len(flaky_calls) <= fail_times:
+        raise RuntimeError("boom")
+
+@task("test_limited", concurrency=1)
+def limited_task():
+    pass
+
+
+class TaskQueueTests(APITestCase):
+    def setUp(self):
+        flaky_calls.clear()
+        self.company = Company.objects.create(name="TestCo")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.app = Application.objects.create(applicant=self.applicant, job=self.job, status=Application.AP)
+
+    def test_tasks_are_enqueued_only_when_the_transaction_commits(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue("test_flaky", fail_times=0)
+                raise RuntimeError("roll back")
+        self.assertFalse(Task.objects.exists())
+
+        self.app.transition_status(Application.IN)
+        self.assertFalse(Task.objects.exists()) # its notification goes through the outbox instead
+
+        with transaction.atomic():
+            queued = enqueue("test_flaky", fail_times=0)
+        self.assertEqual(queued.payload, {"fail_times": 0})
+        self.assertEqual(Worker().drain(), 1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.DONE)
+
+    def test_failures_are_retried_then_marked_failed(self):
+        succeeds = enqueue("test_flaky", fail_times=1)
+        with self.assertLogs("jobs.taskqueue", level="WARNING"):
+            Worker(["test_flaky"]).drain()
+        succeeds.refresh_from_db()
+        self.assertEqual((succeeds.status, succeeds.attempts), (Task.DONE, 2))
+
+        flaky_calls.clear()
+        fails = enqueue("test_flaky", fail_times=5)
+        with self.assertLogs("jobs.taskqueue", level="WARNING"):
+            Worker(["test_flaky"]).drain()
+        fails.refresh_from_db()
+        self.assertEqual((fails.status, fails.attempts), (Task.FAILED, 3))
+        self.assertIn("RuntimeError: boom", fails.last_error)
+
+    def test_expired_leases_are_reclaimed_and_concurrency_is_capped(self):
+        running = enqueue("test_limited")
+        enqueue("test_limited")
+        Task.objects.filter(id=running.id).update(status=Task.RUNNING, attempts=1, locked_until=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(Worker(["test_limited"]).claim())
+
+        # The first worker died: once its lease expires both tasks can run again
+        Task.objects.filter(id=running.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(Worker(["test_limited"]).drain(), 2)
+        self.assertEqual(set(Task.objects.values_list("status", flat=True)), {Task.DONE})
+
+    def test_expired_leases_on_the_last_attempt_are_dead_lettered(self):
+        crashing = enqueue("test_flaky", fail_times=0)
+        # Its worker died on every attempt, the last one included
+        Task.objects.filter(id=crashing.id).update(status=Task.RUNNING, attempts=3, locked_until=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs("jobs.taskqueue", level="ERROR"):
+            self.assertEqual(Worker(["test_flaky"]).drain(), 0)
+        crashing.refresh_from_db()
+        self.assertEqual((crashing.status, crashing.attempts), (Task.FAILED, 3))
+        self.assertEqual(flaky_calls, [])
+
+
+class FailingSink:
+    def deliver(self, notifications):
+        raise ConnectionError("smtp down")
+
+
+class RejectingSink:
+    # Delivers everyone except the given recipients
+    def __init__(self, *rejected):
+        self.rejected, self.delivered = set(rejected), []
+
+    def deliver(self, notifications):
+        self.delivered += [n.recipient_id for n in notifications if n.recipient_id not in self.rejected]
+        return {n.recipient_id: "mailbox unavailable" for n in notifications if n.recipient_id in self.rejected}
+
+
+@override_settings(NOTIFICATION_SINK="jobs.notifications.EmailSink")
+class NotificationOutboxTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345", email="a@a.com")
+        self.jobs = [JobPosting.objects.create(title=f"Engineer {i}", company=self.company, location="Remote", description="Desc") for i in range(2)]
+        self.apps = [Application.objects.create(applicant=self.applicant, job=job, status=Application.AP) for job in self.jobs]
+
+    def test_outbox_rows_are_written_only_for_employer_decisions(self):
+        self.apps[0].transition_status(Application.DR)
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.apps[1].transition_status(Application.IN)
+        self.assertEqual(OutboxMessage.objects.get().recipient, self.applicant)
+
+    def test_changes_are_coalesced_per_applicant_and_delivered_once(self):
+        self.apps[0].transition_status(Application.IN)
+        self.apps[0].transition_status(Application.OF)
+        self.apps[1].transition_status(Application.RE)
+
+        stats = dispatch(batch_size=2)
+        self.assertEqual((stats.messages, stats.batches), (3, 2))
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(len(mail.outbox), 2)  # one email per batch, each coalescing that batch's changes
+        self.assertIn("Engineer 0 at TestCo: Offer", mail.outbox[0].body)
+        self.assertNotIn("Interview", mail.outbox[0].body)
+        self.assertEqual(dispatch().messages, 0)
+
+    def test_failed_delivery_keeps_messages_for_retry(self):
+        self.apps[0].transition_status(Application.RE)
+        with self.assertLogs("jobs.notifications", level="ERROR"):
+            stats = dispatch(sink=FailingSink())
+        self.assertEqual(stats.failures, 1)
+        self.assertEqual(OutboxMessage.objects.get().attempts, 1)
+
+        dispatch()
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(mail.outbox[0].to, ["a@a.com"])
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_failures_are_per_recipient_and_dead_lettered(self):
+        other = User.objects.create_user(username="other", password="pass12345", email="o@o.com")
+        self.apps[0].transition_status(Application.RE)
+        Application.objects.create(applicant=other, job=self.jobs[0], status=Application.AP).transition_status(Application.IN)
+
+        sink = RejectingSink(other.id)
+        self.assertEqual(dispatch(sink=sink).failures, 1)
+        self.assertEqual(sink.delivered, [self.applicant.id]) # the rest of the batch still goes out, once
+        self.assertEqual(OutboxMessage.objects.get().recipient, other)
+
+        with self.assertLogs("jobs.notifications", level="ERROR"):
+            stats = dispatch(sink=sink)
+        self.assertEqual((stats.dead_lettered, sink.delivered), (1, [self.applicant.id]))
+        self.assertIsNotNone(OutboxMessage.objects.get().failed_at)
+        self.assertEqual(dispatch(sink=sink).batches, 0) # never retried
+
+
+class PasswordHashingTests(APITestCase):
+    LOGIN = "/api/auth/login/"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="applicant", password="pass12345")
+
+    def test_register_and_login_hash_in_the_pool(self):
+        res = self.client.post("/api/auth/register/", {"username": "new", "email": "new@x.com", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(User.objects.get(username="new").check_password("pass12345"))
+
+        res = self.client.post(self.LOGIN, {"username": "new", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("access", res.data)
+
+    @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher", "django.contrib.auth.hashers.PBKDF2PasswordHasher"])
+    def test_outdated_hash_is_upgraded_on_login(self):
+        res = self.client.post(self.LOGIN, {"username": "applicant", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("md5$"))
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0, PASSWORD_HASH_WAIT=0.01)
+    def test_logins_are_shed_when_hashing_is_at_capacity(self):
+        with admitted():
+            res = self.client.post(self.LOGIN, {"username": "applicant", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res["Retry-After"], "2")
+
+        res = self.client.post(self.LOGIN, {"username": "applicant", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(AUTH_THROTTLE_RATES={"login_ip": "30/min", "login_username": "2/min"})
+    def test_failed_logins_drain_the_username_bucket(self):
+        for _ in range(3):
+            res = self.client.post(self.LOGIN, {"username": "applicant", "password": "pass12345"}, format="json")
+            self.assertEqual(res.status_code, 200) # successful logins are free
+        for _ in range(2):
+            res = self.client.post(self.LOGIN, {"username": "Applicant", "password": "wrong-password"}, format="json")
+            self.assertEqual(res.status_code, 401)
+
+        res = self.client.post(self.LOGIN, {"username": "applicant", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 429)
+        self.assertGreater(int(res["Retry-After"]), 0)
+        # The bucket is in the shared cache, so another server process refuses the attempt too
+        with in_another_process():
+            res = self.client.post(self.LOGIN, {"username": "applicant", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 429)
+
+    def test_malformed_login_body_is_a_client_error(self):
+        res = self.client.post(self.LOGIN, [1, 2], format="json")
+        self.assertEqual(res.status_code, 400)
+
+
+@override_settings(CACHES=PROCESS_CACHE)
+class RegistrationQueryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username="taken", password="pass12345", email="taken@x.com")
+
+    def test_register_is_one_transaction_with_two_inserts(self):
+        # SAVEPOINT, INSERT user, INSERT profile, RELEASE
+        with self.assertNumQueries(4):
+            res = self.client.post("/api/auth/register/", {"username": "new", "email": "new@x.com", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        profile = Profile.objects.get(user__username="new")
+        self.assertEqual((profile.account_type, profile.company), (Profile.ACCOUNT_APPLICANT, None))
+
+    def test_duplicates_are_rejected_by_constraints(self):
+        res = self.client.post("/api/auth/register/", {"username": "taken", "email": "other@x.com", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("username", res.data)
+        res = self.client.post("/api/auth/register/", {"username": "other", "email": "taken@x.com", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("email", res.data)
+        res = self.client.post("/api/auth/register/", {"username": "other", "email": "Taken@X.com", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("email", res.data)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_login_and_user_saves_skip_the_profile(self):
+        # SELECT user, INSERT outstanding refresh token
+        with self.assertNumQueries(2):
+            res = self.client.post("/api/auth/login/", {"username": "taken", "password": "pass12345"}, format="json")
+        self.assertEqual(res.status_code, 200)
+
+        user = User.objects.get(username="taken")
+        with self.assertNumQueries(1):
+            user.save(update_fields=["last_login"])
+
+
+class JobPostingLifecycleTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        today = timezone.localdate()
+        self.open = JobPosting.objects.create(title="Open", company=self.company, location="Remote", description="Desc", expires_at=today)
+        self.due = JobPosting.objects.create(title="Due", company=self.company, location="Remote", description="Desc", expires_at=today - timedelta(days=1))
+
+    def test_expiry_sweep_and_close_hide_postings_from_applicants(self):
+        call_command("expire_job_postings", stdout=io.StringIO())
+        self.due.refresh_from_db()
+        self.assertEqual(self.due.status, JobPosting.EX)
+
+        self.client.force_authenticate(user=self.employer)
+        r = self.client.post(f"/api/job-postings/{self.open.id}/close/")
+        self.assertEqual(r.data["status"], JobPosting.CL)
+        self.assertEqual(self.client.post(f"/api/job-postings/{self.open.id}/close/").status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(len(self.client.get("/api/job-postings/").data), 2)
+
+        self.client.force_authenticate(user=self.applicant)
+        self.assertEqual(self.client.get("/api/job-postings/").data, [])
+        self.assertEqual(self.client.post(f"/api/job-postings/{self.due.id}/apply/").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_archive_moves_old_closed_postings_and_applications(self):
+        application = Application.objects.create(applicant=self.applicant, job=self.due, status=Application.IN)
+        draft = Application.objects.create(applicant=User.objects.create_user(username="drafter"), job=self.due)
+        Interview.objects.create(application=application, interview_date=timezone.now(), interviewer_name="Sam")
+        JobPosting.expire_due()
+        JobPosting.objects.filter(id=self.due.id).update(closed_at=timezone.now() - timedelta(days=100))
+
+        out = io.StringIO()
+        call_command("archive_job_postings", "--batch-size", "1", stdout=out)
+        self.assertIn("Archived 1 job postings and 2 applications", out.getvalue())
+        self.assertFalse(JobPosting.objects.filter(id=self.due.id).exists())
+        self.assertFalse(Interview.objects.exists())
+
+        self.client.force_authenticate(user=self.employer)
+        self.assertEqual([job["id"] for job in self.client.get("/api/job-postings/", {"archived": 1}).data], [self.due.id])
+        r = self.client.get(f"/api/job-postings/{self.due.id}/", {"archived": 1})
+        self.assertEqual(r.data["status"], JobPosting.EX)
+        r = self.client.get("/api/applications/", {"archived": 1})
+        self.assertEqual([row["id"] for row in r.data], [application.id]) # not the archived draft
+        self.assertEqual(r.data[0]["interview"]["interviewer_name"], "Sam")
+        self.assertEqual(self.client.get(f"/api/applications/{draft.id}/", {"archived": 1}).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.applicant)
+        self.assertEqual(self.client.get("/api/job-postings/", {"archived": 1}).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(len(self.client.get("/api/applications/", {"archived": 1}).data), 1)
+
+
+# Not about resumes; submitting without one keeps these focused
+@override_settings(APPLICATION_RESUME_REQUIRED=False)
+class ApplicationCounterTests(APITransactionTestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.applicants = [User.objects.create_user(username=f"applicant{i}", password="pass12345") for i in range(12)]
+
+    def counters(self):
+        job = JobPosting.objects.get(id=self.job.id)
+        return job.application_count, {status: getattr(job, field) for status, field in Application.STATUS_COUNTERS.items()}
+
+    def actual(self):
+        apps = Application.objects.filter(job=self.job)
+        return apps.exclude(status=Application.DR).count(), {status: apps.filter(status=status).count() for status in Application.STATUS_COUNTERS}
+
+    def apply_and_submit(self, applicant):
+        client = APIClient()
+        client.force_authenticate(user=applicant)
+        try:
+            app_id = client.post(f"/api/job-postings/{self.job.id}/apply/", {}, format="json").data["application"]["id"]
+            client.post(f"/api/applications/{app_id}/submit/")
+            if applicant.username.endswith(("0", "1")):
+                client.post(f"/api/applications/{app_id}/withdraw/")
+        finally:
+            connection.close()
+
+    def employer_decides(self, application_id):
+        client = APIClient()
+        client.force_authenticate(user=self.employer)
+        try:
+            action = "promote_to_interview" if application_id % 2 else "reject"
+            client.post(f"/api/applications/{application_id}/{action}/")
+        finally:
+            connection.close()
+
+    def test_counters_stay_exact_under_concurrent_updates(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(self.apply_and_submit, self.applicants))
+        self.assertEqual(self.counters(), self.actual())
+        self.assertEqual(self.counters()[0], 8) # applicants 0, 1, 10 and 11 withdrew back to draft
+
+        submitted = list(Application.objects.filter(job=self.job, status=Application.AP).values_list("id", flat=True))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(self.employer_decides, submitted * 2)) # duplicates lose the compare-and-swap and must not count
+        self.assertEqual(self.counters(), self.actual())
+
+        Application.objects.filter(job=self.job, status=Application.RE).delete()
+        self.assertEqual(self.counters(), self.actual())
+
+        self.client.force_authenticate(user=self.employer)
+        data = self.client.get(f"/api/job-postings/{self.job.id}/").data
+        self.assertEqual(data["application_count"], self.actual()[0])
+        self.client.force_authenticate(user=self.applicants[0])
+        self.assertNotIn("application_count", self.client.get(f"/api/job-postings/{self.job.id}/").data)
+
+    def test_posting_edits_do_not_overwrite_counters_and_reconcile_fixes_drift(self):
+        stale = JobPosting.objects.get(id=self.job.id)
+        Application.objects.create(applicant=self.applicants[0], job=self.job, status=Application.AP)
+        stale.title = "Senior Engineer"
+        stale.save()
+        self.assertEqual(self.counters(), self.actual())
+
+        JobPosting.objects.filter(id=self.job.id).update(application_count=7, offer_count=-2)
+        out = io.StringIO()
+        call_command("reconcile_application_counts", stdout=out)
+        self.assertIn("Fixed 1", out.getvalue())
+        self.assertEqual(self.counters(), self.actual())
+
+
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="TestCo")
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        User.objects.create_user(username="applicant", password="pass12345")
+        r = self.client.post("/api/auth/login/", {"username": "applicant", "password": "pass12345"}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {r.data['access']}")
+
+    def routed_reads(self, method, url):
+        # Which alias the request's reads went to, with "default" standing in as the only replica
+        seen = []
+        def choose():
+            seen.append("replica")
+            return "default"
+        with override_settings(DATABASE_REPLICAS=["default"]), mock.patch("jobs.routers.choose_replica", choose):
+            response = getattr(self.client, method)(url)
+        return response, bool(seen)
+
+    def test_reads_use_replicas_until_the_user_writes(self):
+        r, on_replica = self.routed_reads("get", "/api/job-postings/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertTrue(on_replica)
+
+        r, on_replica = self.routed_reads("post", f"/api/job-postings/{self.job.id}/apply/")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(on_replica)
+
+        # Read-your-writes: pinned to the primary for REPLICA_PIN_SECONDS
+        r, on_replica = self.routed_reads("get", "/api/applications/")
+        self.assertEqual(len(r.data), 1)
+        self.assertFalse(on_replica)
+
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.assertTrue(self.routed_reads("get", "/api/applications/")[1])
+
+    def test_pins_are_seen_by_every_server_process(self):
+        self.routed_reads("post", f"/api/job-postings/{self.job.id}/apply/")
+        # Another process has none of this one's memory, so the pin has to come from the shared cache
+        with in_another_process():
+            r, on_replica = self.routed_reads("get", "/api/applications/")
+        self.assertEqual(len(r.data), 1)
+        self.assertFalse(on_replica)
+
+    def test_background_code_reads_from_the_primary(self):
+        with override_settings(DATABASE_REPLICAS=["replica1"]):
+            self.assertEqual(ReplicaRouter().db_for_read(JobPosting), "default")
+            self.assertFalse(ReplicaRouter().allow_migrate("replica1", "jobs"))
+
+
+class ReplicaSyncTests(APITransactionTestCase):
+    def test_sync_copies_the_primary_into_replica_files(self):
+        JobPosting.objects.create(title="Engineer", company=Company.objects.create(name="TestCo"), location="Remote", description="Desc")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/db.replica1.sqlite3"
+            databases = {**settings.DATABASES, "replica1": {"ENGINE": "django.db.backends.sqlite3", "NAME": f"file:{path}?mode=ro"}}
+            with override_settings(DATABASES=databases, DATABASE_REPLICAS=["replica1"]):
+                call_command("sync_replicas", stdout=io.StringIO())
+            with closing(sqlite3.connect(path)) as replica:
+                self.assertEqual(replica.execute("SELECT title FROM jobs_jobposting").fetchall(), [("Engineer",)])
+
+
+class ShardHelperTests(APITestCase):
+    @override_settings(DATABASE_SHARDS=["shard0", "shard1", "shard2"])
+    def test_ids_and_companies_map_to_shards(self):
+        self.assertEqual(shard_for_company(4), "shard1")
+        self.assertEqual(shard_for_pk(17), "shard0")
+        self.assertEqual(shard_for_pk((2 << SHARD_ID_BITS) + 17), "shard2")
+        with self.assertRaises(ValueError):
+            shard_for_pk(3 << SHARD_ID_BITS)
+
+    @override_settings(DATABASE_SHARDS=[])
+    def test_helpers_defer_to_the_default_routing_when_sharding_is_off(self):
+        self.assertIsNone(shard_for_company(4))
+        self.assertIsNone(shard_for_pk(17))
+        self.assertEqual(all_shards(), [None])
+
+
+# The rest of the suite only declares the default database, so with DB_SHARDS=N run just these:
+#   DB_SHARDS=2 python manage.py test jobs.tests.ShardingTests
+@skipUnless(settings.DATABASE_SHARDS, "set DB_SHARDS=N to run the sharding tests")
+@override_settings(APPLICATION_RESUME_REQUIRED=False)
+class ShardingTests(APITransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        for alias in settings.DATABASE_SHARDS:
+            seed_id_range(alias)
+        # One company on each of the first two shards
+        companies = {}
+        while len(companies) < 2:
+            company = Company.objects.create(name=f"Co{Company.objects.count()}")
+            companies.setdefault(shard_for_company(company.id), company)
+        self.first, self.second = companies.values()
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.first
+        self.employer.profile.save()
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.jobs = [
+            JobPosting.objects.create(title=f"Engineer at {company.name}", company=company, location="Remote", description="Desc")
+            for company in (self.first, self.second)
+        ]
+
+    def test_company_rows_live_on_their_shard_and_applicant_reads_fan_out(self):
+        for company, job in zip((self.first, self.second), self.jobs):
+            self.assertEqual(job._state.db, shard_for_company(company.id))
+            self.assertEqual(shard_for_pk(job.id), shard_for_company(company.id))
+
+        self.client.force_authenticate(user=self.applicant)
+        self.assertEqual({job["id"] for job in self.client.get("/api/job-postings/").data}, {job.id for job in self.jobs})
+        for job in self.jobs:
+            r = self.client.post(f"/api/job-postings/{job.id}/apply/", {}, format="json")
+            self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+            self.client.post(f"/api/applications/{r.data['application']['id']}/submit/")
+        self.assertEqual(len(self.client.get("/api/applications/").data), 2)
+
+        # The employer only touches its own company's shard
+        self.client.force_authenticate(user=self.employer)
+        applications = self.client.get("/api/applications/").data
+        self.assertEqual([a["job"]["id"] for a in applications], [self.jobs[0].id])
+        r = self.client.post(f"/api/applications/{applications[0]['id']}/promote_to_interview/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        r = self.client.post("/api/interviews/", {
+            "application": applications[0]["id"], "interview_date": (timezone.now() + timedelta(days=1)).isoformat(),
+            "interviewer_name": "Dana",
+        }, format="json")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Interview.objects.using(shard_for_company(self.first.id)).count(), 1)
+        self.assertEqual(JobPosting.objects.using(shard_for_company(self.first.id)).get().interview_count, 1)
+
+    def test_fanned_out_lists_are_paginated(self):
+        self.client.force_authenticate(user=self.applicant)
+        first = self.client.get("/api/job-postings/", {"page": 1, "page_size": 1}).data
+        second = self.client.get("/api/job-postings/", {"page": 2, "page_size": 1}).data
+        self.assertEqual((first["count"], len(first["results"]), second["next"]), (2, 1, None))
+        self.assertEqual(sorted(page["results"][0]["id"] for page in (first, second)), sorted(job.id for job in self.jobs))
+
+    def test_atomic_batch_rolls_back_writes_on_shards(self):
+        self.client.force_authenticate(user=self.applicant)
+        r = self.client.post("/api/batch/", {"atomic": True, "operations": [
+            {"method": "POST", "path": f"/api/job-postings/{self.jobs[0].id}/apply/", "body": {}},
+            {"method": "POST", "path": f"/api/job-postings/{self.jobs[1].id}/apply/", "body": {}},
+            {"method": "POST", "path": "/api/interviews/", "body": {}},
+        ]}, format="json")
+        self.assertEqual([result["status"] for result in r.data["results"]], [201, 201, 400])
+        self.assertTrue(r.data["rolled_back"])
+        for company in (self.first, self.second):
+            self.assertFalse(Application.objects.using(shard_for_company(company.id)).exists())
+
+
+class AdminScalingTests(APITestCase):
+    def setUp(self):
+        company = Company.objects.create(name="TestCo")
+        job = JobPosting.objects.create(title="Engineer", company=company, location="Remote", description="Desc")
+        applicants = User.objects.bulk_create([User(username=f"applicant{i}") for i in range(30)])
+        Application.objects.bulk_create([Application(applicant=applicant, job=job, status=Application.AP) for applicant in applicants])
+        self.staff = User.objects.create_superuser(username="staff", password="pass12345")
+        self.client.force_login(self.staff)
+
+    def test_change_list_queries_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get("/admin/jobs/application/")
+        self.assertEqual(r.status_code, 200)
+        self.assertContains(r, "applicant29")
+        self.assertLess(len(queries), 10)
+        r = self.client.get("/admin/jobs/application/?q=applicant3") # Not an id; the id__exact search must skip it
+        self.assertContains(r, "applicant3")
+        self.assertNotContains(r, "applicant29")
+        # Raw-id widgets: the change form doesn't list every user and posting
+        r = self.client.get(f"/admin/jobs/application/{Application.objects.first().id}/change/")
+        self.assertNotContains(r, "applicant29")
+
+    def test_filtered_counts_are_not_estimated_from_table_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        with override_settings(EXACT_COUNT_THRESHOLD=10):
+            paginator = EstimatedCountPaginator(Application.objects.order_by("id"), 5)
+            self.assertEqual((paginator.count, paginator.count_is_approximate), (30, True))
+            some = Application.objects.filter(applicant__username__lt="applicant2").order_by("id") # 0, 1 and 10-19
+            paginator = EstimatedCountPaginator(some, 5)
+            self.assertEqual((paginator.count, paginator.count_is_approximate), (12, False))
+
+    def test_searches_and_date_drill_down_use_indexes(self):
+        today = timezone.localdate()
+        self.assertIn("company_name_idx", Company.objects.filter(name__istartswith="test").explain())
+        self.assertIn("jobposting_posted_idx", JobPosting.objects.filter(posted_date__year=today.year).explain())
+        self.assertIn("application_date_idx", Application.objects.filter(application_date__year=today.year).explain())
+        r = self.client.get(f"/admin/jobs/jobposting/?q={Company.objects.get().id}")
+        self.assertContains(r, "Engineer")
+
+    def test_counts_are_estimated_above_the_threshold(self):
+        with override_settings(EXACT_COUNT_THRESHOLD=10):
+            paginator = EstimatedCountPaginator(Application.objects.order_by("id"), 5)
+            self.assertGreaterEqual(paginator.count, 11)
+            self.assertTrue(paginator.count_is_approximate)
+        paginator = EstimatedCountPaginator(Application.objects.order_by("id"), 5)
+        self.assertEqual((paginator.count, paginator.count_is_approximate), (30, False))
+
+
+class ApproximateCountPaginationTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        for i in range(3):
+            job = JobPosting.objects.create(title=f"Engineer {i}", company=self.company, location="Remote", description="Desc")
+            for j in range(4):
+                applicant = User.objects.create(username=f"applicant{i}-{j}")
+                Application.objects.create(applicant=applicant, job=job, status=Application.AP if j else Application.DR)
+
+    def test_lists_are_only_paginated_on_request(self):
+        self.client.force_authenticate(user=self.employer)
+        self.assertEqual(len(self.client.get("/api/job-postings/").data), 3)
+        r = self.client.get("/api/job-postings/?page=1&page_size=2")
+        self.assertEqual((r.data["count"], r.data["count_is_approximate"], len(r.data["results"])), (3, False, 2))
+        self.assertIsNotNone(r.data["next"])
+
+        # Over the threshold, but SQLite's statistics can't estimate one company's postings, so the count is exact
+        with override_settings(EXACT_COUNT_THRESHOLD=1):
+            r = self.client.get("/api/job-postings/?page=2&page_size=2")
+        self.assertEqual((r.data["count"], r.data["count_is_approximate"], len(r.data["results"])), (3, False, 1))
+
+    def test_employer_application_count_comes_from_posting_counters(self):
+        self.client.force_authenticate(user=self.employer)
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get("/api/applications/?page=1&page_size=5")
+        self.assertEqual((r.data["count"], r.data["count_is_approximate"], len(r.data["results"])), (9, False, 5))
+        self.assertFalse(any("COUNT" in q["sql"] and "jobs_application" in q["sql"].split("FROM")[1] for q in queries.captured_queries))
+
+
+class BatchRequestTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.jobs = [JobPosting.objects.create(title=f"Engineer {i}", company=self.company, location="Remote", description="Desc") for i in range(2)]
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        r = self.client.post("/api/auth/login/", {"username": "applicant", "password": "pass12345"}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {r.data['access']}")
+
+    def test_operations_run_in_one_request_with_their_own_statuses(self):
+        r = self.client.post("/api/batch/", {"operations": [
+            {"method": "GET", "path": "/api/auth/me/"},
+            {"method": "POST", "path": f"/api/job-postings/{self.jobs[0].id}/apply/", "body": {}},
+            {"method": "GET", "path": "/api/applications/"},
+            {"method": "GET", "path": "/api/job-postings/999999/"},
+        ]}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["status"] for result in r.data["results"]], [200, 201, 200, 404])
+        self.assertEqual(r.data["results"][0]["body"]["username"], "applicant")
+        self.assertEqual(len(r.data["results"][2]["body"]), 1)
+
+        r = self.client.post("/api/batch/", {"operations": [{"method": "GET", "path": "/api/batch/"}]}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post("/api/batch/", [{"method": "GET", "path": "/api/auth/me/"}], format="json").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_atomic_batch_rolls_back_when_an_operation_fails(self):
+        r = self.client.post("/api/batch/", {"atomic": True, "operations": [
+            {"method": "POST", "path": f"/api/job-postings/{self.jobs[1].id}/apply/", "body": {}},
+            {"method": "POST", "path": "/api/job-postings/999999/apply/", "body": {}},
+            {"method": "GET", "path": "/api/applications/"},
+        ]}, format="json")
+        self.assertEqual([result["status"] for result in r.data["results"]], [201, 404, 424])
+        self.assertTrue(r.data["rolled_back"])
+        self.assertFalse(Application.objects.filter(applicant=self.applicant).exists())
+
+    def test_idempotency_keys_apply_per_operation(self):
+        # A key on the batch request itself isn't shared by its operations
+        r = self.client.post("/api/batch/", {"operations": [
+            {"method": "POST", "path": f"/api/job-postings/{job.id}/apply/", "body": {}} for job in self.jobs
+        ]}, format="json", HTTP_IDEMPOTENCY_KEY="batch-1")
+        self.assertEqual([result["status"] for result in r.data["results"]], [201, 201])
+
+        application_id = r.data["results"][0]["body"]["application"]["id"]
+        submit = {"method": "POST", "path": f"/api/applications/{application_id}/submit/", "idempotency_key": "submit-1"}
+        with override_settings(APPLICATION_RESUME_REQUIRED=False):
+            r = self.client.post("/api/batch/", {"operations": [submit, submit]}, format="json")
+        self.assertEqual([result["status"] for result in r.data["results"]], [200, 200]) # the second is a replay
+        self.assertEqual(self.client.post("/api/batch/", {"operations": [{**submit, "idempotency_key": 1}]}, format="json").status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DashboardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.jobs = [JobPosting.objects.create(title=f"Engineer {i}", company=self.company, location="Remote", description="Desc") for i in range(3)]
+        self.applications = [Application.objects.create(applicant=self.applicant, job=job, status=Application.AP) for job in self.jobs]
+
+    def dashboard(self, user):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get("/api/dashboard/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        return r.data, len(queries)
+
+    def test_applicant_dashboard_is_cached_until_an_application_changes(self):
+        data, first = self.dashboard(self.applicant)
+        self.assertEqual((data["me"]["username"], len(data["applications"]), data["status_counts"]["AP"]), ("applicant", 3, 3))
+        data, cached = self.dashboard(self.applicant)
+        self.assertLess(cached, first)
+
+        # The employer's write, handled by another server process, invalidates the applicant's dashboard
+        self.client.force_authenticate(user=self.employer)
+        with in_another_process(), self.captureOnCommitCallbacks(execute=True): # scope versions are bumped on commit
+            self.client.post(f"/api/applications/{self.applications[0].id}/promote_to_interview/")
+        data, _ = self.dashboard(self.applicant)
+        self.assertEqual((data["status_counts"]["AP"], data["status_counts"]["IN"]), (2, 1))
+
+    @override_settings(CACHES=PROCESS_CACHE)
+    def test_employer_dashboard_query_count_does_not_grow_with_rows(self):
+        data, few = self.dashboard(self.employer)
+        self.assertEqual((len(data["postings"]), data["application_count"], len(data["recent_applications"])), (3, 3, 3))
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                Application.objects.create(applicant=User.objects.create(username=f"more{i}"), job=self.jobs[0], status=Application.AP)
+        data, many = self.dashboard(self.employer)
+        self.assertEqual((data["application_count"], len(data["recent_applications"])), (8, 8))
+        self.assertNotIn(Application.DR, data["status_counts"]) # drafts are never shown to employers
+        self.assertNotIn(Application.DR, data["postings"][0]["status_counts"])
+        self.assertEqual(few, many)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.jobs = [JobPosting.objects.create(title=f"Engineer {i}", company=self.company, location="Remote", description="Desc") for i in range(20)]
+
+    def test_applicant_polls_only_changed_rows_and_tombstones(self):
+        self.client.force_authenticate(user=self.applicant)
+        r = self.client.get("/api/job-postings/")
+        self.assertEqual(len(r.data), 20)
+        cursor = r["X-Change-Cursor"]
+
+        r = self.client.get(f"/api/job-postings/?since={cursor}")
+        self.assertEqual((r.data["results"], r.data["deleted"], str(r.data["cursor"])), ([], [], cursor))
+
+        self.jobs[0].title = "Senior Engineer"
+        self.jobs[0].save()
+        self.jobs[1].close() # no longer visible to applicants
+        deleted_id = self.jobs[2].id
+        self.jobs[2].delete()
+        r = self.client.get(f"/api/job-postings/?since={cursor}")
+        self.assertEqual([job["title"] for job in r.data["results"]], ["Senior Engineer"])
+        self.assertEqual(sorted(r.data["deleted"]), [self.jobs[1].id, deleted_id])
+        self.assertGreater(r.data["cursor"], int(cursor))
+
+        r = self.client.get(f"/api/job-postings/?since={r.data['cursor']}")
+        self.assertEqual((r.data["results"], r.data["deleted"]), ([], []))
+
+    def test_counter_changes_stay_out_of_other_applicants_feeds(self):
+        self.client.force_authenticate(user=self.applicant)
+        cursor = self.client.get("/api/job-postings/")["X-Change-Cursor"]
+        other = User.objects.create_user(username="other", password="pass12345")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.post(f"/api/job-postings/{self.jobs[0].id}/apply/").status_code, status.HTTP_201_CREATED)
+
+        self.client.force_authenticate(user=self.applicant)
+        r = self.client.get(f"/api/job-postings/?since={cursor}")
+        self.assertEqual((r.data["results"], r.data["deleted"]), ([], []))
+        # The posting's employers still get it, since they see its counters
+        self.client.force_authenticate(user=self.employer)
+        r = self.client.get(f"/api/job-postings/?since={cursor}")
+        self.assertEqual([job["id"] for job in r.data["results"]], [self.jobs[0].id])
+
+    def test_application_feed_is_scoped_to_the_viewer(self):
+        self.client.force_authenticate(user=self.employer)
+        cursor = self.client.get("/api/applications/")["X-Change-Cursor"]
+        other = Company.objects.create(name="OtherCo")
+        other_job = JobPosting.objects.create(title="Elsewhere", company=other, location="Remote", description="Desc")
+        mine = Application.objects.create(applicant=self.applicant, job=self.jobs[3], status=Application.AP)
+        Application.objects.create(applicant=self.applicant, job=other_job, status=Application.AP)
+
+        r = self.client.get(f"/api/applications/?since={cursor}")
+        self.assertEqual([application["id"] for application in r.data["results"]], [mine.id])
+        mine.transition_status(Application.DR) # Withdrawn: employers no longer see it
+        r = self.client.get(f"/api/applications/?since={r.data['cursor']}")
+        self.assertEqual((r.data["results"], r.data["deleted"]), ([], [mine.id]))
+
+        ChangeLog.objects.filter(id__lte=r.data["cursor"]).delete() # as pruning would
+        self.jobs[0].save()
+        self.assertEqual(self.client.get(f"/api/applications/?since={cursor}").status_code, status.HTTP_410_GONE)
+
+
+class EventStreamTests(APITransactionTestCase): # The stream closes its database connections like a request does
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.application = Application.objects.create(applicant=self.applicant, job=job, status=Application.AP)
+
+    def stream(self, token, during=None, until=None):
+        # Drives the ASGI app like a server would; returns the response start message and the concatenated body
+        from backend.asgi import application
+
+        async def scenario():
+            messages, closed = [], asyncio.Event()
+
+            async def receive():
+                await closed.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {"type": "http", "method": "GET", "path": "/api/events/", "query_string": f"token={token}".encode(), "headers": []}
+            server = asyncio.ensure_future(application(scope, receive, send))
+            for _ in range(200):
+                if messages or server.done():
+                    break
+                await asyncio.sleep(0.01)
+            if during is not None and not server.done():
+                await sync_to_async(during)()
+                for _ in range(200):
+                    if until in b"".join(m.get("body", b"") for m in messages):
+                        break
+                    await asyncio.sleep(0.01)
+            closed.set()
+            await asyncio.wait_for(server, 5)
+            return messages[0], b"".join(m.get("body", b"") for m in messages[1:])
+
+        return async_to_sync(scenario)()
+
+    def test_applicant_is_pushed_status_changes(self):
+        def employer_promotes():
+            self.application.transition_status(Application.IN)
+
+        start, body = self.stream(str(AccessToken.for_user(self.applicant)), during=employer_promotes, until=b"application_status")
+        self.assertEqual(start["status"], 200)
+        self.assertIn(b"event: application_status", body)
+        self.assertIn(b'"new_status": "IN"', body)
+
+    def test_invalid_token_is_rejected(self):
+        start, _ = self.stream("not-a-token")
+        self.assertEqual(start["status"], 401)
+
+
+class AttachmentTests(APITestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.storage_dir.cleanup)
+        self.settings_override = override_settings(ATTACHMENTS_ROOT=self.storage_dir.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        jobs = [JobPosting.objects.create(title=f"Engineer {i}", company=self.company, location="Remote", description="Desc") for i in range(2)]
+        self.applications = [Application.objects.create(applicant=self.applicant, job=job) for job in jobs]
+        self.pdf = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+    def upload(self, application, field="resume"):
+        self.client.force_authenticate(user=self.applicant)
+        upload = SimpleUploadedFile("My Resume.PDF", self.pdf, content_type="application/pdf")
+        return self.client.patch(f"/api/applications/{application.id}/", {field: upload}, format="multipart")
+
+    def test_identical_uploads_are_stored_once(self):
+        for application in self.applications:
+            r = self.upload(application)
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+            self.assertTrue(r.data["resume"].endswith(f"/api/applications/{application.id}/resume/"))
+        names = {application.resume.name for application in Application.objects.filter(pk__in=[a.pk for a in self.applications])}
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), r"^resumes/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$")
+        stored = [name for _, _, files in os.walk(os.path.join(self.storage_dir.name, "resumes")) for name in files]
+        self.assertEqual(len(stored), 1)
+
+    def test_download_supports_ranges_and_revalidation(self):
+        self.upload(self.applications[0])
+        url = f"/api/applications/{self.applications[0].id}/resume/"
+
+        r = self.client.get(url, HTTP_ACCEPT="application/pdf")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(r.streaming_content), self.pdf)
+        self.assertEqual(r["Content-Type"], "application/pdf")
+        etag = r["ETag"]
+
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        r = self.client.get(url, HTTP_RANGE="bytes=100-199", HTTP_IF_RANGE=etag)
+        self.assertEqual(r.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(r.streaming_content), self.pdf[100:200])
+        self.assertEqual(r["Content-Range"], f"bytes 100-199/{len(self.pdf)}")
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(self.pdf)}-").status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+        # Drafts aren't visible to the employer; with ATTACHMENTS_ACCEL_REDIRECT the web server sends the file
+        self.client.force_authenticate(user=self.employer)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.applications[0].transition_status(Application.AP)
+        with override_settings(ATTACHMENTS_ACCEL_REDIRECT="/protected/attachments/"):
+            r = self.client.get(url)
+        resume = Application.objects.get(pk=self.applications[0].pk).resume
+        self.assertEqual(r["X-Accel-Redirect"], f"/protected/attachments/{resume.name}")
+
+    def test_prune_keeps_referenced_files(self):
+        self.upload(self.applications[0])
+        self.upload(self.applications[1], field="cover_letter")
+        Application.objects.filter(pk=self.applications[1].pk).update(cover_letter=None)
+        out = io.StringIO()
+        call_command("prune_attachments", "--grace-hours=0", stdout=out)
+        self.assertIn("Deleted 1 ", out.getvalue())
+        resume = Application.objects.get(pk=self.applications[0].pk).resume
+        self.assertTrue(resume.storage.exists(resume.name))
+
+
+def make_pdf(text, compress=False):
+    # Smallest PDF the built-in reader accepts: one content stream drawing the text
+    content = f"BT /F1 12 Tf 72 712 Td ({text}) Tj ET".encode()
+    if compress:
+        content = zlib.compress(content)
+    return b"%%PDF-1.4\n4 0 obj << /Length %d >>\nstream\n%s\nendstream\nendobj\n%%%%EOF\n" % (len(content), content)
+
+
+class CandidateSearchTests(APITestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.storage_dir.cleanup)
+        self.settings_override = override_settings(ATTACHMENTS_ROOT=self.storage_dir.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.company = Company.objects.create(name="TestCo")
+        self.employer = User.objects.create_user(username="employer", password="pass12345")
+        self.employer.profile.account_type = Profile.ACCOUNT_EMPLOYER
+        self.employer.profile.company = self.company
+        self.employer.profile.save()
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+
+    def apply(self, username, file_name, content, status=Application.AP):
+        applicant = User.objects.create_user(username=username, password="pass12345")
+        application = Application.objects.create(applicant=applicant, job=self.job, status=status)
+        application.resume = SimpleUploadedFile(file_name, content)
+        application.save()
+        return application
+
+    def search(self, query):
+        self.client.force_authenticate(user=self.employer)
+        return self.client.get("/api/applications/search/", {"q": query})
+
+    def test_employer_search_ranks_indexed_resumes(self):
+        django_dev = self.apply("dana", "cv.pdf", make_pdf("Python and Django developer, Django REST framework"))
+        python_dev = self.apply("pat", "cv.pdf", make_pdf("Python data engineer", compress=True))
+        self.apply("rory", "cv.txt", b"Ruby on Rails developer")
+        self.apply("drew", "cv.pdf", make_pdf("Django developer"), status=Application.DR) # not submitted
+        self.assertEqual(Worker(["index_resume"]).drain(), 4)
+
+        r = self.search("django")
+        self.assertEqual([row["id"] for row in r.data], [django_dev.id])
+        r = self.search("python django")
+        self.assertEqual([row["id"] for row in r.data], [django_dev.id, python_dev.id])
+        self.assertGreater(r.data[0]["score"], r.data[1]["score"])
+        self.assertEqual(self.search("cobol").data, [])
+
+        self.client.force_authenticate(user=django_dev.applicant)
+        self.assertEqual(self.client.get("/api/applications/search/", {"q": "django"}).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_document_count_comes_from_the_company_documents(self):
+        self.apply("dana", "cv.pdf", make_pdf("Python and Django developer"))
+        self.apply("pat", "cv.txt", b"Ruby developer")
+        Worker(["index_resume"]).drain()
+        self.assertEqual(set(CandidateDocument.objects.values_list("company_id", flat=True)), {self.company.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.search("django").data), 1)
+        # Only the query terms' postings are read from the term index, never the whole company's slice of it
+        term_queries = [q["sql"] for q in queries.captured_queries if '"jobs_candidateterm"' in q["sql"]]
+        self.assertTrue(term_queries)
+        self.assertTrue(all('"term" IN' in sql for sql in term_queries), term_queries)
+
+    def test_indexing_is_idempotent_and_reuses_extracted_text(self):
+        first = self.apply("dana", "cv.pdf", make_pdf("Python and Django developer"))
+        Worker(["index_resume"]).drain()
+        extracted_at = CandidateDocument.objects.get(application=first).extracted_at
+
+        second = self.apply("pat", "cv.pdf", make_pdf("Python and Django developer")) # same file
+        enqueue("index_resume", application_id=first.id) # reprocessing an indexed file is a no-op
+        with mock.patch("jobs.candidates.extract_text") as extract:
+            self.assertEqual(Worker(["index_resume"]).drain(), 2)
+        extract.assert_not_called()
+        self.assertEqual(CandidateDocument.objects.get(application=first).extracted_at, extracted_at)
+        self.assertEqual(CandidateDocument.objects.get(application=second).text, "Python and Django developer")
+        self.assertEqual(len(self.search("django").data), 2)
+
+    def test_unreadable_documents_fail_without_retrying(self):
+        application = self.apply("dana", "cv.exe", b"MZ\x90\x00")
+        Worker(["index_resume"]).drain()
+        document = CandidateDocument.objects.get(application=application)
+        self.assertEqual(document.status, CandidateDocument.FAILED)
+        self.assertIn(".exe", document.error)
+        self.assertEqual(Task.objects.get(name="index_resume").status, Task.DONE)
+
+
+class ApplicationAnswersTests(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.years = JobAppQuestion.objects.create(job=self.job, question_prompt="Years of Python?", answer_type=JobAppQuestion.NUMBER)
+        self.start = JobAppQuestion.objects.create(job=self.job, question_prompt="Earliest start?", answer_type=JobAppQuestion.DATE, required=False)
+        self.why = JobAppQuestion.objects.create(job=self.job, question_prompt="Why us?")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.client.force_authenticate(user=self.applicant)
+        self.application = Application.objects.get(pk=self.client.post(f"/api/job-postings/{self.job.id}/apply/").data["application"]["id"])
+
+    def put_answers(self, answers):
+        return self.client.put(f"/api/applications/{self.application.id}/answers/", {"answers": answers}, format="json")
+
+    def test_answers_are_saved_in_one_upsert_and_checked_on_submit(self):
+        self.assertEqual(self.application.answers.count(), 3) # blank answers from apply
+        r = self.client.post(f"/api/applications/{self.application.id}/submit/")
+        self.assertEqual((r.status_code, sorted(r.data["missing_questions"])), (status.HTTP_400_BAD_REQUEST, [self.years.id, self.why.id]))
+
+        with CaptureQueriesContext(connection) as queries:
+            r = self.put_answers([{"question": self.years.id, "answer_value": "4"}, {"question": self.why.id, "answer_value": "The product"}])
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([q for q in queries if "ON CONFLICT" in q["sql"]]), 1)
+        self.assertEqual({row["question"]: row["answer_value"] for row in r.data}, {self.years.id: "4", self.start.id: None, self.why.id: "The product"})
+
+        r = self.client.post(f"/api/applications/{self.application.id}/submit/")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("missing_questions", r.data) # only the resume is missing now
+
+    def test_invalid_answers_are_rejected_together(self):
+        other = JobAppQuestion.objects.create(job=JobPosting.objects.create(title="Other", company=self.company), question_prompt="Elsewhere?")
+        r = self.put_answers([
+            {"question": self.years.id, "answer_value": "a few"},
+            {"question": self.start.id, "answer_value": "2026-02-30"},
+            {"question": other.id, "answer_value": "yes"},
+        ])
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(r.data["answers"]), {self.years.id, self.start.id, other.id})
+        self.assertFalse(self.application.answers.exclude(answer_value=None).exists())
+
+    def test_application_list_query_count_does_not_grow_with_answers(self):
+        def listed():
+            with CaptureQueriesContext(connection) as queries:
+                r = self.client.get("/api/applications/")
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+            return r.data, len(queries)
+
+        _, few = listed()
+        for i in range(3):
+            job = JobPosting.objects.create(title=f"Engineer {i}", company=self.company, location="Remote", description="Desc")
+            JobAppQuestion.objects.bulk_create([JobAppQuestion(job=job, question_prompt=f"Q{n}") for n in range(4)])
+            self.client.post(f"/api/job-postings/{job.id}/apply/")
+        data, many = listed()
+        rows = data["results"] if isinstance(data, dict) else data
+        self.assertEqual((len(rows), sum(len(row["answers"]) for row in rows)), (4, 15))
+        self.assertEqual(few, many)
+
+
+@override_settings(APPLICATION_RESUME_REQUIRED=False)
+class IdempotencyTests(APITransactionTestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="TestCo")
+        self.job = JobPosting.objects.create(title="Engineer", company=self.company, location="Remote", description="Desc")
+        self.applicant = User.objects.create_user(username="applicant", password="pass12345")
+        self.application = Application.objects.create(applicant=self.applicant, job=self.job)
+
+    def submit(self, key, data=None):
+        client = APIClient()
+        client.force_authenticate(user=self.applicant)
+        try:
+            return client.post(f"/api/applications/{self.application.id}/submit/", data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+        finally:
+            connection.close()
+
+    def test_retries_replay_the_first_response(self):
+        first = self.submit("retry-1")
+        self.assertEqual((first.status_code, first.data["status"]), (status.HTTP_200_OK, Application.AP))
+        retried = self.submit("retry-1") # without the key this would be a 400: no longer a draft
+        self.assertEqual((retried.status_code, retried.data), (status.HTTP_200_OK, first.data))
+        self.assertEqual(retried["Idempotent-Replayed"], "true")
+        self.assertEqual(ChangeLog.objects.filter(resource=ChangeLog.APPLICATIONS, object_id=self.application.id).count(), 2) # create + one submit
+
+        self.assertEqual(self.submit("retry-1", {"note": "changed"}).status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(self.submit("retry-2").status_code, status.HTTP_400_BAD_REQUEST) # a new key runs the action again
+
+    def test_concurrent_duplicates_run_once(self):
+        transition_status = Application.transition_status
+        calls = []
+
+        def slow_transition(application, *args, **kwargs):
+            calls.append(application.pk)
+            time.sleep(0.3) # the duplicates arrive while this one is running
+            return transition_status(application, *args, **kwargs)
+
+        with mock.patch.object(Application, "transition_status", slow_transition), ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(self.submit, ["same-key"] * 4))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({(r.status_code, r.data["status"]) for r in responses}, {(status.HTTP_200_OK, Application.AP)})
+        self.assertEqual(sum(r.has_header("Idempotent-Replayed") for r in responses), 3)
+
+    def test_failed_requests_release_the_key(self):
+        with mock.patch.object(Application, "transition_status", side_effect=RuntimeError("database went away")):
+            with self.assertRaises(RuntimeError):
+                self.submit("flaky")
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.submit("flaky").status_code, status.HTTP_200_OK)
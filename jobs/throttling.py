@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+# Token buckets kept in the shared cache (CACHES: Redis or a database table, never per-process memory), so every
+# server process spends from the same budget.
+# A bucket holds up to N tokens and refills at N per period; rates use DRF's "N/period" format ("10/min").
+# The read-modify-write isn't atomic, so concurrent requests can occasionally both spend the last token.
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucket:
+    def __init__(self, scope, ident, rate):
+        self.key = f"bucket:{scope}:{ident}"
+        self.capacity, self.period = parse_rate(rate)
+        self.refill_per_second = self.capacity / self.period
+
+    def tokens(self, now):
+        state = cache.get(self.key)
+        if state is None:
+            return float(self.capacity)
+        tokens, updated_at = state
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+    def wait(self):
+        # Seconds until a token is available, 0 if one is available now
+        missing = 1 - self.tokens(time.time())
+        return max(0.0, missing / self.refill_per_second)
+
+    def spend(self):
+        now = time.time()
+        cache.set(self.key, (self.tokens(now) - 1, now), timeout=self.period)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    # Requests are refused while any of the view's buckets is empty. Buckets are only spent by spend(),
+    # so a view decides which outcomes cost a token (e.g. only failed logins).
+    scopes = ()
+
+    def get_buckets(self, request):
+        rates = settings.AUTH_THROTTLE_RATES
+        buckets = []
+        for scope in self.scopes:
+            ident = self.get_scope_ident(scope, request)
+            if ident and rates.get(scope):
+                buckets.append(TokenBucket(scope, ident, rates[scope]))
+        return buckets
+
+    def get_scope_ident(self, scope, request):
+        if scope.endswith("_username"):
+            if not isinstance(request.data, dict):
+                return None # A malformed body; the view rejects it
+            username = request.data.get("username")
+            return str(username).lower() if username else None
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        self.wait_seconds = max((bucket.wait() for bucket in self.get_buckets(request)), default=0)
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+    def spend(self, request):
+        for bucket in self.get_buckets(request):
+            bucket.spend()
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scopes = ("login_ip", "login_username")
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scopes = ("register_ip",)
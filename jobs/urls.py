@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import JobPostingViewSet, ApplicationViewSet, InterviewViewSet
+from .views import JobPostingViewSet, ApplicationViewSet, InterviewViewSet, CalendarFeedTokenView, InterviewCalendarFeedView
 
 router = DefaultRouter()
 router.register(r'job-postings', JobPostingViewSet, basename='job-postings')
@@ -9,5 +9,7 @@ router.register(r'interviews', InterviewViewSet, basename='interviews')
 
 
 urlpatterns = [
+    path('calendar/', CalendarFeedTokenView.as_view(), name='calendar-token'),
+    path('calendar/<str:token>.ics', InterviewCalendarFeedView.as_view(), name='calendar-feed'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
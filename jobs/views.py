@@ -1,30 +1,88 @@
+import io
+import json
+import logging
+import os
+from contextlib import ExitStack
 from urllib import request
+from urllib.parse import urlsplit
 from rest_framework import viewsets
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import status as http_status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated, AllowAny, SAFE_METHODS
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied, ParseError
 from django.core.exceptions import ValidationError
-from .models import Profile, JobPosting, Application, Interview
-from .serializers import (JobPostingSerializer, ApplicationSerializer, InterviewSerializer, RegisterSerializer, MeSerializer)
+from .models import (Profile, JobPosting, Application, Interview, TransitionConflict, ArchivedJobPosting, ArchivedApplication, ChangeLog,
+                     JobAppQuestion, JobAppAnswer)
+from .serializers import (JobPostingSerializer, ApplicationSerializer, InterviewSerializer, RegisterSerializer, MeSerializer,
+                          ArchivedJobPostingSerializer, ArchivedApplicationSerializer, CandidateSearchResultSerializer,
+                          JobAppQuestionSerializer, JobAppAnswerSerializer, AnswerInputSerializer)
 from django.db import transaction
+from django.db.models import Prefetch, Sum
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse, resolve, Resolver404
+from django.core.handlers.wsgi import WSGIRequest
+from django.views import View
+from django.conf import settings
+from django.core.cache import cache
+from .attachments import IgnoreClientContentNegotiation, serve_attachment
+from .candidates import search as search_candidates
+from .caching import scope_version, company_scope, applicant_scope, user_scope
+from .idempotency import idempotent
+from .ical import render_calendar
+from .recommend import get_index
+from .geo import resolve_location, bounding_box_q, haversine_expression
+from .passwords import HashingUnavailable
+from .throttling import LoginThrottle, RegisterThrottle
+from .routers import replica_reads, is_pinned, pin_to_primary
+from .auth import BatchJWTAuthentication
+from .sharding import (needs_fan_out, evaluate as evaluate_across_shards, in_bulk as in_bulk_across_shards,
+                       iterate as iterate_across_shards, shard_for_company, shard_for_pk)
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
 
 # Create your views here.
 
+def hashing_unavailable(e):
+    return Response(
+        {"detail": "Too many sign-in requests right now, try again shortly."},
+        status=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+class LoginView(TokenObtainPairView):
+    throttle_classes = [LoginThrottle]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            # Only failed attempts spend the IP and username buckets
+            LoginThrottle().spend(request)
+            raise
+        except HashingUnavailable as e:
+            return hashing_unavailable(e)
+
 class RegisterView(generics.CreateAPIView):
     permission_classes = [AllowAny]
     serializer_class = RegisterSerializer
+    throttle_classes = [RegisterThrottle]
 
     def create(self, request, *args, **kwargs):
+        RegisterThrottle().spend(request)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        try:
+            serializer.save()
+        except HashingUnavailable as e:
+            return hashing_unavailable(e)
         return Response({"detail": "User registered successfully."}, status=http_status.HTTP_201_CREATED)
 
 class LogoutView(APIView):
@@ -54,18 +112,164 @@ class LogoutView(APIView):
 
         return Response(status=http_status.HTTP_205_RESET_CONTENT)
 
-class JobPostingViewSet(viewsets.ModelViewSet):
+class ReplicaReadsMixin:
+    # Safe requests read from a replica unless the user wrote recently; pinning happens in JWTLogoutAuthentication
+    def dispatch(self, request, *args, **kwargs):
+        token = replica_reads.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs) # authenticates, which may pin the user
+        if request.method in SAFE_METHODS and not (request.user.is_authenticated and is_pinned(request.user.pk)):
+            replica_reads.set(True)
+
+class CompanyShardMixin:
+    # With company sharding on, the queryset is pinned to the shard the request identifies (the employer's company,
+    # or the id in the URL); lists that span shards, like an applicant's own applications, fan out and merge.
+    def request_shard(self):
+        profile = self.request.user.profile
+        if profile.account_type == Profile.ACCOUNT_EMPLOYER and profile.company_id is not None:
+            return shard_for_company(profile.company_id)
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if pk is None:
+            return None
+        try:
+            return shard_for_pk(pk)
+        except ValueError:
+            raise Http404
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if not needs_fan_out(queryset):
+            return super().list(request, *args, **kwargs)
+        # Pages of a fanned-out list are merged from each shard's first rows (see MergedShards in pagination.py)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(evaluate_across_shards(queryset), many=True).data)
+
+class ChangeFeedMixin:
+    # ?since=<cursor> on a list returns only the rows changed after the cursor (see ChangeLog): current versions in
+    # "results", and tombstones in "deleted" for rows deleted or no longer visible to the user (a closed posting, an
+    # application withdrawn to draft). Plain lists send the current cursor in X-Change-Cursor, so a client takes one
+    # full list and then polls for deltas.
+    change_resource = None
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get("since")
+        if since is None or wants_archived(self):
+            cursor = ChangeLog.latest_cursor() # before the list, so nothing changed in between is skipped
+            response = super().list(request, *args, **kwargs)
+            response["X-Change-Cursor"] = str(cursor)
+            return response
+        try:
+            since = int(since)
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            return Response({"detail": "'since' must be a cursor from a previous response."}, status=http_status.HTTP_400_BAD_REQUEST)
+
+        # Entries before the oldest one left by `manage.py prune_change_log` are gone, so such a cursor may have missed some
+        oldest = ChangeLog.objects.order_by("id").values_list("id", flat=True).first()
+        if oldest is not None and since < oldest - 1:
+            return Response({"detail": "Cursor is older than the retained changes; fetch the full list again."}, status=http_status.HTTP_410_GONE)
+
+        limit = settings.CHANGE_FEED_LIMIT
+        entries = list(self.change_log().filter(id__gt=since).order_by("id").values_list("id", "object_id", "changed_at")[:limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        # Stop before changes too recent to be settled: a transaction that started earlier but commits later
+        # could still add an entry below them, and the client would skip it
+        settled_before = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+        for i, (_, _, changed_at) in enumerate(entries):
+            if changed_at > settled_before:
+                entries, has_more = entries[:i], True
+                break
+
+        ids = list(dict.fromkeys(object_id for _, object_id, _ in entries))
+        rows = in_bulk_across_shards(self.filter_queryset(self.get_queryset()), ids)
+        return Response({
+            "results": self.get_serializer([rows[pk] for pk in ids if pk in rows], many=True).data,
+            "deleted": [pk for pk in ids if pk not in rows],
+            "cursor": entries[-1][0] if entries else since,
+            "has_more": has_more,
+        })
+
+    def change_log(self):
+        # Entries for rows this user could see: the company's for employers, their own (or every posting, bar changes
+        # only employers can see) for applicants
+        log = ChangeLog.objects.filter(resource=self.change_resource)
+        profile = self.request.user.profile
+        if profile.account_type == Profile.ACCOUNT_EMPLOYER:
+            return log.filter(company_id=profile.company_id)
+        if self.change_resource == ChangeLog.JOB_POSTINGS:
+            return log.filter(employer_only=False)
+        return log.filter(applicant_id=self.request.user.pk)
+
+def with_related(applications):
+    # Everything ApplicationSerializer reads, joined or prefetched, so a page of applications costs the same few
+    # queries at any size
+    return applications.select_related("applicant", "job__company").prefetch_related(
+        Prefetch("answers", queryset=JobAppAnswer.objects.select_related("question").order_by("question_id"))
+    )
+
+def wants_archived(view):
+    # ?archived=1 switches list, retrieve and attachment downloads to the read-only archive tables
+    return view.action in ("list", "retrieve", "resume", "cover_letter") and view.request.query_params.get("archived") in ("1", "true")
+
+class JobPostingViewSet(ChangeFeedMixin, CompanyShardMixin, ReplicaReadsMixin, viewsets.ModelViewSet):
     queryset = JobPosting.objects.all()
     serializer_class = JobPostingSerializer
     permission_classes = [IsAuthenticated]
+    change_resource = ChangeLog.JOB_POSTINGS
+
+    max_radius_km = 500
 
     def get_queryset(self):
         profile = self.request.user.profile
+        shard = self.request_shard()
+        if wants_archived(self):
+            if profile.account_type != Profile.ACCOUNT_EMPLOYER or profile.company is None:
+                raise PermissionDenied("Only employers can view archived job postings.")
+            return ArchivedJobPosting.objects.using(shard).filter(company=profile.company).select_related("company")
+
         if profile.account_type == Profile.ACCOUNT_EMPLOYER and profile.company is not None:
-            # Employers only see their company's job postings
-            return JobPosting.objects.filter(company=profile.company)
-        # Applicants and others see all job postings
-        return JobPosting.objects.all()
+            # Employers only see their company's job postings, in every state
+            queryset = JobPosting.objects.using(shard).filter(company=profile.company).select_related("company")
+        else:
+            # Applicants and others only see open job postings
+            queryset = JobPosting.objects.using(shard).filter(status=JobPosting.OP).select_related("company")
+
+        near = self.request.query_params.get("near")
+        if near:
+            queryset = self.filter_near(queryset, near, self.request.query_params.get("radius"))
+        return queryset
+
+    def get_serializer_class(self):
+        return ArchivedJobPostingSerializer if wants_archived(self) else JobPostingSerializer
+
+    def filter_near(self, queryset, near, radius):
+        # ?near=<place or "lat,lon">&radius=<km>: bounding box on the coordinates index, then the exact haversine distance
+        point = resolve_location(near)
+        if point is None:
+            raise ParseError(f"Unknown location '{near}'.")
+        try:
+            radius = float(radius) if radius else 50.0
+        except ValueError:
+            raise ParseError("'radius' must be a number of kilometres.")
+        if not 0 < radius <= self.max_radius_km:
+            raise ParseError(f"'radius' must be between 0 and {self.max_radius_km} km.")
+
+        latitude, longitude = point
+        return (
+            queryset.filter(bounding_box_q(latitude, longitude, radius))
+            .annotate(distance_km=haversine_expression(latitude, longitude))
+            .filter(distance_km__lte=radius)
+            .order_by("distance_km")
+        )
 
     def perform_create(self, serializer):
         profile = self.request.user.profile
@@ -74,7 +278,18 @@ class JobPostingViewSet(viewsets.ModelViewSet):
         serializer.save(company=profile.company)
 
     @action(detail=True, methods=["post"])
-    @transaction.atomic
+    @idempotent
+    def close(self, request, pk=None):
+        job = self.get_object()
+        profile = request.user.profile
+        if profile.account_type != Profile.ACCOUNT_EMPLOYER or job.company_id != profile.company_id:
+            raise PermissionDenied("Only the company's employers can close this job posting.")
+        if not job.close():
+            return Response({"detail": "Only open job postings can be closed."}, status=http_status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(job).data)
+
+    @action(detail=True, methods=["post"])
+    @idempotent
     def apply(self, request, pk=None):
         job = self.get_object()
         profile = request.user.profile
@@ -82,44 +297,112 @@ class JobPostingViewSet(viewsets.ModelViewSet):
         if profile.account_type != Profile.ACCOUNT_APPLICANT:
             raise PermissionDenied("Only applicants can apply to job postings.")
 
-        # If any non-draft app exists for this job/user, block ability to apply again
-        already_submitted = Application.objects.filter(
-            applicant=request.user,
-            job=job
-        ).exclude(status=Application.DR).exists()
+        # Atomic upsert: returns the existing application or a new draft without racing concurrent applies
+        application, created = Application.get_or_create_draft(request.user, job)
 
-        if already_submitted:
-            existing = Application.objects.filter(applicant=request.user, job=job).exclude(status=Application.DR).first()
+        # If a non-draft app exists for this job/user, block ability to apply again
+        if application.status != Application.DR:
             return Response(
-                {"detail": "You have already submitted an application for this job.", "application_id": existing.id},
+                {"detail": "You have already submitted an application for this job.", "application_id": application.id},
                 status=http_status.HTTP_409_CONFLICT
             )
 
-        # Get existing or create new draft
-        application, created = Application.objects.get_or_create(
-            applicant=request.user,
-            job=job,
-            defaults={"status": Application.DR},
-        )
+        # A blank answer per question, so the applicant fills them in with one PUT to .../answers/
+        JobAppAnswer.create_blank(application)
 
         # Build response
         app_data = ApplicationSerializer(application, context={"request": request}).data
+        questions = JobAppQuestionSerializer(job.questions.all(), many=True).data
 
         return Response(
-            {"application": app_data},
+            {"application": app_data, "questions": questions},
             status=http_status.HTTP_201_CREATED if created else http_status.HTTP_200_OK
         )
 
+    @action(detail=True, methods=["get", "post"])
+    def questions(self, request, pk=None):
+        # GET lists the posting's questions; POST adds one or a list of them (the posting's employers only)
+        job = self.get_object()
+        if request.method == "GET":
+            return Response(JobAppQuestionSerializer(job.questions.all(), many=True).data)
+        profile = request.user.profile
+        if profile.account_type != Profile.ACCOUNT_EMPLOYER or job.company_id != profile.company_id:
+            raise PermissionDenied("Only the company's employers can add questions to this job posting.")
+        many = isinstance(request.data, list)
+        serializer = JobAppQuestionSerializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        questions = JobAppQuestion.objects.using(shard_for_pk(job.pk)).bulk_create(
+            [JobAppQuestion(job=job, **data) for data in (serializer.validated_data if many else [serializer.validated_data])]
+        )
+        data = JobAppQuestionSerializer(questions, many=True).data
+        return Response(data if many else data[0], status=http_status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        job = self.get_object()
+        matches = get_index().similar(job.id, k=self.get_limit())
+        return Response(self.ranked_postings(matches))
+
+    @action(detail=False, methods=["get"])
+    def recommended(self, request):
+        if request.user.profile.account_type != Profile.ACCOUNT_APPLICANT:
+            raise PermissionDenied("Only applicants can get job recommendations.")
 
-class ApplicationViewSet(viewsets.ModelViewSet):
+        # Recommendations are based on everything the applicant has applied to
+        history = evaluate_across_shards(Application.objects.filter(applicant=request.user).values_list("job_id", flat=True))
+        matches = get_index().recommend(history, k=self.get_limit())
+        return Response(self.ranked_postings(matches))
+
+    def get_limit(self):
+        try:
+            return max(1, min(int(self.request.query_params.get("limit", 10)), 50))
+        except ValueError:
+            return 10
+
+    def ranked_postings(self, matches):
+        # Serialize (posting_id, score) pairs in rank order, dropping postings outside the user's queryset
+        # Unpinned, so each posting is looked up on its own shard
+        postings = in_bulk_across_shards(self.get_queryset().using(None), [posting_id for posting_id, _ in matches])
+        results = []
+        for posting_id, score in matches:
+            if posting_id in postings:
+                data = self.get_serializer(postings[posting_id]).data
+                data["similarity"] = round(score, 4)
+                results.append(data)
+        return results
+
+
+class ApplicationViewSet(ChangeFeedMixin, CompanyShardMixin, ReplicaReadsMixin, viewsets.ModelViewSet):
     serializer_class = ApplicationSerializer
     permission_classes = [IsAuthenticated]
+    change_resource = ChangeLog.APPLICATIONS
 
     def get_queryset(self):
+        shard = self.request_shard()
+        if wants_archived(self):
+            # Applications to archived postings: the company's for employers, their own for applicants
+            queryset = ArchivedApplication.objects.using(shard).select_related("applicant", "job__company")
+            if self.request.user.profile.account_type == Profile.ACCOUNT_EMPLOYER:
+                # Submitted ones only, as for live applications
+                return queryset.filter(job__company=self.request.user.profile.company, status__in=["AP", "IN", "RE", "OF"])
+            return queryset.filter(applicant=self.request.user)
+        queryset = with_related(Application.objects.using(shard))
         if self.request.user.profile.account_type == Profile.ACCOUNT_EMPLOYER:
             # Employers can see all submitted applications for their company's job postings
-            return Application.objects.filter(job__company=self.request.user.profile.company, status__in=["AP", "IN", "RE", "OF"])
-        return Application.objects.filter(applicant=self.request.user)
+            return queryset.filter(job__company=self.request.user.profile.company, status__in=["AP", "IN", "RE", "OF"])
+        return queryset.filter(applicant=self.request.user)
+
+    def get_serializer_class(self):
+        return ArchivedApplicationSerializer if wants_archived(self) else ApplicationSerializer
+
+    def count_hint(self, queryset):
+        # For pagination: an employer's submitted applications are exactly the sum of their postings' maintained
+        # application_count, which reads one row per posting instead of counting every application
+        profile = self.request.user.profile
+        if wants_archived(self) or profile.account_type != Profile.ACCOUNT_EMPLOYER or set(self.request.query_params) - {"page", "page_size"}:
+            return None
+        postings = JobPosting.objects.using(self.request_shard()).filter(company=profile.company)
+        return postings.aggregate(total=Sum("application_count"))["total"] or 0, False
 
     def perform_create(self, serializer):
         application = serializer.save(applicant=self.request.user)
@@ -138,6 +421,7 @@ class ApplicationViewSet(viewsets.ModelViewSet):
         instance.delete()
 
     @action(detail=True, methods=["post"]) # Create a custom action to submit an application
+    @idempotent
     def submit(self, request, pk=None):
         application = self.get_object()
 
@@ -152,19 +436,61 @@ class ApplicationViewSet(viewsets.ModelViewSet):
                 status=http_status.HTTP_400_BAD_REQUEST
             )
 
+        # Every required question needs a non-blank answer (one query for all of them)
+        missing = JobAppQuestion.missing_required(application)
+        if missing:
+            return Response(
+                {"detail": "Answer all required questions before submitting.", "missing_questions": missing},
+                status=http_status.HTTP_400_BAD_REQUEST
+            )
+        if settings.APPLICATION_RESUME_REQUIRED and not application.resume:
+            return Response({"detail": "Attach a resume before submitting."}, status=http_status.HTTP_400_BAD_REQUEST)
 
         # Transition status to Applied using transition method to validate allowed transitions
         try:
             application.transition_status(Application.AP)
         except ValidationError as e:
             return Response({"detail": e.messages}, status=http_status.HTTP_400_BAD_REQUEST)
+        except TransitionConflict as e: # another request changed the status first
+            return Response({"detail": str(e)}, status=http_status.HTTP_409_CONFLICT)
 
         return Response(
             {"id": application.id, "status": application.status},
             status=http_status.HTTP_200_OK
         )
     
+    @action(detail=True, methods=["get", "put"])
+    def answers(self, request, pk=None):
+        # PUT {"answers": [{"question": 1, "answer_value": "..."}, ...]} saves them all with one upsert
+        application = self.get_object()
+        if request.method == "PUT":
+            if application.applicant != request.user:
+                raise PermissionDenied("You do not have permission to answer for this application.")
+            if application.status != Application.DR:
+                raise PermissionDenied("You can only edit draft applications.")
+            serializer = AnswerInputSerializer(data=request.data.get("answers") if isinstance(request.data, dict) else request.data, many=True)
+            serializer.is_valid(raise_exception=True)
+            submitted = {row["question"]: row["answer_value"] for row in serializer.validated_data}
+            questions = JobAppQuestion.objects.using(shard_for_pk(application.job_id)).filter(job_id=application.job_id, id__in=submitted).in_bulk()
+            values, errors = {}, {}
+            for question_id, value in submitted.items():
+                if question_id not in questions:
+                    errors[question_id] = ["Not a question on this job posting."]
+                    continue
+                try:
+                    values[question_id] = questions[question_id].clean_answer(value)
+                except ValidationError as e:
+                    errors[question_id] = e.messages
+            if errors:
+                return Response({"answers": errors}, status=http_status.HTTP_400_BAD_REQUEST)
+            JobAppAnswer.upsert(application, values)
+            answers = JobAppAnswer.objects.using(shard_for_pk(application.job_id)).filter(application=application).select_related("question").order_by("question_id")
+        else:
+            answers = application.answers.all()
+        return Response(JobAppAnswerSerializer(answers, many=True).data)
+
     @action(detail=True, methods=["post"]) # Custom action to withdraw an application
+    @idempotent
     def withdraw(self, request, pk=None):
         application = self.get_object()
 
@@ -183,10 +509,13 @@ class ApplicationViewSet(viewsets.ModelViewSet):
             application.transition_status(Application.DR) # try to mark as draft from applied
         except ValidationError as e: # catch any validation errors
             return Response({"detail": e.messages}, status=http_status.HTTP_400_BAD_REQUEST) # return error message and status code
+        except TransitionConflict as e: # another request changed the status first
+            return Response({"detail": str(e)}, status=http_status.HTTP_409_CONFLICT)
         
         return Response({"id": application.id, "status": application.status}) # return updated application status
     
     @action(detail=True, methods=["post"])
+    @idempotent
     def offer(self, request, pk=None):  
         app = self.get_object()
         if app.job.company != request.user.profile.company or request.user.profile.company is None:
@@ -195,10 +524,13 @@ class ApplicationViewSet(viewsets.ModelViewSet):
             app.transition_status(Application.OF) # try to mark as offered from applied
         except ValidationError as e: # catch any validation errors
             return Response({"detail": e.messages}, status=http_status.HTTP_400_BAD_REQUEST) # return error message and status code
+        except TransitionConflict as e: # another request changed the status first
+            return Response({"detail": str(e)}, status=http_status.HTTP_409_CONFLICT)
         
         return Response({"id": app.id, "status": app.status}) # return updated application status
     
     @action(detail=True, methods=["post"])
+    @idempotent
     def reject(self, request, pk=None):
         app = self.get_object()
         if app.job.company != request.user.profile.company or request.user.profile.company is None:
@@ -207,9 +539,12 @@ class ApplicationViewSet(viewsets.ModelViewSet):
             app.transition_status(Application.RE) # try to mark as rejected from applied
         except ValidationError as e: # catch any validation errors
             return Response({"detail": e.messages}, status=http_status.HTTP_400_BAD_REQUEST) # return error message and status code
+        except TransitionConflict as e: # another request changed the status first
+            return Response({"detail": str(e)}, status=http_status.HTTP_409_CONFLICT)
         return Response({"id": app.id, "status": app.status}) # return updated application status
     
     @action(detail=True, methods=["post"])
+    @idempotent
     def promote_to_interview(self, request, pk=None):
         app = self.get_object()
         if app.job.company != request.user.profile.company or request.user.profile.company is None:
@@ -218,18 +553,77 @@ class ApplicationViewSet(viewsets.ModelViewSet):
             app.transition_status(Application.IN) # mark as in interview from applied
         except ValidationError as e:
             return Response({"detail": e.messages}, status=http_status.HTTP_400_BAD_REQUEST)
+        except TransitionConflict as e: # another request changed the status first
+            return Response({"detail": str(e)}, status=http_status.HTTP_409_CONFLICT)
         
         return Response({"id": app.id, "status": app.status}, status=http_status.HTTP_200_OK)
 
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        # Employers rank their submitted candidates by resume text, e.g. ?q=python django
+        profile = request.user.profile
+        if profile.account_type != Profile.ACCOUNT_EMPLOYER or profile.company_id is None:
+            raise PermissionDenied("Only employers can search candidates.")
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"detail": "Provide a search query with ?q=."}, status=http_status.HTTP_400_BAD_REQUEST)
+        results = search_candidates(self.get_queryset().select_related("applicant", "job__company"), profile.company_id, query)
+        page = self.paginate_queryset(results)
+        if page is not None:
+            return self.get_paginated_response(CandidateSearchResultSerializer(page, many=True, context=self.get_serializer_context()).data)
+        results = results[:settings.CANDIDATE_SEARCH_LIMIT]
+        return Response(CandidateSearchResultSerializer(results, many=True, context=self.get_serializer_context()).data)
+
+    # Attachment downloads, for the applicant and for the employer once submitted (get_queryset decides who sees what)
+    @action(detail=True, methods=["get"], content_negotiation_class=IgnoreClientContentNegotiation)
+    def resume(self, request, pk=None):
+        return self.attachment_response("resume")
+
+    @action(detail=True, methods=["get"], url_path="cover-letter", content_negotiation_class=IgnoreClientContentNegotiation)
+    def cover_letter(self, request, pk=None):
+        return self.attachment_response("cover_letter")
+
+    def attachment_response(self, field_name):
+        application = self.get_object()
+        field_file = getattr(application, field_name)
+        if not field_file:
+            raise Http404
+        extension = os.path.splitext(field_file.name)[1]
+        return serve_attachment(self.request, field_file, f"{field_name.replace('_', '-')}-{application.pk}{extension}")
+
+def parse_calendar_bound(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"'{value}' is not a valid date or datetime.")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def interviews_for_user(user):
+    # Interviews visible to a user: their company's for employers, their own for applicants
+    if user.profile.account_type == Profile.ACCOUNT_EMPLOYER:
+        return Interview.objects.using(shard_for_company(user.profile.company_id)).filter(application__job__company=user.profile.company)
+    return Interview.objects.filter(application__applicant=user)
+
+def interview_scope(user):
+    # Cache scope matching interviews_for_user
+    if user.profile.account_type == Profile.ACCOUNT_EMPLOYER:
+        return company_scope(user.profile.company_id)
+    return applicant_scope(user.id)
+
 # Ownership checks are commented out for now to facilitate testing, add back after creating employer user type
-class InterviewViewSet(viewsets.ModelViewSet):
+class InterviewViewSet(ChangeFeedMixin, CompanyShardMixin, ReplicaReadsMixin, viewsets.ModelViewSet):
     serializer_class = InterviewSerializer
     permission_classes = [IsAuthenticated]
+    change_resource = ChangeLog.INTERVIEWS
 
     def get_queryset(self):
-        if self.request.user.profile.account_type == Profile.ACCOUNT_EMPLOYER:
-            return Interview.objects.filter(application__job__company=self.request.user.profile.company)
-        return Interview.objects.filter(application__applicant=self.request.user)
+        return interviews_for_user(self.request.user).using(self.request_shard())
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -263,7 +657,28 @@ class InterviewViewSet(viewsets.ModelViewSet):
 
         instance.delete()
 
+    @action(detail=False, methods=["get"])
+    def calendar(self, request):
+        # Interviews overlapping ?start=&end= (ISO dates or datetimes), defaulting to the current week
+        try:
+            start = parse_calendar_bound(request.query_params.get("start"))
+            end = parse_calendar_bound(request.query_params.get("end"))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+
+        if start is None:
+            today = timezone.localdate()
+            start = timezone.make_aware(datetime.combine(today - timedelta(days=today.weekday()), time.min))
+        if end is None:
+            end = start + timedelta(days=7)
+        if end <= start:
+            return Response({"detail": "'end' must be after 'start'."}, status=http_status.HTTP_400_BAD_REQUEST)
+
+        interviews = Interview.overlapping(start, end, self.get_queryset()).order_by("interview_date")
+        return Response(self.get_serializer(evaluate_across_shards(interviews), many=True).data)
+
     @action(detail=True, methods=["post"])
+    @idempotent
     def offer(self, request, pk=None):
         interview = self.get_object()
         app = interview.application
@@ -271,10 +686,13 @@ class InterviewViewSet(viewsets.ModelViewSet):
             app.transition_status(Application.OF)
         except ValidationError as e:
             return Response({"detail": e.messages}, status=http_status.HTTP_400_BAD_REQUEST)
+        except TransitionConflict as e: # another request changed the status first
+            return Response({"detail": str(e)}, status=http_status.HTTP_409_CONFLICT)
         
         return Response({"id": app.id, "status": app.status})
     
     @action(detail=True, methods=["post"])
+    @idempotent
     def reject(self, request, pk=None):
         interview = self.get_object()
         app = interview.application
@@ -282,12 +700,239 @@ class InterviewViewSet(viewsets.ModelViewSet):
             app.transition_status(Application.RE)
         except ValidationError as e:
             return Response({"detail": e.messages}, status=http_status.HTTP_400_BAD_REQUEST)
+        except TransitionConflict as e: # another request changed the status first
+            return Response({"detail": str(e)}, status=http_status.HTTP_409_CONFLICT)
         return Response({"id": app.id, "status": app.status})
 
 
+class CalendarFeedTokenView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        profile = request.user.profile
+        if not profile.calendar_token:
+            profile.rotate_calendar_token()
+        return Response({"url": request.build_absolute_uri(reverse("calendar-feed", args=[profile.calendar_token]))})
+
+    def post(self, request):
+        # Rotate the token, revoking the old feed URL
+        request.user.profile.rotate_calendar_token()
+        return self.get(request)
+
+
+class InterviewCalendarFeedView(View):
+    # Token in the URL because calendar apps cannot send an Authorization header
+    cache_seconds = 60 * 60 * 24
+
+    def get(self, request, token):
+        profile = Profile.objects.select_related("user").filter(calendar_token=token).first()
+        if profile is None:
+            raise Http404
+        user = profile.user
+
+        # The scope version only changes when an interview in this scope changes, so it doubles as the ETag
+        scope = interview_scope(user)
+        version = scope_version(scope)
+        etag = quote_etag(f"{scope}-{version}")
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return HttpResponseNotModified(headers={"ETag": etag})
+
+        cache_key = f"ical:{scope}:{version}"
+        body = cache.get(cache_key)
+        if body is not None:
+            response = HttpResponse(body)
+        else:
+            interviews = iterate_across_shards(
+                interviews_for_user(user)
+                .select_related("application__applicant", "application__job__company")
+                .order_by("interview_date"),
+                chunk_size=500,
+            )
+            for_employer = profile.account_type == Profile.ACCOUNT_EMPLOYER
+            chunks = render_calendar(interviews, "Interviews", for_employer)
+            response = StreamingHttpResponse(self.stream_and_cache(chunks, cache_key))
+
+        response["Content-Type"] = "text/calendar; charset=utf-8"
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def stream_and_cache(self, chunks, cache_key):
+        collected = []
+        for chunk in chunks:
+            collected.append(chunk)
+            yield chunk
+        cache.set(cache_key, "".join(collected), self.cache_seconds)
+
+
 class MeView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = MeSerializer
 
     def get_object(self):
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+class DashboardView(APIView):
+    # Everything a dashboard shows in one response, in a fixed number of queries: an applicant's applications and
+    # upcoming interviews, or an employer's postings, recent applications and upcoming interviews. Cached per user in
+    # the shared cache under the versions of the scopes it reads from, so any write to them, whichever server process
+    # handles it, shows on the next load. Reads stay on the primary, since a lagging replica could otherwise be cached
+    # under the new version.
+    permission_classes = [IsAuthenticated]
+    cache_seconds = 300
+    recent_limit = 50
+
+    def get(self, request):
+        user, profile = request.user, request.user.profile
+        employer = profile.account_type == Profile.ACCOUNT_EMPLOYER and profile.company_id is not None
+        scopes = [user_scope(user.pk), company_scope(profile.company_id) if employer else applicant_scope(user.pk)]
+        cache_key = f"dashboard:{user.pk}:" + ":".join(str(scope_version(scope)) for scope in scopes)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.employer_data(request) if employer else self.applicant_data(request)
+            data["me"] = MeSerializer(user).data
+            cache.set(cache_key, data, self.cache_seconds)
+        return Response(data)
+
+    def upcoming_interviews(self, user):
+        interviews = interviews_for_user(user).filter(interview_end__gte=timezone.now()).order_by("interview_date")[:self.recent_limit]
+        return evaluate_across_shards(interviews)
+
+    def applicant_data(self, request):
+        applications = evaluate_across_shards(
+            with_related(Application.objects.filter(applicant=request.user)).order_by("-id")
+        )
+        status_counts = dict.fromkeys(Application.STATUS_COUNTERS, 0)
+        for application in applications:
+            status_counts[application.status] += 1
+        context = {"request": request}
+        return {
+            "applications": ApplicationSerializer(applications, many=True, context=context).data,
+            "status_counts": status_counts,
+            "upcoming_interviews": InterviewSerializer(self.upcoming_interviews(request.user), many=True, context=context).data,
+        }
+
+    def employer_data(self, request):
+        company = request.user.profile.company_id
+        shard = shard_for_company(company)
+        postings = list(JobPosting.objects.using(shard).filter(company=company).select_related("company").order_by("-posted_date", "-id"))
+        # Totals come from the postings' maintained counters rather than counting applications
+        status_counts = {status: sum(getattr(posting, field) for posting in postings) for status, field in Application.SUBMITTED_STATUS_COUNTERS.items()}
+        recent = with_related(
+            Application.objects.using(shard)
+            .filter(job__company=company, status__in=[Application.AP, Application.IN, Application.RE, Application.OF])
+        ).order_by("-id")[:self.recent_limit]
+        context = {"request": request}
+        return {
+            "postings": JobPostingSerializer(postings, many=True, context=context).data,
+            "status_counts": status_counts,
+            "application_count": sum(posting.application_count for posting in postings),
+            "recent_applications": ApplicationSerializer(recent, many=True, context=context).data,
+            "upcoming_interviews": InterviewSerializer(self.upcoming_interviews(request.user), many=True, context=context).data,
+        }
+
+
+logger = logging.getLogger(__name__)
+
+class BatchView(APIView):
+    # Runs a list of API operations in one round trip:
+    #   {"atomic": false, "operations": [{"method": "GET", "path": "/api/applications/?page=1"}, {"method": "POST", "path": ..., "body": {...}}]}
+    # Each operation goes through the normal view for its path, authenticated as the batch's user, and gets its own
+    # status. With "atomic": true the operations share one transaction; the first one that fails rolls everything back
+    # and the rest are not run (424). An operation can carry its own "idempotency_key" (see jobs/idempotency.py).
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [BatchJWTAuthentication]
+    methods = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+    # Headers that describe the batch request itself rather than each operation, so they aren't passed on
+    per_request_headers = {
+        "HTTP_IDEMPOTENCY_KEY", "HTTP_IF_MATCH", "HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE", "HTTP_IF_UNMODIFIED_SINCE",
+        "HTTP_IF_RANGE", "HTTP_RANGE", "HTTP_CONTENT_MD5", "HTTP_CONTENT_ENCODING",
+    }
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"detail": "Expected an object with 'operations'."}, status=http_status.HTTP_400_BAD_REQUEST)
+        operations = request.data.get("operations")
+        if not isinstance(operations, list) or not operations:
+            return Response({"detail": "'operations' must be a non-empty list."}, status=http_status.HTTP_400_BAD_REQUEST)
+        if len(operations) > settings.BATCH_MAX_OPERATIONS:
+            return Response({"detail": f"At most {settings.BATCH_MAX_OPERATIONS} operations per batch."}, status=http_status.HTTP_400_BAD_REQUEST)
+        for i, op in enumerate(operations):
+            error = self.invalid(op)
+            if error:
+                return Response({"detail": f"Operation {i}: {error}"}, status=http_status.HTTP_400_BAD_REQUEST)
+
+        atomic = bool(request.data.get("atomic"))
+        # An atomic batch holds a transaction on the primary and on every shard, since its operations may write to
+        # any of them. A failed operation rolls all of them back; the commits themselves aren't two-phase.
+        databases = ["default", *settings.DATABASE_SHARDS] if atomic else []
+        results, failed = [], False
+        with ExitStack() as stack:
+            for alias in databases:
+                stack.enter_context(transaction.atomic(using=alias))
+            for op in operations:
+                if failed:
+                    results.append({"status": http_status.HTTP_424_FAILED_DEPENDENCY, "body": {"detail": "Not run: an earlier operation failed."}})
+                    continue
+                result = self.run(request, op)
+                results.append(result)
+                failed = atomic and result["status"] >= 400
+            if failed:
+                for alias in databases:
+                    transaction.set_rollback(True, using=alias)
+        return Response({"results": results, "rolled_back": failed})
+
+    def invalid(self, op):
+        if not isinstance(op, dict) or not isinstance(op.get("path"), str):
+            return "expected an object with 'method' and 'path'."
+        if str(op.get("method", "")).upper() not in self.methods:
+            return f"method must be one of {', '.join(sorted(self.methods))}."
+        if not isinstance(op.get("idempotency_key", ""), str):
+            return "idempotency_key must be a string."
+        path = urlsplit(op["path"]).path
+        if not path.startswith("/api/") or path.startswith("/api/batch/"):
+            return "path must be an API path other than /api/batch/."
+        return None
+
+    def run(self, request, op):
+        method = op["method"].upper()
+        url = urlsplit(op["path"])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {"status": http_status.HTTP_404_NOT_FOUND, "body": {"detail": "Not found."}}
+
+        if method not in SAFE_METHODS:
+            pin_to_primary(request.user.pk) # Same read-your-writes pinning as a standalone write
+        payload = json.dumps(op["body"]).encode() if op.get("body") is not None else b""
+        environ = {
+            **{key: value for key, value in request.META.items() if isinstance(value, str) and key not in self.per_request_headers},
+            "REQUEST_METHOD": method,
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(payload)),
+            "wsgi.input": io.BytesIO(payload),
+            "wsgi.url_scheme": request.scheme,
+        }
+        if op.get("idempotency_key"):
+            environ["HTTP_IDEMPOTENCY_KEY"] = op["idempotency_key"]
+        sub_request = WSGIRequest(environ)
+        # Authenticated once, for the whole batch (DRF's forced authentication)
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception("Batch operation %s %s failed", method, url.path)
+            return {"status": http_status.HTTP_500_INTERNAL_SERVER_ERROR, "body": {"detail": "Internal server error."}}
+
+        if hasattr(response, "data"):
+            body = response.data
+        else:
+            if hasattr(response, "render"):
+                response.render()
+            body = b"".join(response) if response.streaming else response.content
+            body = body.decode(response.charset or "utf-8", errors="replace")
+        return {"status": response.status_code, "body": body}
+